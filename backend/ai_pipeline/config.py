@@ -8,7 +8,163 @@ class Settings:
     DATABASE_URL = os.getenv("DATABASE_URL")
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
     DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # 'json' (one object per line) or 'text' for local development
+    DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"  # Log every SQL statement
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))  # Should cover DB_WORKERS plus job and batch writers
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))  # Recycle before server-side idle timeouts
+    DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "100"))  # Rows per flush of the buffered writer
+    DB_WRITE_FLUSH_SECONDS = float(os.getenv("DB_WRITE_FLUSH_SECONDS", "2"))  # Flush a partial buffer after this long
     MODEL_NAME = os.getenv("MODEL_NAME", "llama3-8b-8192")  # default Groq model
+    GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+    # Shared LLM client: connection pool, retries and client-side rate limits
+    LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))  # Keep-alive connections to the Groq API
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+    LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "512"))  # Charged against the token bucket per request
+    GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))  # Match your Groq tier; 0 disables the limiter
+    GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "30000"))
+
+    # Model routing and failover (see llm_router.py)
+    LLM_ROUTES = os.getenv("LLM_ROUTES", "")  # JSON list of routes in order of preference; empty: MODEL_NAME plus LLM_FALLBACK_MODEL
+    LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "")  # Served when MODEL_NAME is throttled, failing or slow
+    LLM_FALLBACK_API_URL = os.getenv("LLM_FALLBACK_API_URL", "")  # Another OpenAI-compatible provider; defaults to GROQ_API_URL
+    LLM_FALLBACK_API_KEY = os.getenv("LLM_FALLBACK_API_KEY", "")  # Defaults to GROQ_API_KEY
+    LLM_LATENCY_SLO_SECONDS = float(os.getenv("LLM_LATENCY_SLO_SECONDS", "20"))  # A route that takes longer is abandoned for the next one; 0 disables
+    LLM_ROUTE_RETRIES = int(os.getenv("LLM_ROUTE_RETRIES", "1"))  # Retries before failing over; the last route gets LLM_MAX_RETRIES
+    LLM_MAX_COST_PER_REQUEST = float(os.getenv("LLM_MAX_COST_PER_REQUEST", "0"))  # USD; routes estimated above this are skipped, 0 disables
+    LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", "3"))  # Consecutive failures before a route is skipped
+    LLM_CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("LLM_CIRCUIT_COOLDOWN_SECONDS", "30"))  # Then one request probes it again
+
+    # Per-stage worker limits for the blocking parts of the pipeline
+    FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))  # newspaper downloads
+    DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "2"))  # yt-dlp audio downloads
+    TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "1"))  # Whisper passes
+    LLM_WORKERS = int(os.getenv("LLM_WORKERS", "8"))  # Groq requests
+    DB_WORKERS = int(os.getenv("DB_WORKERS", "4"))  # SQLAlchemy commits
+    PROBE_WORKERS = int(os.getenv("PROBE_WORKERS", "4"))  # yt-dlp metadata lookups for cost estimates
+
+    # Admission control for /process: priority lanes with bounded slots and queues (see scheduler.py)
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    SCHEDULER_SUMMARIZE_SLOTS = int(os.getenv("SCHEDULER_SUMMARIZE_SLOTS", "16"))  # Articles, and videos with a stored transcript
+    SCHEDULER_SUMMARIZE_QUEUE = int(os.getenv("SCHEDULER_SUMMARIZE_QUEUE", "64"))  # Waiting requests before 429s
+    SCHEDULER_TRANSCRIBE_SLOTS = int(os.getenv("SCHEDULER_TRANSCRIBE_SLOTS", "2"))
+    SCHEDULER_TRANSCRIBE_QUEUE = int(os.getenv("SCHEDULER_TRANSCRIBE_QUEUE", "16"))
+    SCHEDULER_LONG_SLOTS = int(os.getenv("SCHEDULER_LONG_SLOTS", "1"))  # Videos longer than SCHEDULER_LONG_VIDEO_SECONDS
+    SCHEDULER_LONG_QUEUE = int(os.getenv("SCHEDULER_LONG_QUEUE", "8"))
+    SCHEDULER_LONG_VIDEO_SECONDS = float(os.getenv("SCHEDULER_LONG_VIDEO_SECONDS", "900"))
+    SCHEDULER_DEFAULT_VIDEO_SECONDS = float(os.getenv("SCHEDULER_DEFAULT_VIDEO_SECONDS", "300"))  # Assumed when yt-dlp reports no duration
+    SCHEDULER_CLIENT_MAX_REQUESTS = int(os.getenv("SCHEDULER_CLIENT_MAX_REQUESTS", "8"))  # Per client and lane, waiting or running; 0 disables
+    SCHEDULER_CLIENT_HEADER = os.getenv("SCHEDULER_CLIENT_HEADER", "X-Client-ID")  # Identifies clients behind a trusted proxy
+    SCHEDULER_TRUSTED_PROXIES = os.getenv("SCHEDULER_TRUSTED_PROXIES", "")  # Comma-separated peer addresses allowed to set the client header; others are identified by their address
+    SCHEDULER_RETRY_AFTER_SECONDS = int(os.getenv("SCHEDULER_RETRY_AFTER_SECONDS", "5"))  # Retry-After until a lane has timings
+
+    # Background job queue (POST /process with background=true)
+    JOB_WORKERS_IN_API = os.getenv("JOB_WORKERS_IN_API", "true").lower() == "true"  # Set false when running `python jobs.py` separately
+    JOB_SUMMARIZE_WORKERS = int(os.getenv("JOB_SUMMARIZE_WORKERS", "2"))
+    JOB_TRANSCRIBE_WORKERS = int(os.getenv("JOB_TRANSCRIBE_WORKERS", "1"))
+    JOB_CLAIM_BATCH = int(os.getenv("JOB_CLAIM_BATCH", "5"))  # Queued jobs a worker tries to claim per poll
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+    JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "5"))
+    JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))  # Running jobs without a heartbeat are re-queued
+    JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "500"))  # Queued jobs per mode before new ones get 429s; 0 disables
+    JOB_CLIENT_MAX_QUEUED = int(os.getenv("JOB_CLIENT_MAX_QUEUED", "50"))  # Queued jobs per client and mode; 0 disables
+
+    # Startup: heavy dependencies load on first use unless warmed up here
+    WARMUP = os.getenv("WARMUP", "")  # Comma-separated: summarize, transcribe, or single hooks (newspaper, yt_dlp, whisper)
+    WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "false").lower() == "true"  # Finish warm-up before accepting requests
+
+    # Request coalescing: identical in-flight requests share one pipeline run
+    SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+    SINGLEFLIGHT_DISTRIBUTED = os.getenv("SINGLEFLIGHT_DISTRIBUTED", "true").lower() == "true"  # Also coalesce across workers through the PipelineLocks table
+    SINGLEFLIGHT_LEASE_SECONDS = float(os.getenv("SINGLEFLIGHT_LEASE_SECONDS", "30"))  # Renewed while the run is alive; expired leases are taken over
+    SINGLEFLIGHT_POLL_SECONDS = float(os.getenv("SINGLEFLIGHT_POLL_SECONDS", "0.5"))  # How often workers waiting on another worker check for the result
+    SINGLEFLIGHT_RETENTION_SECONDS = float(os.getenv("SINGLEFLIGHT_RETENTION_SECONDS", "3600"))  # Finished lock rows older than this are pruned
+
+    # Article fetcher
+    FETCH_USER_AGENT = os.getenv("FETCH_USER_AGENT", "FlashDigestBot/1.0 (+https://flash-digest.vercel.app)")
+    FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "20"))
+    FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "64"))  # Shared HTTP pool across all hosts
+    FETCH_PER_HOST_CONCURRENCY = int(os.getenv("FETCH_PER_HOST_CONCURRENCY", "4"))
+    FETCH_PER_HOST_DELAY_SECONDS = float(os.getenv("FETCH_PER_HOST_DELAY_SECONDS", "0.25"))  # Minimum gap between requests to one host
+    FETCH_RESPECT_ROBOTS = os.getenv("FETCH_RESPECT_ROBOTS", "true").lower() == "true"
+    FETCH_ROBOTS_TTL_SECONDS = float(os.getenv("FETCH_ROBOTS_TTL_SECONDS", "3600"))
+    RAW_HTML_DIR = os.getenv("RAW_HTML_DIR", "./raw_html")  # Last fetched HTML + ETag/Last-Modified per URL
+    RAW_HTML_MAX_MB = int(os.getenv("RAW_HTML_MAX_MB", "1024"))  # Least recently stored pages are evicted above this; 0 disables
+    RAW_HTML_MAX_AGE_SECONDS = float(os.getenv("RAW_HTML_MAX_AGE_SECONDS", "604800"))  # Pages stored longer ago are evicted; 0 keeps them
+    RAW_HTML_EVICT_INTERVAL_SECONDS = float(os.getenv("RAW_HTML_EVICT_INTERVAL_SECONDS", "300"))  # Minimum gap between eviction scans
+    PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", "2"))  # newspaper parse workers; 0 parses on a thread
+
+    # Summary cache (in-process LRU + lookups against stored summaries)
+    CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))  # Per in-process cache, least recently used are evicted
+    CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "900"))  # 0 keeps entries until evicted
+    CACHE_DB_MAX_AGE_SECONDS = float(os.getenv("CACHE_DB_MAX_AGE_SECONDS", "3600"))  # Stored summaries older than this are stale for URL lookups; 0 disables
+
+    # Content deduplication: text stored once by hash, near-duplicates reuse summaries
+    CONTENT_COMPRESSION = os.getenv("CONTENT_COMPRESSION", "zlib")  # 'zlib' or 'none'
+    NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+    NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))  # Estimated Jaccard similarity needed to reuse a summary
+    NEAR_DUP_MIN_WORDS = int(os.getenv("NEAR_DUP_MIN_WORDS", "80"))  # Shorter texts are only matched exactly
+
+    # Map-reduce summarization of long inputs
+    CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "6000"))  # Leaves room for the prompt and completion in an 8k context
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "200"))
+    CHUNK_PARALLELISM = int(os.getenv("CHUNK_PARALLELISM", "4"))  # Concurrent chunk requests per process
+
+    # Local extractive compression (CPU only) before text is sent to the LLM
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "false").lower() == "true"
+    COMPRESSION_RATIO = float(os.getenv("COMPRESSION_RATIO", "0.5"))  # Share of the input's tokens kept
+    COMPRESSION_MIN_TOKENS = int(os.getenv("COMPRESSION_MIN_TOKENS", "1000"))  # Shorter inputs are only cleaned of boilerplate/filler
+    COMPRESSION_MAX_TOKENS = int(os.getenv("COMPRESSION_MAX_TOKENS", str(CHUNK_MAX_TOKENS)))  # Compressed input always fits one request
+    SUMMARY_MODE = os.getenv("SUMMARY_MODE", "llm")  # 'llm', or 'extractive' to summarize without any LLM calls
+    EXTRACTIVE_FALLBACK = os.getenv("EXTRACTIVE_FALLBACK", "true").lower() == "true"  # Serve an extractive summary when Groq still fails with 429/5xx after retries
+    EXTRACTIVE_SENTENCES = int(os.getenv("EXTRACTIVE_SENTENCES", "5"))  # Sentences in an extractive summary
+
+    # Whisper transcription
+    WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")  # Default when a request doesn't pick one: tiny, base or small
+    WHISPER_POOL_SIZE = int(os.getenv("WHISPER_POOL_SIZE", str(TRANSCRIBE_WORKERS)))  # Instances per model size
+    WHISPER_TORCH_THREADS = int(os.getenv("WHISPER_TORCH_THREADS", "0"))  # 0 splits the CPU cores across the pool
+    TRANSCRIBE_PROCESSES = int(os.getenv("TRANSCRIBE_PROCESSES", "1"))  # >1 splits long audio on silence, or fans out its windows, across Whisper worker processes
+    PARALLEL_SEGMENT_SECONDS = float(os.getenv("PARALLEL_SEGMENT_SECONDS", "120"))  # Upper bound on segment length for parallel transcription
+    PARALLEL_MIN_SECONDS = float(os.getenv("PARALLEL_MIN_SECONDS", "300"))  # Shorter audio is transcribed in-process
+    AUDIO_STREAMING = os.getenv("AUDIO_STREAMING", "false").lower() == "true"  # Decode yt-dlp streams to PCM and transcribe while downloading
+    AUDIO_WINDOW_SECONDS = float(os.getenv("AUDIO_WINDOW_SECONDS", "30"))  # Whisper's native window length
+    AUDIO_STREAM_BUFFER_WINDOWS = int(os.getenv("AUDIO_STREAM_BUFFER_WINDOWS", "8"))  # Decoded windows buffered ahead of Whisper
+    DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "./downloads")  # Per-job temp directories for downloaded audio are created here
+    TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"  # Reuse transcripts by video ID and audio fingerprint
+    TRANSCRIPT_FINGERPRINT_REUSE = os.getenv("TRANSCRIPT_FINGERPRINT_REUSE", "true").lower() == "true"  # Reuse another video's transcript when its audio verifiably matches
+    JOB_MEMORY_BUDGET_MB = int(os.getenv("JOB_MEMORY_BUDGET_MB", "512"))  # Working set per transcription; longer audio is decoded and transcribed in windows. 0 = no limit
+    MEMORY_SAMPLE_SECONDS = float(os.getenv("MEMORY_SAMPLE_SECONDS", "0.25"))  # RSS sampling interval for per-job peak reporting
+    TRANSCRIPT_SEGMENTS_ENABLED = os.getenv("TRANSCRIPT_SEGMENTS_ENABLED", "true").lower() == "true"  # Store timed segments for range fetches and search
+    TRANSCRIPT_SEGMENT_BLOCK = int(os.getenv("TRANSCRIPT_SEGMENT_BLOCK", "64"))  # Segments per stored block (a few minutes of speech)
+
+    # Bulk ingestion (/batch and `python batch.py`)
+    BATCH_FETCH_WORKERS = int(os.getenv("BATCH_FETCH_WORKERS", "8"))
+    BATCH_TRANSCRIBE_WORKERS = int(os.getenv("BATCH_TRANSCRIBE_WORKERS", "1"))
+    BATCH_SUMMARIZE_WORKERS = int(os.getenv("BATCH_SUMMARIZE_WORKERS", "4"))
+    BATCH_WRITE_SIZE = int(os.getenv("BATCH_WRITE_SIZE", "50"))  # Summaries per bulk insert
+    BATCH_FLUSH_SECONDS = float(os.getenv("BATCH_FLUSH_SECONDS", "5"))  # Flush a partial batch after this long
+    BATCH_QUEUE_DEPTH = int(os.getenv("BATCH_QUEUE_DEPTH", "32"))  # Items buffered between stages
+    BATCH_DIR = os.getenv("BATCH_DIR", "./batches")  # Progress files for batches started over HTTP
+
+    # Feed ingestion: RSS/Atom feeds and news sitemaps summarized ahead of requests (see feeds.py)
+    FEEDS = os.getenv("FEEDS", "")  # Comma-separated feed or sitemap URLs, registered at startup
+    FEED_POLLER_IN_API = os.getenv("FEED_POLLER_IN_API", "true").lower() == "true"  # Set false when running `python feeds.py` separately
+    FEED_POLL_SECONDS = int(os.getenv("FEED_POLL_SECONDS", "900"))  # Default interval between polls of one feed
+    FEED_TICK_SECONDS = float(os.getenv("FEED_TICK_SECONDS", "30"))  # How often the poller looks for due feeds
+    FEED_MAX_NEW_ENTRIES = int(os.getenv("FEED_MAX_NEW_ENTRIES", "20"))  # Newest entries summarized per poll; older new ones are marked skipped
+    FEED_SITEMAP_CHILDREN = int(os.getenv("FEED_SITEMAP_CHILDREN", "3"))  # Most recent child sitemaps read from a sitemap index
+    FEED_WORKERS = int(os.getenv("FEED_WORKERS", "2"))  # Entries summarized at once per process
+    FEED_STALE_SECONDS = float(os.getenv("FEED_STALE_SECONDS", "900"))  # Running entries older than this are retried
+    FEED_DIGEST_SECONDS = int(os.getenv("FEED_DIGEST_SECONDS", "86400"))  # Period of each feed's digest; 0 disables digests
+    FEED_DIGEST_MAX_ITEMS = int(os.getenv("FEED_DIGEST_MAX_ITEMS", "30"))
+    FEED_DIGEST_OVERVIEW = os.getenv("FEED_DIGEST_OVERVIEW", "true").lower() == "true"  # One LLM call per digest to summarize the summaries
 
 # Create a settings instance
 settings = Settings()
@@ -0,0 +1,123 @@
+import queue
+import subprocess
+import threading
+import numpy as np
+from metrics import span
+from ai_pipeline.config import settings
+
+SAMPLE_RATE = 16000  # Whisper works on 16 kHz mono
+BYTES_PER_SAMPLE = 2  # s16le
+# Memory per second of audio decoded whole and passed to Whisper: the s16le
+# bytes, their float32 copy and Whisper's log-mel spectrogram of the full input
+DECODED_BYTES_PER_SECOND = SAMPLE_RATE * (BYTES_PER_SAMPLE + 4) + 100 * 80 * 4
+
+def resolve_audio_stream(url: str) -> dict:
+    """
+    Looks up the direct URL of the best audio stream without downloading it.
+
+    Returns:
+        dict: 'url', 'http_headers' and 'duration' (seconds, may be None).
+    """
+    import yt_dlp as youtube_dl
+
+    with youtube_dl.YoutubeDL({"format": "bestaudio/best", "quiet": True, "no_warnings": True}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return {
+        "url": info["url"],
+        "http_headers": info.get("http_headers") or {},
+        "duration": info.get("duration"),
+    }
+
+def _ffmpeg_command(stream: dict) -> list:
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if stream["http_headers"] and stream["url"].startswith("http"):
+        headers = "".join(f"{key}: {value}\r\n" for key, value in stream["http_headers"].items())
+        command += ["-headers", headers]
+    # Decode straight to 16 kHz mono PCM on stdout: no file on disk, no MP3 re-encode
+    command += ["-i", stream["url"], "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"]
+    return command
+
+def _buffer_windows(window_bytes: int) -> int:
+    # Queued s16le windows count against the job's budget, with room for the float32 window being transcribed
+    budget = max(0, settings.JOB_MEMORY_BUDGET_MB) * 1024 * 1024
+    buffered = max(1, settings.AUDIO_STREAM_BUFFER_WINDOWS)
+    if budget:
+        buffered = min(buffered, max(1, budget // (window_bytes * 4)))
+    return buffered
+
+def _iter_ffmpeg_windows(command: list, window_seconds: float = None):
+    """
+    Runs an ffmpeg command writing s16le PCM to stdout and yields fixed-length
+    float32 windows. A reader thread keeps draining stdout into a bounded
+    queue, so decoding (and downloading, for remote input) carries on while
+    the caller is busy with the previous window, and at most a few windows
+    are ever held in memory.
+    """
+    window_seconds = window_seconds or settings.AUDIO_WINDOW_SECONDS
+    window_bytes = int(window_seconds * SAMPLE_RATE) * BYTES_PER_SAMPLE
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    windows = queue.Queue(maxsize=_buffer_windows(window_bytes))
+    stop = threading.Event()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                data = process.stdout.read(window_bytes)
+                if not data:
+                    break
+                windows.put(data)
+        finally:
+            windows.put(None)
+
+    thread = threading.Thread(target=reader, name="pcm-reader", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            data = windows.get()
+            if data is None:
+                break
+            samples = np.frombuffer(data[: len(data) - len(data) % BYTES_PER_SAMPLE], dtype=np.int16)
+            yield samples.astype(np.float32) / 32768.0
+    finally:
+        stop.set()
+        if process.poll() is None:
+            process.kill()
+        # Unblock the reader if it's waiting on a full queue
+        while thread.is_alive():
+            try:
+                windows.get_nowait()
+            except queue.Empty:
+                thread.join(timeout=0.1)
+        process.wait()
+
+    if process.returncode not in (0, -9):
+        error = process.stderr.read().decode("utf-8", "replace").strip()
+        raise Exception(f"ffmpeg failed to decode audio: {error}")
+
+def iter_pcm_windows(url: str, window_seconds: float = None):
+    """
+    Yields fixed-length windows of 16 kHz mono float32 audio while the
+    stream is still being downloaded.
+    """
+    return _iter_ffmpeg_windows(_ffmpeg_command(resolve_audio_stream(url)), window_seconds)
+
+def iter_file_windows(path: str, window_seconds: float = None):
+    """
+    Yields fixed-length windows of 16 kHz mono float32 audio decoded from a
+    local file, holding only a few windows in memory at a time.
+    """
+    return _iter_ffmpeg_windows(_ffmpeg_command({"url": path, "http_headers": {}}), window_seconds)
+
+def decode_audio_file(path: str) -> np.ndarray:
+    """
+    Decodes a whole audio file to 16 kHz mono float32 samples.
+    """
+    command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", path, "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"]
+    with span("transcode") as attributes:
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg failed to decode {path}: {result.stderr.decode('utf-8', 'replace').strip()}")
+        attributes["audio_seconds"] = round(len(result.stdout) / BYTES_PER_SAMPLE / SAMPLE_RATE, 2)
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
@@ -0,0 +1,383 @@
+import argparse
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+from ai_pipeline.config import settings
+from cache import lookup_summary_by_url, remember_url_summary, cached_fetch_news_content, cached_summarize_text
+from db.database import SessionLocal
+from db.db_insert import BufferedSummaryWriter
+from fetch_sources import get_youtube_audio, fetch_news_content
+from summarizer_groq import summarize_long_text, summarize_transcript
+from transcription import transcribe_samples, transcribe_windows
+from transcript_cache import lookup_transcript, cached_transcribe_file
+from logs import get_logger
+
+log = get_logger(__name__)
+
+YOUTUBE_HOSTS = ("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be")
+
+# Batch IDs name progress files, so only IDs start_batch could have made are accepted
+BATCH_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+_STOP = object()
+
+def is_youtube_url(url: str) -> bool:
+    return urlparse(url).netloc.lower() in YOUTUBE_HOSTS
+
+def is_valid_batch_id(batch_id: str) -> bool:
+    return bool(BATCH_ID_PATTERN.fullmatch(batch_id))
+
+def _remove_audio(item: dict):
+    # Downloaded audio is deleted once transcribed, or when a cancel skips it
+    path = item.pop("audio_path", None)
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def parse_url_lines(lines, default_mode: str = None) -> list:
+    """
+    Parses 'url' or 'mode url' lines into batch items. Blank lines and
+    '#' comments are skipped; without a mode, YouTube links are transcribed
+    and everything else is summarized.
+    """
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split()
+        if len(parts) >= 2 and parts[0] in ("summarize", "transcribe"):
+            mode, url = parts[0], parts[1]
+        else:
+            url = parts[0]
+            mode = default_mode or ("transcribe" if is_youtube_url(url) else "summarize")
+        items.append({"source": url, "mode": mode})
+    return items
+
+class BatchRunner:
+    """
+    Runs many URLs through fetch -> transcribe -> summarize -> write as a
+    staged pipeline. Every stage has its own worker threads and a bounded
+    inbox, so slow stages apply back-pressure instead of buffering the
+    whole batch in memory.
+
+    Summaries are written through a BufferedSummaryWriter in bulk
+    transactions of write_batch_size rows (or every flush_seconds). After
+    each commit the finished items are appended to the progress file, so a
+    crashed run can be restarted with the same file and only pending items
+    are redone.
+
+    Items are dicts with 'source' and 'mode' ('summarize', 'transcribe' or
+    'text'); 'text' items carry their content in 'text'.
+    """
+
+    def __init__(self, items: list, progress_path: str = None, fetch_workers: int = None,
+                 transcribe_workers: int = None, summarize_workers: int = None,
+                 write_batch_size: int = None, flush_seconds: float = None, model_size: str = None):
+        self.items = items
+        self.progress_path = progress_path
+        self.fetch_workers = fetch_workers or settings.BATCH_FETCH_WORKERS
+        self.transcribe_workers = transcribe_workers or settings.BATCH_TRANSCRIBE_WORKERS
+        self.summarize_workers = summarize_workers or settings.BATCH_SUMMARIZE_WORKERS
+        self.write_batch_size = write_batch_size or settings.BATCH_WRITE_SIZE
+        self.flush_seconds = flush_seconds if flush_seconds is not None else settings.BATCH_FLUSH_SECONDS
+        self.model_size = model_size
+        self.run_id = uuid.uuid4().hex[:8]
+
+        self.results = {}  # index -> summary (None if the item failed)
+        self.counts = {"total": len(items), "skipped": 0, "cached": 0, "completed": 0, "failed": 0}
+        self.started_at = None
+        self.finished_at = None
+        self.state = "pending"
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._progress_lock = threading.Lock()
+
+        depth = max(4, settings.BATCH_QUEUE_DEPTH)
+        self._fetch_q = queue.Queue(maxsize=depth)
+        self._transcribe_q = queue.Queue(maxsize=depth)
+        self._summarize_q = queue.Queue(maxsize=depth)
+        self._summary_writer = None  # Created by run(), with its flush timer
+
+    # --- progress file ---
+
+    def _load_done(self) -> set:
+        done = set()
+        if self.progress_path and os.path.exists(self.progress_path):
+            with open(self.progress_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Partially written line from a crash
+                    if record.get("status") == "done":
+                        done.add((record["mode"], record["source"]))
+        return done
+
+    def _record(self, records: list):
+        if not self.progress_path or not records:
+            return
+        with self._progress_lock, open(self.progress_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counts[key] += amount
+
+    # --- stages ---
+
+    def _fail(self, item: dict, error: Exception):
+        log.error("batch item failed", batch_id=self.run_id, source=item["source"], error=str(error))
+        item["error"] = str(error)
+        self._complete([item])
+
+    def _fetch(self, item: dict):
+        if item["mode"] == "text":
+            item["content"] = item["text"]
+            self._summarize_q.put(item)
+            return
+
+        cached = lookup_summary_by_url(item["source"], item["mode"])
+        if cached is not None:
+            item["summary"] = cached
+            item["cached"] = True
+            self._complete([item])
+            return
+
+        if item["mode"] == "transcribe":
+            transcript = lookup_transcript(item["source"], self.model_size)
+            if transcript is not None:
+                item["content"] = transcript
+                self._summarize_q.put(item)
+                return
+            audio_path = get_youtube_audio([item["source"]], base_filename=f"batch_{self.run_id}_{item['index']}")[0]
+            if audio_path is None:
+                raise FileNotFoundError("❌ Audio file not found after downloading.")
+            item["audio_path"] = audio_path
+            self._transcribe_q.put(item)
+        else:
+            item["content"] = cached_fetch_news_content(item["source"], fetch_news_content)
+            self._summarize_q.put(item)
+
+    def _transcribe(self, item: dict):
+        try:
+            item["content"] = cached_transcribe_file(item["source"], item["audio_path"], self.model_size, transcribe_samples, transcribe_windows)
+        finally:
+            _remove_audio(item)
+        self._summarize_q.put(item)
+
+    def _summarize(self, item: dict):
+        summarize = summarize_transcript if item["mode"] == "transcribe" else summarize_long_text
+        item["summary"] = cached_summarize_text(item["content"], summarize)
+        self._summary_writer.add(item["source"], item["content"], item["summary"], item["mode"], index=item["index"])
+
+    def _worker(self, inbox: queue.Queue, handler):
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                return
+            if self._cancelled.is_set():
+                _remove_audio(item)  # Drain without doing work
+                continue
+            try:
+                handler(item)
+            except Exception as e:
+                self._fail(item, e)
+
+    def _start_stage(self, name: str, workers: int, inbox: queue.Queue, handler) -> list:
+        threads = [
+            threading.Thread(target=self._worker, args=(inbox, handler), name=f"batch-{name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _close_after(self, threads: list, next_inboxes: list):
+        # Once every worker of a stage has exited, tell the next stage(s) there is no more input
+        for thread in threads:
+            thread.join()
+        for inbox, workers in next_inboxes:
+            for _ in range(max(1, workers)):
+                inbox.put(_STOP)
+
+    def _written(self, rows: list, error: Exception):
+        # on_flush of the summary writer: the rows are committed, or all failed together
+        if error is not None:
+            log.error("batch write failed", batch_id=self.run_id, rows=len(rows), error=str(error))
+            for row in rows:
+                row["error"] = f"DB write failed: {error}"
+        self._complete(rows)
+
+    def _complete(self, items: list):
+        records = []
+        for item in items:
+            failed = "error" in item
+            with self._lock:
+                self.results[item["index"]] = None if failed else item["summary"]
+                if failed:
+                    self.counts["failed"] += 1
+                elif item.get("cached"):
+                    self.counts["cached"] += 1
+                else:
+                    self.counts["completed"] += 1
+            if not failed and item["mode"] != "text":
+                remember_url_summary(item["source"], item["mode"], item["summary"])
+            records.append({
+                "source": item["source"],
+                "mode": item["mode"],
+                "status": "failed" if failed else "done",
+                "error": item.get("error"),
+            })
+        self._record(records)
+
+    def run(self) -> dict:
+        """
+        Runs the batch to completion and returns its final status.
+        """
+        self.state = "running"
+        self.started_at = time.time()
+        done = self._load_done()
+        self._summary_writer = BufferedSummaryWriter(
+            SessionLocal, batch_size=self.write_batch_size, flush_seconds=self.flush_seconds, on_flush=self._written,
+        )
+
+        fetchers = self._start_stage("fetch", self.fetch_workers, self._fetch_q, self._fetch)
+        transcribers = self._start_stage("transcribe", self.transcribe_workers, self._transcribe_q, self._transcribe)
+        summarizers = self._start_stage("summarize", self.summarize_workers, self._summarize_q, self._summarize)
+
+        closers = [
+            threading.Thread(target=self._close_after, args=(fetchers, [(self._transcribe_q, self.transcribe_workers)]), daemon=True),
+            threading.Thread(target=self._close_after, args=(fetchers + transcribers, [(self._summarize_q, self.summarize_workers)]), daemon=True),
+        ]
+        for closer in closers:
+            closer.start()
+
+        for index, item in enumerate(self.items):
+            if self._cancelled.is_set():
+                break
+            if (item["mode"], item["source"]) in done and item["mode"] != "text":
+                self._count("skipped")
+                continue
+            self._fetch_q.put(dict(item, index=index))
+
+        for _ in range(max(1, self.fetch_workers)):
+            self._fetch_q.put(_STOP)
+
+        for thread in fetchers + transcribers + summarizers:
+            thread.join()
+        self._summary_writer.close()  # Writes what is still buffered
+        self.finished_at = time.time()
+        self.state = "cancelled" if self._cancelled.is_set() else "completed"
+        return self.status()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def status(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        processed = counts["completed"] + counts["cached"] + counts["failed"]
+        return {
+            "state": self.state,
+            "counts": counts,
+            "pending": counts["total"] - counts["skipped"] - processed,
+            "elapsed_seconds": round(elapsed, 2),
+            "items_per_second": round(processed / elapsed, 3) if elapsed else 0.0,
+            "queues": {
+                "fetch": self._fetch_q.qsize(),
+                "transcribe": self._transcribe_q.qsize(),
+                "summarize": self._summarize_q.qsize(),
+                "write": self._summary_writer.buffered if self._summary_writer else 0,
+            },
+            "progress_file": self.progress_path,
+        }
+
+# Batches started over HTTP, by batch ID
+_batches = {}
+_batches_lock = threading.Lock()
+
+def start_batch(items: list, batch_id: str = None, model_size: str = None) -> str:
+    """
+    Starts (or, given an existing batch_id, resumes) a batch in a background
+    thread. Progress is kept in BATCH_DIR/<batch_id>.jsonl.
+
+    Raises:
+        ValueError: If batch_id is malformed or that batch is still active.
+    """
+    if batch_id is not None and not is_valid_batch_id(batch_id):
+        raise ValueError(f"Invalid batch ID {batch_id!r}.")
+    batch_id = batch_id or uuid.uuid4().hex
+    os.makedirs(settings.BATCH_DIR, exist_ok=True)
+    runner = BatchRunner(items, progress_path=os.path.join(settings.BATCH_DIR, f"{batch_id}.jsonl"), model_size=model_size)
+
+    with _batches_lock:
+        existing = _batches.get(batch_id)
+        # A runner is 'pending' until its thread starts, and busy just the same
+        if existing is not None and existing.state in ("pending", "running"):
+            raise ValueError(f"Batch {batch_id} is already running.")
+        _batches[batch_id] = runner
+
+    threading.Thread(target=runner.run, name=f"batch-{batch_id}", daemon=True).start()
+    return batch_id
+
+def get_batch(batch_id: str):
+    with _batches_lock:
+        runner = _batches.get(batch_id)
+    return runner.status() if runner else None
+
+def cancel_batch(batch_id: str):
+    with _batches_lock:
+        runner = _batches.get(batch_id)
+    if runner is None:
+        return None
+    runner.cancel()
+    return runner.status()
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize or transcribe a list of URLs in bulk.")
+    parser.add_argument("input", help="File with one URL (or 'mode URL') per line")
+    parser.add_argument("--progress", help="Progress file; rerun with the same file to resume (default: <input>.progress.jsonl)")
+    parser.add_argument("--mode", choices=["summarize", "transcribe"], help="Mode for lines without one (default: by URL)")
+    parser.add_argument("--fetch-workers", type=int)
+    parser.add_argument("--transcribe-workers", type=int)
+    parser.add_argument("--summarize-workers", type=int)
+    parser.add_argument("--write-batch-size", type=int)
+    parser.add_argument("--model-size", choices=["tiny", "base", "small"])
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        items = parse_url_lines(f, default_mode=args.mode)
+
+    runner = BatchRunner(
+        items,
+        progress_path=args.progress or f"{args.input}.progress.jsonl",
+        fetch_workers=args.fetch_workers,
+        transcribe_workers=args.transcribe_workers,
+        summarize_workers=args.summarize_workers,
+        write_batch_size=args.write_batch_size,
+        model_size=args.model_size,
+    )
+    print(f"📦 Processing {len(items)} URLs")
+    try:
+        status = runner.run()
+    except KeyboardInterrupt:
+        runner.cancel()
+        print("⚠️ Interrupted; rerun with the same progress file to resume.")
+        return
+    print(json.dumps(status, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares Summary insert throughput of the write paths.
+
+  legacy  add + commit + refresh per row, then a second commit (the old path)
+  single  save_summary_to_db: one commit per row, no refresh
+  bulk    BufferedSummaryWriter: executemany INSERTs of --batch-size rows
+
+Usage (from backend/):
+    python -m benchmarks.db_writes --rows 2000 --database-url postgresql://...
+Defaults to a throwaway SQLite file; point it at a scratch database, since
+the benchmark drops and recreates the Summaries and Contents tables there.
+"""
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from db.database import _engine_options
+from db.db_insert import save_summary_to_db, BufferedSummaryWriter
+from cache import content_hash
+from models import Summary, Content, ContentBand
+
+SUMMARY = "The council approved a budget with more transit funding."
+
+def content(i: int) -> str:
+    # Distinct per row, so the content store writes every body like real traffic
+    return f"Story {i}. " + "The city council voted on Tuesday to approve a new budget. " * 60
+
+def legacy(Session, rows):
+    db = Session()
+    try:
+        for i in range(rows):
+            text = content(i)
+            row = Summary(source=f"bench:{i}", content=text, summary=SUMMARY, language="English",
+                          sentiment="NEUTRAL", content_hash=content_hash(text))
+            db.add(row)
+            db.commit()
+            db.refresh(row)
+            db.commit()
+    finally:
+        db.close()
+
+def single(Session, rows):
+    db = Session()
+    try:
+        for i in range(rows):
+            save_summary_to_db(db, f"bench:{i}", content(i), SUMMARY)
+    finally:
+        db.close()
+
+def bulk(Session, rows, batch_size):
+    with BufferedSummaryWriter(Session, batch_size=batch_size, flush_seconds=60) as writer:
+        for i in range(rows):
+            writer.add(f"bench:{i}", content(i), SUMMARY)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url, **_engine_options(url))
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    print(f"{'path':>7} {'rows':>6} {'seconds':>8} {'inserts/s':>10}")
+    for name, run in (
+        ("legacy", lambda: legacy(Session, args.rows)),
+        ("single", lambda: single(Session, args.rows)),
+        ("bulk", lambda: bulk(Session, args.rows, args.batch_size)),
+    ):
+        for table in (Summary.__table__, ContentBand.__table__, Content.__table__):
+            table.drop(bind=engine, checkfirst=True)
+        for table in (Content.__table__, ContentBand.__table__, Summary.__table__):
+            table.create(bind=engine)
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        print(f"{name:>7} {args.rows:>6} {elapsed:>8.2f} {args.rows / elapsed:>10.0f}")
+
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Offline end-to-end benchmark of the summarize/transcribe pipeline.
+
+Starts the local stand-ins from benchmarks.stubs (mock Groq endpoint,
+fixture articles and audio clips), points the pipeline at them and a
+throwaway SQLite database, then drives each target at every concurrency
+level and reports throughput, p50/p95/p99 latency and peak RSS.
+
+  run_pipeline   the synchronous CLI pipeline, one thread per caller
+  process        POST /process (or /process/stream with --stream) on a
+                 local uvicorn server running main.app
+  fetch_sources  the bulk helper, --batch-size URLs per call
+
+Every request uses a fresh URL and caches are off by default, so each one
+pays for the full fetch -> parse -> LLM -> DB path. Results are written to
+--results-dir as JSON tagged with the git commit; pass --compare with an
+earlier file to see the change per target and concurrency level.
+
+Usage (from backend/):
+    python -m benchmarks.pipeline --concurrency 1 4 16 --requests 48
+    python -m benchmarks.pipeline --target process --llm-latency 0.8 --stream
+    python -m benchmarks.pipeline --mode transcribe --target run_pipeline --concurrency 1 2 --requests 4
+    python -m benchmarks.pipeline --compare benchmarks/results/20240601-120000-abc1234.json
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+from benchmarks.stubs import MockLLMServer, FixtureServer
+
+TARGETS = ("run_pipeline", "process", "fetch_sources")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+class RssSampler:
+    """
+    Samples this process's resident set size every `interval` seconds and
+    keeps the peak. Falls back to ru_maxrss (peak since process start) where
+    /proc is not available.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _current(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page_size
+        except (OSError, ValueError, IndexError):
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._current())
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def configure_environment(args, llm: MockLLMServer, workdir: str):
+    """
+    Points settings at the stand-ins. Must run before any pipeline module is
+    imported, since settings are read at import time.
+    """
+    # Never let a benchmark write to a real database or call the real API
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["GROQ_API_URL"] = llm.chat_url
+    os.environ["GROQ_API_KEY"] = "benchmark"
+    os.environ["RAW_HTML_DIR"] = os.path.join(workdir, "raw_html")
+    os.environ["DOWNLOAD_DIR"] = os.path.join(workdir, "downloads")
+    os.environ["BATCH_DIR"] = os.path.join(workdir, "batches")
+    os.environ["JOB_WORKERS_IN_API"] = "false"
+    os.environ["AUDIO_STREAMING"] = "true" if args.audio_streaming else "false"
+    if not args.cache:
+        os.environ["CACHE_ENABLED"] = "false"
+        os.environ["NEAR_DUP_ENABLED"] = "false"
+        os.environ["TRANSCRIPT_CACHE_ENABLED"] = "false"
+    # Measure the pipeline, not client-side politeness; override from the shell to include them
+    os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", "0")
+    os.environ.setdefault("GROQ_TOKENS_PER_MINUTE", "0")
+    os.environ.setdefault("FETCH_PER_HOST_DELAY_SECONDS", "0")
+    os.environ.setdefault("FETCH_PER_HOST_CONCURRENCY", str(max(args.concurrency) * args.batch_size))
+    # One benchmark client stands in for many, and queues instead of being shed
+    os.environ.setdefault("SCHEDULER_CLIENT_MAX_REQUESTS", "0")
+    for queue in ("SCHEDULER_SUMMARIZE_QUEUE", "SCHEDULER_TRANSCRIBE_QUEUE", "SCHEDULER_LONG_QUEUE"):
+        os.environ.setdefault(queue, str(max(args.concurrency) * args.batch_size))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+class Bench:
+    def __init__(self, args, fixtures: FixtureServer):
+        self.args = args
+        self.fixtures = fixtures
+        self._next = 0
+        self._server = None
+        self._server_thread = None
+        self._base_url = None
+
+    def urls(self, count: int) -> list:
+        # Fresh URLs every run so nothing is served from a previous level
+        start, self._next = self._next, self._next + count
+        if self.args.mode == "transcribe":
+            return [self.fixtures.clip_url(n) for n in range(start, start + count)]
+        return [self.fixtures.article_url(n) for n in range(start, start + count)]
+
+    # --- targets ---
+
+    def run_pipeline(self, urls: list, concurrency: int) -> list:
+        from run_pipeline import run_pipeline
+
+        def call(url):
+            started = time.perf_counter()
+            run_pipeline(self.args.mode, url)
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(call, urls))
+
+    def fetch_sources(self, urls: list, concurrency: int) -> list:
+        from fetch_sources import fetch_sources
+
+        batches = [urls[i:i + self.args.batch_size] for i in range(0, len(urls), self.args.batch_size)]
+
+        def call(batch):
+            started = time.perf_counter()
+            fetch_sources(news_urls=batch)
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(call, batches))
+
+    def _start_api(self):
+        import uvicorn
+        import main
+
+        port = _free_port()
+        config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+        self._server = uvicorn.Server(config)
+        self._server_thread = threading.Thread(target=self._server.run, name="uvicorn", daemon=True)
+        self._server_thread.start()
+        while not self._server.started:
+            time.sleep(0.05)
+        self._base_url = f"http://127.0.0.1:{port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._server_thread.join()
+
+    def process(self, urls: list, concurrency: int) -> list:
+        import httpx
+
+        if self._server is None:
+            self._start_api()
+
+        async def run():
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            async with httpx.AsyncClient(base_url=self._base_url, timeout=None, limits=limits) as client:
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def call(url):
+                    async with semaphore:
+                        started = time.perf_counter()
+                        payload = {"url": url, "mode": self.args.mode}
+                        if self.args.stream:
+                            # Latency is to the last event, same as a client waiting for the full summary
+                            async with client.stream("POST", "/process/stream", json=payload) as response:
+                                response.raise_for_status()
+                                async for _ in response.aiter_bytes():
+                                    pass
+                        else:
+                            response = await client.post("/process", json=payload)
+                            response.raise_for_status()
+                        return time.perf_counter() - started
+
+                return await asyncio.gather(*(call(url) for url in urls))
+
+        return asyncio.run(run())
+
+    # --- measurement ---
+
+    def saved(self, urls: list) -> int:
+        # Failures are reported differently by each target; a stored summary is the ground truth
+        from db.database import SessionLocal
+        from models import Summary
+
+        db = SessionLocal()
+        try:
+            return db.query(Summary.source).filter(Summary.source.in_(urls)).distinct().count()
+        finally:
+            db.close()
+
+    def measure(self, target: str, concurrency: int) -> dict:
+        urls = self.urls(self.args.requests)
+        with RssSampler() as rss:
+            started = time.perf_counter()
+            latencies = getattr(self, target)(urls, concurrency)
+            elapsed = time.perf_counter() - started
+
+        completed = self.saved(urls)
+        latencies_ms = np.array(latencies) * 1000
+        return {
+            "target": target,
+            "mode": self.args.mode,
+            "concurrency": concurrency,
+            "requests": len(urls),
+            "errors": len(urls) - completed,
+            "seconds": round(elapsed, 3),
+            "throughput_rps": round(completed / elapsed, 3) if elapsed else 0.0,
+            "p50_ms": round(float(np.percentile(latencies_ms, 50)), 1),
+            "p95_ms": round(float(np.percentile(latencies_ms, 95)), 1),
+            "p99_ms": round(float(np.percentile(latencies_ms, 99)), 1),
+            "peak_rss_mib": round(rss.peak / 1024 ** 2, 1),
+        }
+
+def print_header():
+    print(f"{'target':<14}{'mode':<11}{'conc':>5}{'reqs':>6}{'errs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'RSS MiB':>9}")
+
+def print_result(r: dict):
+    print(
+        f"{r['target']:<14}{r['mode']:<11}{r['concurrency']:>5}{r['requests']:>6}{r['errors']:>6}"
+        f"{r['throughput_rps']:>9.2f}{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['peak_rss_mib']:>9.0f}"
+    )
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["target"], r["mode"], r["concurrency"]): r for r in baseline["results"]}
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\nCompared with {baseline.get('commit') or 'unknown commit'} ({baseline_path}):")
+    print(f"{'target':<14}{'mode':<11}{'conc':>5}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'RSS':>10}")
+    for r in results:
+        old = previous.get((r["target"], r["mode"], r["concurrency"]))
+        if old is None:
+            continue
+        print(
+            f"{r['target']:<14}{r['mode']:<11}{r['concurrency']:>5}"
+            f"{change(r['throughput_rps'], old['throughput_rps']):>10}{change(r['p50_ms'], old['p50_ms']):>10}"
+            f"{change(r['p95_ms'], old['p95_ms']):>10}{change(r['p99_ms'], old['p99_ms']):>10}"
+            f"{change(r['peak_rss_mib'], old['peak_rss_mib']):>10}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--mode", choices=["summarize", "transcribe"], default="summarize")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="Requests (URLs) per target and concurrency level")
+    parser.add_argument("--batch-size", type=int, default=4, help="URLs per fetch_sources call")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Mock LLM time to first token (s)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of LLM calls answered with 429")
+    parser.add_argument("--fixture-latency", type=float, default=0.02, help="Article/clip server latency (s)")
+    parser.add_argument("--clip-seconds", type=float, default=8.0)
+    parser.add_argument("--stream", action="store_true", help="Drive /process/stream instead of /process for the process target")
+    parser.add_argument("--audio-streaming", action="store_true", help="Transcribe while downloading (AUDIO_STREAMING)")
+    parser.add_argument("--cache", action="store_true", help="Leave the summary/transcript caches on")
+    parser.add_argument("--database-url", default=None, help="Scratch database (default: throwaway SQLite)")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    if args.mode == "transcribe":
+        if "fetch_sources" in args.target:
+            parser.error("fetch_sources only summarizes articles; use --mode summarize for it.")
+        if importlib.util.find_spec("whisper") is None:
+            parser.error("Transcribe benchmarks need openai-whisper installed.")
+
+    workdir = tempfile.mkdtemp(prefix="flashdigest-bench-")
+    llm = MockLLMServer(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second, error_rate=args.llm_error_rate).start()
+    fixtures = FixtureServer(latency=args.fixture_latency, clip_seconds=args.clip_seconds).start()
+    configure_environment(args, llm, workdir)
+
+    from db.database import engine
+    from db.search import ensure_search_index
+    from models import Base
+
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
+
+    bench = Bench(args, fixtures)
+    results = []
+    print_header()
+    try:
+        for target in args.target:
+            for concurrency in args.concurrency:
+                result = bench.measure(target, concurrency)
+                results.append(result)
+                print_result(result)
+    finally:
+        bench.stop()
+        llm.stop()
+        fixtures.stop()
+
+    report = {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "results_dir", "no_save")},
+        "llm_requests": llm.requests,
+        "llm_throttled": llm.throttled,
+        "results": results,
+    }
+    if not args.no_save:
+        os.makedirs(args.results_dir, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{report['commit'] or 'nogit'}{'-dirty' if report['dirty'] else ''}.json"
+        path = os.path.join(args.results_dir, name)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
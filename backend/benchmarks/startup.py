@@ -0,0 +1,155 @@
+"""
+Measures worker start-up cost: import time, resident memory after import,
+which heavy dependencies were loaded, and optionally the warm-up hooks.
+
+Every run imports the module in a fresh interpreter, so nothing is served
+from an already-warm process; the median of --runs is reported. Results go
+to --results-dir as JSON tagged with the git commit, like the pipeline
+benchmark; pass --compare with an earlier file to see the change.
+
+Usage (from backend/):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --module main jobs --runs 9
+    python -m benchmarks.startup --warmup summarize --warmup transcribe
+    python -m benchmarks.startup --compare benchmarks/results/startup-20240601-120000-abc1234.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from benchmarks.pipeline import RESULTS_DIR, _git
+
+# Dependencies that should only load when their mode is first used
+HEAVY_MODULES = ("torch", "whisper", "yt_dlp", "newspaper", "pydub", "pytube", "numpy")
+
+PROBE = r"""
+import importlib, json, os, resource, sys, time
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+baseline = rss()
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+result = {
+    "import_seconds": time.perf_counter() - started,
+    "interpreter_rss": baseline,
+    "import_rss": rss(),
+    "loaded": [name for name in sys.argv[3].split(",") if name in sys.modules],
+}
+if sys.argv[2]:
+    from warmup import warm_up
+    started = time.perf_counter()
+    result["hooks"] = warm_up(sys.argv[2])
+    result["warmup_seconds"] = time.perf_counter() - started
+    result["warmup_rss"] = rss()
+print(json.dumps(result))
+"""
+
+def probe(module: str, warmup: str, env: dict) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE, module, warmup, ",".join(HEAVY_MODULES)],
+        capture_output=True, text=True, env=env,
+    )
+    if completed.returncode != 0:
+        raise Exception(f"Importing {module} failed:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def measure(module: str, warmup: str, runs: int, env: dict) -> dict:
+    samples = [probe(module, warmup, env) for _ in range(runs)]
+    mib = 1024 ** 2
+    result = {
+        "module": module,
+        "warmup": warmup or None,
+        "runs": runs,
+        "import_ms": round(statistics.median(s["import_seconds"] for s in samples) * 1000, 1),
+        "import_ms_min": round(min(s["import_seconds"] for s in samples) * 1000, 1),
+        "interpreter_rss_mib": round(statistics.median(s["interpreter_rss"] for s in samples) / mib, 1),
+        "import_rss_mib": round(statistics.median(s["import_rss"] for s in samples) / mib, 1),
+        "heavy_loaded": samples[-1]["loaded"],
+    }
+    if warmup:
+        result["warmup_ms"] = round(statistics.median(s["warmup_seconds"] for s in samples) * 1000, 1)
+        result["warmup_rss_mib"] = round(statistics.median(s["warmup_rss"] for s in samples) / mib, 1)
+        result["hooks"] = samples[-1]["hooks"]
+    return result
+
+def print_result(r: dict):
+    line = (
+        f"{r['module']:<14}{r['warmup'] or '-':<12}{r['import_ms']:>10.0f}{r['import_ms_min']:>9.0f}"
+        f"{r['import_rss_mib']:>10.0f}{r.get('warmup_ms', 0):>11.0f}{r.get('warmup_rss_mib', 0):>11.0f}  {','.join(r['heavy_loaded']) or '-'}"
+    )
+    print(line)
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["module"], r["warmup"]): r for r in baseline["results"]}
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\nCompared with {baseline.get('commit') or 'unknown commit'} ({baseline_path}):")
+    print(f"{'module':<14}{'warmup':<12}{'import':>10}{'RSS':>10}")
+    for r in results:
+        old = previous.get((r["module"], r["warmup"]))
+        if old is not None:
+            print(f"{r['module']:<14}{r['warmup'] or '-':<12}{change(r['import_ms'], old['import_ms']):>10}{change(r['import_rss_mib'], old['import_rss_mib']):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", nargs="+", default=["main", "jobs"], help="Modules to import, e.g. main (API worker) or jobs")
+    parser.add_argument("--warmup", action="append", default=[], help="Also time these warm-up targets after import (repeatable)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", default=None, help="Only needed to build the engine; no connection is made")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", default=None, help="Earlier startup results file to compare against")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="flashdigest-startup-")
+    env = dict(os.environ)
+    env["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+
+    print(f"{'module':<14}{'warmup':<12}{'import ms':>10}{'min ms':>9}{'RSS MiB':>10}{'warmup ms':>11}{'warm MiB':>11}  heavy modules loaded")
+    results = []
+    for module in args.module:
+        for warmup in [""] + args.warmup:
+            result = measure(module, warmup, args.runs, env)
+            results.append(result)
+            print_result(result)
+
+    report = {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    if not args.no_save:
+        os.makedirs(args.results_dir, exist_ok=True)
+        name = f"startup-{datetime.now():%Y%m%d-%H%M%S}-{report['commit'] or 'nogit'}{'-dirty' if report['dirty'] else ''}.json"
+        path = os.path.join(args.results_dir, name)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
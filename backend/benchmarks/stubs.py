@@ -0,0 +1,280 @@
+"""
+Local stand-ins for the external services the pipeline talks to, so
+benchmarks run offline and reproducibly:
+
+  MockLLMServer   OpenAI-compatible /chat/completions with configurable
+                  latency, token rate, streaming and 429 injection
+  FixtureServer   deterministic news articles at /article/<n> (plus a
+                  permissive robots.txt) and short speech-like WAV clips at
+                  /clips/<n>.wav, which yt-dlp downloads like any direct
+                  media link
+
+Usage (from backend/), to point a running API at them by hand:
+    python -m benchmarks.stubs --llm-port 8765 --fixture-port 8766 --llm-latency 0.4
+then set GROQ_API_URL=http://127.0.0.1:8765/v1/chat/completions.
+"""
+import argparse
+import io
+import json
+import random
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+WORDS = (
+    "council budget transit parks officials vote city funding plan residents school district mayor "
+    "report growth market inflation rates bank energy prices climate policy court ruling election "
+    "campaign hospital health workers union contract strike airport flights weather storm damage "
+    "police investigation community housing rent construction project bridge road safety study "
+    "scientists research university students technology company shares investors quarter profit"
+).split()
+
+class _Server:
+    def __init__(self, handler, port: int):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+class _LLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server.owner
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server.requests += 1
+
+        if server.error_rate and server.rng.random() < server.error_rate:
+            server.throttled += 1
+            self._send_json(429, {"error": {"message": "Rate limit reached"}}, {"Retry-After": "0.2"})
+            return
+
+        prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+        prompt_tokens = max(1, prompt_chars // 4)
+        words = [WORDS[(prompt_chars + i) % len(WORDS)] for i in range(server.completion_tokens)]
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words), "total_tokens": prompt_tokens + len(words)}
+        time.sleep(server.latency)  # Time to first token
+
+        if not request.get("stream"):
+            time.sleep(len(words) / server.tokens_per_second)
+            self._send_json(200, {
+                "id": "mock",
+                "object": "chat.completion",
+                "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            chunk = {"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            time.sleep(1.0 / server.tokens_per_second)
+        final = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+        self._write_chunk(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+class MockLLMServer(_Server):
+    """
+    OpenAI-compatible chat completions endpoint on any POST path.
+
+    Args:
+        latency (float): Seconds before the first token.
+        tokens_per_second (float): Generation speed after the first token.
+        completion_tokens (int): Words in every completion.
+        error_rate (float): Fraction of requests answered with 429 + Retry-After.
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.3, tokens_per_second: float = 400.0,
+                 completion_tokens: int = 60, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(_LLMHandler, port)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.url}/v1/chat/completions"
+
+SUBJECTS = ("The city council", "The mayor", "State officials", "The school district", "Local residents", "The transit agency",
+            "Hospital workers", "The central bank", "Investors", "The court", "Researchers at the university", "The union")
+VERBS = ("approved", "rejected", "debated", "announced", "questioned", "delayed", "expanded", "criticized", "proposed", "reviewed")
+OBJECTS = ("a new budget for {topic}", "the plan to fund {topic}", "a report on {topic}", "changes to {topic}",
+           "an agreement about {topic}", "the contract for {topic}", "a study of {topic}")
+CLAUSES = ("after a long meeting on {day}", "despite concerns from {group}", "as prices continued to rise",
+           "in a vote that was closer than expected", "according to a statement released on {day}",
+           "which could affect {number} people in the region", "while {group} said they would appeal the decision")
+
+def _sentence(rng: random.Random) -> str:
+    fill = {
+        "topic": " ".join(rng.sample(WORDS, 2)),
+        "day": rng.choice(("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")),
+        "group": rng.choice(("residents", "business owners", "teachers", "local workers", "environmental groups")),
+        "number": f"{rng.randint(2, 90) * 1000:,}",
+    }
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(CLAUSES)}.".format(**fill)
+
+def article_html(n: int, paragraphs: int = 12) -> str:
+    """
+    Deterministic article n: plausible news prose (newspaper's extractor
+    scores paragraphs by stopword density, so word salad parses as empty).
+    Different n share no paragraphs, so neither the content-hash cache nor
+    near-duplicate detection short-circuits a run.
+    """
+    rng = random.Random(n)
+    body = []
+    for p in range(paragraphs):
+        sentences = " ".join(_sentence(rng) for _ in range(rng.randint(3, 5)))
+        body.append(f"<p>{sentences} This is part {p} of story {n}.</p>")
+    title = " ".join(rng.choice(WORDS) for _ in range(6)).title()
+    return (
+        f"<html><head><title>{title}</title><meta name='author' content='Bench Reporter'></head>"
+        f"<body><nav>Home | World | Business</nav><article><h1>{title}</h1>{''.join(body)}</article>"
+        f"<footer>Copyright Flash Digest fixtures</footer></body></html>"
+    )
+
+def speech_like_clip(n: int, seconds: float = 8.0, sample_rate: int = 16000) -> bytes:
+    """
+    Returns a mono 16-bit WAV of voiced bursts separated by short pauses,
+    enough to exercise decoding, silence splitting and Whisper.
+    """
+    rng = np.random.RandomState(n)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    envelope = (np.sin(2 * np.pi * rng.uniform(1.5, 3.0) * t) > -0.3).astype(np.float32)
+    pitch = rng.uniform(110, 220)
+    voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    samples = 0.3 * envelope * voice / 2.3 + 0.01 * rng.randn(len(t))
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server.owner
+        path = self.path.split("?")[0]
+        time.sleep(server.latency)
+
+        if path == "/robots.txt":
+            self._send(200, b"User-agent: *\nAllow: /\n", "text/plain")
+        elif path.startswith("/article/"):
+            self._send(200, article_html(int(path.rsplit("/", 1)[1] or 0)).encode("utf-8"), "text/html; charset=utf-8")
+        elif path.startswith("/clips/") and path.endswith(".wav"):
+            n = int(path[len("/clips/"):-len(".wav")] or 0)
+            clip = server.clips.get(n)
+            if clip is None:
+                clip = server.clips[n] = speech_like_clip(n, server.clip_seconds)
+            self._send(200, clip, "audio/wav")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+class FixtureServer(_Server):
+    """
+    Serves fixture articles and audio clips.
+
+    Args:
+        latency (float): Seconds added to every response (origin latency).
+        clip_seconds (float): Length of generated audio clips.
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, clip_seconds: float = 8.0):
+        super().__init__(_FixtureHandler, port)
+        self.latency = latency
+        self.clip_seconds = clip_seconds
+        self.clips = {}
+
+    def article_url(self, n: int) -> str:
+        return f"{self.url}/article/{n}"
+
+    def clip_url(self, n: int) -> str:
+        return f"{self.url}/clips/{n}.wav"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-port", type=int, default=8765)
+    parser.add_argument("--fixture-port", type=int, default=8766)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--fixture-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    llm = MockLLMServer(args.llm_port, args.llm_latency, args.llm_tokens_per_second, error_rate=args.llm_error_rate).start()
+    fixtures = FixtureServer(args.fixture_port, args.fixture_latency).start()
+    print(f"LLM:      {llm.chat_url}")
+    print(f"Articles: {fixtures.article_url(1)}")
+    print(f"Clips:    {fixtures.clip_url(1)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        llm.stop()
+        fixtures.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Measures parallel transcription speed-up against the number of worker
+processes.
+
+Usage (from backend/):
+    python -m benchmarks.transcribe_scaling path/to/audio.mp3 --model tiny --processes 1 2 4 8
+"""
+import argparse
+import os
+import time
+from audio_stream import SAMPLE_RATE, decode_audio_file
+from parallel_transcribe import transcribe_samples_parallel, warm_up_pool, shutdown_pools
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio", help="Audio file to transcribe")
+    parser.add_argument("--model", default="tiny", help="Whisper model size")
+    parser.add_argument("--processes", type=int, nargs="+", default=None, help="Process counts to try")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = args.processes or sorted({1, 2, 4, cores // 2 or 1, cores})
+    samples = decode_audio_file(args.audio)
+    duration = len(samples) / SAMPLE_RATE
+    print(f"Audio: {duration:.0f}s, model: {args.model}, cores: {cores}")
+    print(f"{'processes':>9} {'segments':>8} {'wall (s)':>9} {'RTF':>6} {'speed-up':>8}")
+
+    baseline = None
+    for processes in counts:
+        # Load the model in every worker so model loading isn't part of the measurement
+        warm_up_pool(args.model, processes)
+
+        started = time.perf_counter()
+        result = transcribe_samples_parallel(samples, args.model, processes)
+        elapsed = time.perf_counter() - started
+        shutdown_pools()
+
+        baseline = baseline or elapsed
+        print(f"{processes:>9} {result['chunks']:>8} {elapsed:>9.1f} {elapsed / duration:>6.3f} {baseline / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
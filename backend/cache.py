@@ -0,0 +1,288 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from db.database import SessionLocal
+from models import Summary
+from ai_pipeline.config import settings
+from logs import get_logger
+from metrics import CallbackMetric
+from compression import FallbackSummary
+
+log = get_logger(__name__)
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries also expire after a TTL.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+# url -> article text, (mode, url) -> summary, content hash -> summary
+article_cache = TTLCache("articles", settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+url_summary_cache = TTLCache("url_summaries", settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+hash_summary_cache = TTLCache("hash_summaries", settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+
+_db_stats = {"url_hits": 0, "url_misses": 0, "hash_hits": 0, "hash_misses": 0, "near_dup_hits": 0, "near_dup_misses": 0}
+_db_stats_lock = threading.Lock()
+
+def _count_db(key: str):
+    with _db_stats_lock:
+        _db_stats[key] += 1
+
+def normalize_text(text: str) -> str:
+    """
+    Collapses whitespace and case so trivially different copies of the same
+    article or transcript hash to the same key.
+    """
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def content_hash(text: str) -> str:
+    """
+    Returns the SHA-256 hex digest of the normalized text.
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def lookup_summary_by_url(url: str, mode: str):
+    """
+    Returns a recent summary of the source URL made in the given mode, or
+    None. A YouTube URL summarized as an article is not a transcript summary.
+
+    Checks the in-process cache first, then the newest Summary row for the
+    URL and mode that is younger than CACHE_DB_MAX_AGE_SECONDS.
+    """
+    if not settings.CACHE_ENABLED:
+        return None
+
+    summary = url_summary_cache.get((mode, url))
+    if summary is not None:
+        return summary
+
+    if settings.CACHE_DB_MAX_AGE_SECONDS <= 0:
+        return None
+
+    db = SessionLocal()
+    try:
+        fresh_after = datetime.utcnow() - timedelta(seconds=settings.CACHE_DB_MAX_AGE_SECONDS)
+        row = (
+            db.query(Summary.summary)
+            # Fallback stand-ins are saved without a content hash and never reused
+            .filter(Summary.source == url, Summary.mode == mode, Summary.created_at >= fresh_after, Summary.content_hash.isnot(None))
+            .order_by(Summary.id.desc())
+            .first()
+        )
+    finally:
+        db.close()
+
+    if row is None:
+        _count_db("url_misses")
+        return None
+
+    _count_db("url_hits")
+    url_summary_cache.set((mode, url), row.summary)
+    return row.summary
+
+def lookup_summary_by_hash(digest: str):
+    """
+    Returns the summary of previously seen identical content, or None.
+
+    Content-addressed entries never go stale: the same text always has the
+    same summary, so only the in-process tier expires.
+    """
+    if not settings.CACHE_ENABLED:
+        return None
+
+    summary = hash_summary_cache.get(digest)
+    if summary is not None:
+        return summary
+
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(Summary.summary)
+            .filter(Summary.content_hash == digest)
+            .order_by(Summary.id.desc())
+            .first()
+        )
+    finally:
+        db.close()
+
+    if row is None:
+        _count_db("hash_misses")
+        return None
+
+    _count_db("hash_hits")
+    hash_summary_cache.set(digest, row.summary)
+    return row.summary
+
+def lookup_summary_near_duplicate(text: str):
+    """
+    Returns the summary of stored content that is nearly identical to the
+    text (e.g. the same wire story on another outlet), or None.
+
+    Candidates come from the MinHash/LSH index in the ContentBands table and
+    must reach NEAR_DUP_THRESHOLD estimated Jaccard similarity.
+    """
+    if not (settings.CACHE_ENABLED and settings.NEAR_DUP_ENABLED):
+        return None
+
+    from db.content_store import find_near_duplicate  # content_store imports this module
+
+    db = SessionLocal()
+    try:
+        match = find_near_duplicate(db, text)
+        row = None
+        if match is not None:
+            row = (
+                db.query(Summary.summary)
+                .filter(Summary.content_id == match[0], Summary.content_hash.isnot(None))
+                .order_by(Summary.id.desc())
+                .first()
+            )
+    finally:
+        db.close()
+
+    if row is None:
+        _count_db("near_dup_misses")
+        return None
+
+    _count_db("near_dup_hits")
+    log.info("reused near-duplicate summary", content_id=match[0], similarity=round(match[1], 3))
+    return row.summary
+
+def remember_url_summary(url: str, mode: str, summary: str):
+    """
+    Stores the summary served for a URL in the given mode in the in-process tier.
+    """
+    if settings.CACHE_ENABLED and not isinstance(summary, FallbackSummary):
+        url_summary_cache.set((mode, url), str(summary))
+
+def remember_content_summary(content: str, summary: str):
+    """
+    Stores the summary of the content in the in-process content-hash tier.
+    """
+    if settings.CACHE_ENABLED and not isinstance(summary, FallbackSummary):
+        hash_summary_cache.set(content_hash(content), str(summary))
+
+def cached_fetch_news_content(url: str, fetch):
+    """
+    Returns the article text for the URL, downloading it with fetch(url) only
+    on a cache miss.
+    """
+    if not settings.CACHE_ENABLED:
+        return fetch(url)
+
+    text = article_cache.get(url)
+    if text is None:
+        text = fetch(url)
+        article_cache.set(url, text)
+    return text
+
+def cached_summarize_text(text: str, summarize):
+    """
+    Returns the summary for the text, calling summarize(text) only when no
+    summary of identical or near-duplicate content exists in memory or in
+    the database.
+    """
+    digest = content_hash(text)
+    summary = lookup_summary_by_hash(digest)
+    if summary is None:
+        summary = lookup_summary_near_duplicate(text)
+    if summary is None:
+        summary = summarize(text)
+        if settings.CACHE_ENABLED and not isinstance(summary, FallbackSummary):
+            hash_summary_cache.set(digest, str(summary))  # Plain text, so rows reusing it record no route
+    return summary
+
+def cache_stats() -> dict:
+    """
+    Hit/miss counters for every cache tier.
+    """
+    with _db_stats_lock:
+        db_stats = dict(_db_stats)
+    return {
+        "enabled": settings.CACHE_ENABLED,
+        "memory": {
+            cache.name: cache.stats()
+            for cache in (article_cache, url_summary_cache, hash_summary_cache)
+        },
+        "db": db_stats,
+    }
+
+def _memory_metric(field: str):
+    return lambda: {(cache.name,): cache.stats()[field] for cache in (article_cache, url_summary_cache, hash_summary_cache)}
+
+def _db_metric(kind: str):
+    def collect():
+        with _db_stats_lock:
+            return {
+                (lookup,): _db_stats[f"{lookup}_{kind}"]
+                for lookup in ("url", "hash", "near_dup")
+            }
+    return collect
+
+CallbackMetric("flashdigest_cache_hits_total", "In-process cache hits.", ("cache",), _memory_metric("hits"), kind="counter")
+CallbackMetric("flashdigest_cache_misses_total", "In-process cache misses.", ("cache",), _memory_metric("misses"), kind="counter")
+CallbackMetric("flashdigest_cache_hit_ratio", "In-process cache hit ratio since start.", ("cache",), _memory_metric("hit_rate"))
+CallbackMetric("flashdigest_cache_db_hits_total", "Summary lookups answered by the database.", ("lookup",), _db_metric("hits"), kind="counter")
+CallbackMetric("flashdigest_cache_db_misses_total", "Summary lookups the database could not answer.", ("lookup",), _db_metric("misses"), kind="counter")
@@ -0,0 +1,94 @@
+import re
+
+# Rough characters-per-token ratio for English text with Llama tokenizers
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate used for chunk sizing; avoids loading a tokenizer.
+    """
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+def split_sentences(text: str) -> list:
+    """
+    Splits text into sentences, falling back to lines for unpunctuated text
+    such as raw transcripts.
+    """
+    units = []
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            units.extend(s.strip() for s in _SENTENCE_END.split(paragraph) if s.strip())
+    return units
+
+def _split_oversized(unit: str, max_tokens: int) -> list:
+    # A single sentence (or an unpunctuated transcript) longer than a chunk is cut on word boundaries
+    words = unit.split()
+    pieces, current, current_tokens = [], [], 0
+    for word in words:
+        word_tokens = estimate_tokens(word + " ")
+        if current and current_tokens + word_tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += word_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def chunk_units(units: list, max_tokens: int, overlap_tokens: int = 0) -> list:
+    """
+    Packs sentences or transcript segments into chunks of at most max_tokens.
+
+    Each chunk after the first repeats the trailing units of the previous one,
+    up to overlap_tokens, so context isn't lost at chunk boundaries.
+
+    Args:
+        units (list): Sentences or segment texts, in order.
+        max_tokens (int): Token budget per chunk.
+        overlap_tokens (int): Tokens carried over between consecutive chunks.
+
+    Returns:
+        list: Chunk strings.
+    """
+    # An overlap close to the chunk size would make chunks advance one unit at a time
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    expanded = []
+    for unit in units:
+        if estimate_tokens(unit) > max_tokens:
+            expanded.extend(_split_oversized(unit, max_tokens))
+        else:
+            expanded.append(unit)
+
+    chunks = []
+    current, current_tokens = [], 0
+    for unit in expanded:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(" ".join(current))
+
+            # Carry the tail of this chunk into the next one
+            carried, carried_tokens = [], 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous)
+                if carried_tokens + previous_tokens > overlap_tokens or carried_tokens + previous_tokens + unit_tokens > max_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous_tokens
+            current, current_tokens = carried, carried_tokens
+
+        current.append(unit)
+        current_tokens += unit_tokens
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0) -> list:
+    """
+    Splits text into overlapping chunks on sentence boundaries.
+    """
+    return chunk_units(split_sentences(text), max_tokens, overlap_tokens)
@@ -0,0 +1,217 @@
+import re
+import numpy as np
+from chunking import estimate_tokens, split_sentences
+from ai_pipeline.config import settings
+from metrics import span, compression_tokens
+
+# Hashed TF-IDF dimensions; larger vocabularies share columns
+FEATURES = 4096
+# TextRank builds an n x n similarity matrix; longer inputs are scored by centrality alone
+TEXTRANK_MAX_SENTENCES = 2000
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 50
+# Sentences at least this similar to one already kept are treated as repeats
+REDUNDANCY_THRESHOLD = 0.8
+# Unpunctuated runs (some transcripts) are scored in windows of this many words
+MAX_SENTENCE_WORDS = 40
+LEAD_BONUS = 0.3  # News puts the key facts first; transcripts get no position bonus
+
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have he her his i if in into is it its me my no not of on "
+    "or our she so than that the their them then there these they this those to was we were what when which who "
+    "will with would you your".split()
+)
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Page furniture that survives newspaper's extraction
+_BOILERPLATE = re.compile(
+    r"^(?:advertisement|sponsored|related(?: articles| stories| content)?\b|read (?:more|next|also)\b|see also\b|"
+    r"(?:sign up|subscribe)\b|click here\b|follow us\b|share (?:this|on)\b|all rights reserved|copyright\b|©|"
+    r"image (?:source|caption)|photo(?:graph)?:|getty images|we use cookies|listen to this article|"
+    r"(?:continue|keep) reading\b|recommended\b|most (?:read|popular)\b)",
+    re.IGNORECASE,
+)
+# Hesitations and discourse markers Whisper writes out verbatim
+_FILLER_WORDS = re.compile(r"\b(?:u+h+m*|u+m+|e+r+m+|a+h+|hmm+|mhm+)\b[,.]?\s*", re.IGNORECASE)
+# Only at the start of a sentence: mid-sentence "right," or "well," is usually a real word
+_FILLER_PHRASES = re.compile(r"^\s*(?:(?:you know|i mean|sort of|kind of|like|so|well|okay|right),\s*)+", re.IGNORECASE)
+_REPEATED_WORDS = re.compile(r"\b(\w+)(?:[\s,]+\1\b)+", re.IGNORECASE)
+_OUTRO = re.compile(
+    r"thanks? (?:you )?(?:so much )?for watching|(?:like and |please |don'?t forget to )subscribe|hit the bell|"
+    r"see you (?:in the )?next (?:video|time)",
+    re.IGNORECASE,
+)
+
+def _normalize(sentence: str) -> str:
+    return " ".join(_WORD.findall(sentence.lower()))
+
+def _sentence_units(text: str):
+    for sentence in split_sentences(text):
+        words = sentence.split()
+        if len(words) <= MAX_SENTENCE_WORDS:
+            yield sentence
+        else:
+            for start in range(0, len(words), MAX_SENTENCE_WORDS):
+                yield " ".join(words[start:start + MAX_SENTENCE_WORDS])
+
+def clean_sentences(text: str, transcript: bool = False) -> list:
+    """
+    Splits text into sentences and drops the ones that carry no content:
+    page furniture and link fragments in articles; hesitations, stutters,
+    channel outros and repeated lines (a common Whisper failure) in
+    transcripts. Exact repeats are dropped from both.
+
+    Returns:
+        list: The remaining sentences, in order.
+    """
+    kept, seen = [], set()
+    for sentence in _sentence_units(text):
+        if transcript:
+            if _OUTRO.search(sentence):
+                continue
+            sentence = _FILLER_WORDS.sub("", sentence)
+            sentence = _FILLER_PHRASES.sub("", sentence)
+            sentence = _REPEATED_WORDS.sub(r"\1", sentence).strip(" ,")
+            if sentence:
+                sentence = sentence[0].upper() + sentence[1:]
+        elif _BOILERPLATE.match(sentence) or (len(sentence.split()) < 4 and sentence[-1:] not in ".!?\"'"):
+            continue  # Furniture, or a short unpunctuated fragment such as a link label
+
+        key = _normalize(sentence)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        kept.append(sentence)
+    return kept
+
+def _tfidf_matrix(sentences: list) -> np.ndarray:
+    """
+    L2-normalized TF-IDF rows, one per sentence, with sublinear term
+    frequencies and hashed vocabulary columns.
+    """
+    vocabulary = {}
+    rows, columns = [], []
+    for i, sentence in enumerate(sentences):
+        for word in _WORD.findall(sentence.lower()):
+            if word not in STOPWORDS:
+                rows.append(i)
+                columns.append(vocabulary.setdefault(word, len(vocabulary)) % FEATURES)
+
+    matrix = np.zeros((len(sentences), min(FEATURES, max(1, len(vocabulary)))), dtype=np.float32)
+    if rows:
+        np.add.at(matrix, (np.array(rows), np.array(columns)), 1.0)
+    np.log1p(matrix, out=matrix)
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    matrix *= (np.log((1 + len(sentences)) / (1 + document_frequency)) + 1).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def score_sentences(vectors: np.ndarray, transcript: bool = False) -> np.ndarray:
+    """
+    TextRank over the cosine-similarity graph of the sentences (power
+    iteration on the row-normalized matrix), or similarity to the document
+    centroid for very long inputs. Articles get a bonus for leading sentences.
+
+    Returns:
+        np.ndarray: One score per sentence, higher is more central.
+    """
+    n = len(vectors)
+    if n <= TEXTRANK_MAX_SENTENCES:
+        similarity = vectors @ vectors.T
+        np.fill_diagonal(similarity, 0)
+        np.clip(similarity, 0, None, out=similarity)
+        out_weight = similarity.sum(axis=1, keepdims=True)
+        transition = similarity / np.where(out_weight == 0, 1, out_weight)
+        scores = np.full(n, 1.0 / n, dtype=np.float32)
+        for _ in range(TEXTRANK_ITERATIONS):
+            updated = (1 - TEXTRANK_DAMPING) / n + TEXTRANK_DAMPING * (transition.T @ scores)
+            if np.abs(updated - scores).sum() < 1e-6:
+                scores = updated
+                break
+            scores = updated
+    else:
+        centroid = vectors.mean(axis=0)
+        scores = vectors @ centroid
+
+    scores = scores / (scores.max() or 1)
+    if not transcript:
+        scores = scores + LEAD_BONUS / (1 + np.arange(n))
+    return scores
+
+def select_sentences(sentences: list, max_tokens: int = None, max_sentences: int = None, transcript: bool = False) -> list:
+    """
+    Picks the highest-scoring sentences that fit the budget, skipping ones
+    that repeat a sentence already picked, and returns them in their
+    original order.
+
+    Args:
+        sentences (list): Cleaned sentences.
+        max_tokens (int, optional): Token budget for the selection.
+        max_sentences (int, optional): Sentence budget for the selection.
+        transcript (bool): Score without the lead-sentence bonus.
+    """
+    if not sentences:
+        return []
+    vectors = _tfidf_matrix(sentences)
+    scores = score_sentences(vectors, transcript)
+
+    picked, used = [], 0
+    for i in np.argsort(-scores, kind="stable"):
+        tokens = estimate_tokens(sentences[i]) + 1
+        if max_tokens is not None and used + tokens > max_tokens:
+            continue
+        if picked and float((vectors[picked] @ vectors[i]).max()) > REDUNDANCY_THRESHOLD:
+            continue
+        picked.append(int(i))
+        used += tokens
+        if max_sentences is not None and len(picked) >= max_sentences:
+            break
+    return [sentences[i] for i in sorted(picked)]
+
+def compress_text(text: str, transcript: bool = False) -> str:
+    """
+    Shrinks text before it is sent to the LLM: removes boilerplate or
+    filler, then keeps the most central sentences up to the token budget.
+
+    The budget is COMPRESSION_RATIO of the input, but never below
+    COMPRESSION_MIN_TOKENS (shorter inputs are only cleaned) or above
+    COMPRESSION_MAX_TOKENS, so compressed input fits in a single request.
+
+    Args:
+        text (str): Article text or transcript.
+        transcript (bool): Whisper output rather than an article.
+
+    Returns:
+        str: The compressed text.
+    """
+    with span("compress", transcript=transcript) as attributes:
+        input_tokens = estimate_tokens(text)
+        sentences = clean_sentences(text, transcript)
+        budget = min(settings.COMPRESSION_MAX_TOKENS, max(settings.COMPRESSION_MIN_TOKENS, int(input_tokens * settings.COMPRESSION_RATIO)))
+        if sum(estimate_tokens(s) + 1 for s in sentences) > budget:
+            sentences = select_sentences(sentences, max_tokens=budget, transcript=transcript)
+        compressed = " ".join(sentences) or text
+        output_tokens = estimate_tokens(compressed)
+        attributes.update(input_tokens=input_tokens, output_tokens=output_tokens)
+    compression_tokens.inc(input_tokens, kind="input")
+    compression_tokens.inc(output_tokens, kind="output")
+    return compressed
+
+def extractive_summary(text: str, transcript: bool = False, max_sentences: int = None) -> str:
+    """
+    Summarizes without an LLM: the EXTRACTIVE_SENTENCES most central
+    sentences of the cleaned text, in their original order.
+    """
+    with span("extract", transcript=transcript):
+        sentences = clean_sentences(text, transcript)
+        picked = select_sentences(sentences, max_sentences=max_sentences or settings.EXTRACTIVE_SENTENCES, transcript=transcript)
+        return " ".join(picked) or text[:1000]
+
+class FallbackSummary(str):
+    """
+    An extractive summary served because the LLM was unavailable. Caches
+    skip it, so the content gets a real summary once the LLM recovers.
+    """
+
+    route = "extractive-fallback"
@@ -1,7 +1,21 @@
 from db.database import engine
-from models import Summary
+from models import Summary, Content, ContentBand, Transcript, TranscriptSegmentBlock, Job, PipelineLock
+from db.search import ensure_search_index
+from db.migrations import migrate_schema
 
-# Create the Summaries table if it doesn't exist
+# Create the Contents, Summaries, Transcripts, TranscriptSegments, Jobs and PipelineLocks tables if they don't exist
+Content.__table__.create(bind=engine, checkfirst=True)
+ContentBand.__table__.create(bind=engine, checkfirst=True)
 Summary.__table__.create(bind=engine, checkfirst=True)
+Transcript.__table__.create(bind=engine, checkfirst=True)
+TranscriptSegmentBlock.__table__.create(bind=engine, checkfirst=True)
+Job.__table__.create(bind=engine, checkfirst=True)
+PipelineLock.__table__.create(bind=engine, checkfirst=True)
 
-print("✅ Table checked/created successfully.")
+# Columns added to tables created by earlier versions
+migrate_schema(engine)
+
+# Full-text search index (tsvector GIN on Postgres, FTS5 on SQLite)
+ensure_search_index(engine)
+
+print("✅ Tables checked/created successfully.")
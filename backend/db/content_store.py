@@ -0,0 +1,179 @@
+# content_store.py
+import zlib
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import Summary, Content, ContentBand
+from cache import content_hash
+from dedup import minhash_signature, band_keys, estimate_similarity, signature_to_bytes, signature_from_bytes
+from ai_pipeline.config import settings
+from logs import get_logger
+
+log = get_logger(__name__)
+
+MAX_CANDIDATES = 50  # Signatures compared per near-duplicate lookup
+
+def encode_body(text: str):
+    """
+    Returns (body, compression) for storing text in the Contents table.
+    """
+    data = text.encode("utf-8")
+    if settings.CONTENT_COMPRESSION == "zlib":
+        return zlib.compress(data, 6), "zlib"
+    return data, None
+
+def decode_body(body: bytes, compression: str) -> str:
+    if compression == "zlib":
+        body = zlib.decompress(body)
+    return body.decode("utf-8")
+
+def _content_row(digest: str, text: str) -> dict:
+    body, compression = encode_body(text)
+    signature = minhash_signature(text)
+    return {
+        "content_hash": digest,
+        "body": body,
+        "compression": compression,
+        "length": len(text),
+        "minhash": signature_to_bytes(signature),
+    }, signature
+
+def _insert_contents(db: Session, rows: list, texts: dict):
+    from db.search import index_contents  # search imports this module
+
+    values = [row for row, _ in rows]
+    result_ids = {}
+    db.execute(insert(Content), values)
+    for digest, content_id in db.execute(
+        select(Content.content_hash, Content.id).where(Content.content_hash.in_([v["content_hash"] for v in values]))
+    ):
+        result_ids[digest] = content_id
+
+    bands = [
+        {"band_key": key, "content_id": result_ids[row["content_hash"]]}
+        for row, signature in rows
+        for key in set(band_keys(signature))
+    ]
+    if bands:
+        db.execute(insert(ContentBand), bands)
+    index_contents(db, {result_ids[row["content_hash"]]: texts[row["content_hash"]] for row, _ in rows})
+    return result_ids
+
+def store_contents(db: Session, texts: list) -> dict:
+    """
+    Makes sure every text is stored once in the Contents table, together
+    with its MinHash signature, LSH band keys and search index entry. Does
+    not commit.
+
+    Args:
+        db (Session): SQLAlchemy session object.
+        texts (list): Article or transcript texts; duplicates are fine.
+
+    Returns:
+        dict: content hash -> Contents.id for every input text.
+    """
+    by_hash = {}
+    for text in texts:
+        by_hash.setdefault(content_hash(text), text)
+
+    ids = dict(db.execute(select(Content.content_hash, Content.id).where(Content.content_hash.in_(list(by_hash)))).all())
+    missing = [_content_row(digest, text) for digest, text in by_hash.items() if digest not in ids]
+    if not missing:
+        return ids
+
+    try:
+        with db.begin_nested():
+            ids.update(_insert_contents(db, missing, by_hash))
+    except IntegrityError:
+        # Another writer stored some of the same content first; insert the rest one by one
+        for row in missing:
+            digest = row[0]["content_hash"]
+            try:
+                with db.begin_nested():
+                    ids.update(_insert_contents(db, [row], by_hash))
+            except IntegrityError:
+                ids[digest] = db.execute(select(Content.id).where(Content.content_hash == digest)).scalar_one()
+    return ids
+
+def store_content(db: Session, text: str) -> int:
+    """
+    Stores one text (if new) and returns its Contents.id. Does not commit.
+    """
+    return store_contents(db, [text])[content_hash(text)]
+
+def load_content(db: Session, content_id: int):
+    """
+    Returns the decompressed text for a Contents row, or None.
+    """
+    row = db.execute(select(Content.body, Content.compression).where(Content.id == content_id)).first()
+    return decode_body(row.body, row.compression) if row else None
+
+def find_near_duplicate(db: Session, text: str):
+    """
+    Looks for stored content whose estimated Jaccard similarity with the text
+    is at least NEAR_DUP_THRESHOLD, using the LSH band index to avoid
+    comparing against every stored document.
+
+    Returns:
+        tuple: (content_id, similarity) of the closest match, or None.
+    """
+    if len(text.split()) < settings.NEAR_DUP_MIN_WORDS:
+        return None
+
+    signature = minhash_signature(text)
+    candidates = db.execute(
+        select(ContentBand.content_id)
+        .where(ContentBand.band_key.in_(band_keys(signature)))
+        .distinct()
+        .order_by(ContentBand.content_id.desc())
+        .limit(MAX_CANDIDATES)
+    ).scalars().all()
+    if not candidates:
+        return None
+
+    best = None
+    for content_id, minhash in db.execute(select(Content.id, Content.minhash).where(Content.id.in_(candidates))):
+        if minhash is None:
+            continue
+        similarity = estimate_similarity(signature, signature_from_bytes(minhash))
+        if similarity >= settings.NEAR_DUP_THRESHOLD and (best is None or similarity > best[1]):
+            best = (content_id, similarity)
+    return best
+
+def backfill_contents(db: Session, batch_size: int = 500) -> int:
+    """
+    Moves inline Summaries.content text written before the Contents table
+    existed into Contents, pointing each row at its shared copy.
+
+    Returns:
+        int: Number of summaries migrated.
+    """
+    migrated = 0
+    while True:
+        rows = db.execute(
+            select(Summary.id, Summary.content)
+            .where(Summary.content_id.is_(None), Summary.content.isnot(None))
+            .order_by(Summary.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return migrated
+
+        ids = store_contents(db, [row.content for row in rows])
+        for row in rows:
+            digest = content_hash(row.content)
+            db.query(Summary).filter(Summary.id == row.id).update(
+                {"content_id": ids[digest], "content_hash": digest, "content": None}, synchronize_session=False
+            )
+        db.commit()
+        migrated += len(rows)
+        log.info("moved inline content into Contents", summaries=migrated)
+
+if __name__ == "__main__":
+    from db.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        backfill_contents(session)
+    finally:
+        session.close()
@@ -1,17 +1,27 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from ai_pipeline.config import settings  # Loads the .env file
 
 # Read PostgreSQL database URL from environment variables
-DATABASE_URL = os.getenv("DATABASE_URL")  # Ensure you have DATABASE_URL in your .env file
+DATABASE_URL = settings.DATABASE_URL  # Ensure you have DATABASE_URL in your .env file
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "echo": settings.DB_ECHO,  # Logs every statement; only enable for debugging
+        "pool_pre_ping": True,  # Transparently replace connections dropped by the server
+    }
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        )
+    return options
 
-# Initialize the database engine with error logging (echo=True helps with debugging)
-engine = create_engine(DATABASE_URL, echo=True)
+# Initialize the database engine with an explicitly sized connection pool
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 
 # Create a SessionLocal class for database session management
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
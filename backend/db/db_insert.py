@@ -1,33 +1,184 @@
 # db_insert.py
+import threading
+import time
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from models import Summary  # Assuming you're using a relative import for the Summary model
+from cache import content_hash
+from compression import FallbackSummary
+from db.content_store import store_contents
+from db.segments import store_segments
+from ai_pipeline.config import settings
+from logs import get_logger
+from metrics import span
 
-def save_summary_to_db(db: Session, source: str, content: str, summary: str):
+log = get_logger(__name__)
+
+def _summary_row(source: str, content: str, summary: str, content_ids: dict, mode: str = None) -> dict:
+    # Sentiment is hardcoded as "NEUTRAL"
+    digest = content_hash(content)
+    return {
+        "source": source,
+        "content_id": content_ids[digest],  # Text lives once in the Contents table
+        "summary": str(summary),
+        "language": "English",  # Assuming the content is always in English
+        "sentiment": "NEUTRAL",  # Sentiment is now always neutral
+        # Lets identical content reuse this summary; stand-ins served while the LLM was down are not reused
+        "content_hash": None if isinstance(summary, FallbackSummary) else digest,
+        "route": getattr(summary, "route", None),
+        "mode": mode,
+    }
+
+def _store_timed_contents(db: Session, contents: list, content_ids: dict):
+    # Transcripts carrying Whisper segments (transcription.TimedTranscript) keep them next to their text
+    for content in contents:
+        segments = getattr(content, "segments", None)
+        if segments:
+            store_segments(db, content_ids[content_hash(content)], segments)
+
+def save_summary_to_db(db: Session, source: str, content: str, summary: str, mode: str = None, commit: bool = True):
     """
     Save a news summary with a neutral sentiment to the database.
 
+    The row is not refreshed after the insert; nothing reads it back, and the
+    refresh cost an extra SELECT per request. The content itself is stored
+    once in the Contents table and shared by every summary of it.
+
     Args:
         db (Session): SQLAlchemy session object.
         source (str): URL or description of the source.
         content (str): Original content (article text or raw text).
         summary (str): AI-generated summary of the content.
+        mode (str, optional): Pipeline mode that produced the summary.
+        commit (bool): Commit right away. Pass False to leave the insert in the
+            caller's transaction.
     """
-    # Sentiment is hardcoded as "NEUTRAL"
-    new_summary = Summary(
-        source=source,
-        content=content,
-        summary=summary,
-        language="English",  # Assuming the content is always in English
-        sentiment="NEUTRAL"  # Sentiment is now always neutral
-    )
-
     try:
-        db.add(new_summary)
-        db.commit()  # Commit the new summary to the database
-        db.refresh(new_summary)  # Refresh to get the latest changes
-        print(f"✅ Summary from '{source}' saved successfully with sentiment: NEUTRAL")
+        with span("db_write", rows=1):
+            content_ids = store_contents(db, [content])
+            _store_timed_contents(db, [content], content_ids)
+            new_summary = Summary(**_summary_row(source, content, summary, content_ids, mode))
+            db.add(new_summary)
+            if commit:
+                db.commit()  # The request's single commit
+            else:
+                db.flush()
+        log.info("summary saved", source=source)
     except Exception as e:
         db.rollback()  # Rollback in case of any errors
-        print(f"❌ Error while saving summary: {e}")
+        log.error("summary save failed", source=source, error=str(e))
         return False  # Return false indicating failure
     return True  # Return true indicating success
+
+def save_summaries_bulk(db: Session, rows: list) -> int:
+    """
+    Save many summaries in a single transaction with one executemany INSERT.
+
+    Args:
+        db (Session): SQLAlchemy session object.
+        rows (list): Dicts with 'source', 'content' and 'summary' keys, and
+            optionally 'mode'.
+
+    Returns:
+        int: Number of rows written. Raises on failure after rolling back.
+    """
+    if not rows:
+        return 0
+
+    try:
+        with span("db_write", rows=len(rows)):
+            content_ids = store_contents(db, [row["content"] for row in rows])
+            _store_timed_contents(db, [row["content"] for row in rows], content_ids)
+            values = [_summary_row(row["source"], row["content"], row["summary"], content_ids, row.get("mode")) for row in rows]
+            db.execute(insert(Summary), values)
+            db.commit()  # One commit for the whole batch
+    except Exception:
+        db.rollback()
+        raise
+    return len(values)
+
+class BufferedSummaryWriter:
+    """
+    Collects summaries from any number of threads and writes them with
+    save_summaries_bulk once batch_size rows are buffered or flush_seconds
+    have passed since the oldest buffered row.
+
+    Use it for batch jobs where per-row commits dominate; call close() (or
+    use it as a context manager) to write whatever is still buffered.
+    """
+
+    def __init__(self, session_factory, batch_size: int = None, flush_seconds: float = None, on_flush=None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.DB_WRITE_BATCH_SIZE
+        self.flush_seconds = flush_seconds if flush_seconds is not None else settings.DB_WRITE_FLUSH_SECONDS
+        self.on_flush = on_flush  # Called with (rows, error) after each flush
+        self.written = 0
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = threading.Thread(target=self._flush_periodically, name="summary-writer", daemon=True)
+        self._timer.start()
+
+    def add(self, source: str, content: str, summary: str, mode: str = None, **fields):
+        """
+        Buffers one summary; flushes in the calling thread once the buffer is
+        full, which holds back producers while the database catches up.
+
+        Args:
+            **fields: Kept with the row and handed back to on_flush, e.g. the
+                caller's own item index.
+        """
+        with self._lock:
+            if self._closed.is_set():
+                raise RuntimeError("BufferedSummaryWriter is closed.")
+            self._buffer.append(dict(fields, source=source, content=content, summary=summary, mode=mode))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    @property
+    def buffered(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer, self._oldest = self._buffer, [], None
+        if not rows:
+            return
+
+        # Serialize writes so batches commit in the order they were taken
+        with self._write_lock:
+            db = self.session_factory()
+            error = None
+            try:
+                self.written += save_summaries_bulk(db, rows)
+            except Exception as e:
+                error = e
+                log.error("bulk write failed", rows=len(rows), error=str(e))
+            finally:
+                db.close()
+        if self.on_flush is not None:
+            self.on_flush(rows, error)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(timeout=max(0.05, self.flush_seconds / 4)):
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.flush_seconds
+            if due:
+                self.flush()
+
+    def close(self):
+        self._closed.set()
+        self._timer.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
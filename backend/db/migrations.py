@@ -0,0 +1,125 @@
+# migrations.py
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from models import Base, Content, ContentBand, Summary, Transcript, TranscriptSegmentBlock
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Columns added to tables that existing deployments created earlier, as
+# (table, column). They must be nullable: rows written before the column
+# existed get NULL.
+ADDED_COLUMNS = [
+    ("Summaries", "content_hash"),
+    ("Summaries", "created_at"),
+    ("Summaries", "content_id"),
+    ("Summaries", "route"),
+    ("Summaries", "mode"),
+    ("Transcripts", "audio_envelope"),
+    ("Jobs", "peak_rss_mb"),
+    ("Jobs", "client"),
+]
+
+# NOT NULL columns that became nullable, as (table, column)
+NULLABLE_COLUMNS = [
+    ("Summaries", "content"),  # Text moved to the Contents table
+]
+
+def ensure_summary_tables(bind):
+    """
+    Creates the tables the summarize and transcribe paths write to, if they
+    don't exist yet, so a fresh database works without create_table_test.py.
+    """
+    for model in (Content, ContentBand, Summary, Transcript, TranscriptSegmentBlock):
+        model.__table__.create(bind=bind, checkfirst=True)
+
+def _column_ddl(bind, column) -> str:
+    preparer = bind.dialect.identifier_preparer
+    ddl = f"{preparer.quote(column.name)} {column.type.compile(dialect=bind.dialect)}"
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f" REFERENCES {preparer.quote(target.table.name)} ({preparer.quote(target.name)})"
+    return ddl
+
+def _add_column(bind, table, column):
+    preparer = bind.dialect.identifier_preparer
+    if_not_exists = "IF NOT EXISTS " if bind.dialect.name == "postgresql" else ""
+    statement = f"ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {if_not_exists}{_column_ddl(bind, column)}"
+    try:
+        with bind.begin() as conn:
+            conn.execute(text(statement))
+    except (OperationalError, ProgrammingError):
+        # Another worker starting at the same time may have added it first
+        if column.name not in {c["name"] for c in inspect(bind).get_columns(table.name)}:
+            raise
+    log.info("column added", table=table.name, column=column.name)
+
+def _drop_not_null(bind, table, column):
+    preparer = bind.dialect.identifier_preparer
+    if bind.dialect.name != "sqlite":
+        with bind.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {preparer.quote(table.name)} ALTER COLUMN {preparer.quote(column.name)} DROP NOT NULL"))
+    else:
+        _rebuild_sqlite_table(bind, table)
+    log.info("column made nullable", table=table.name, column=column.name)
+
+def _rebuild_sqlite_table(bind, table):
+    """
+    SQLite can't change a column constraint in place: the rows are copied
+    into a new table created from the model, keeping their ids.
+    """
+    name = table.name
+    old = f"{name}_old"
+    with bind.connect() as conn:
+        # Immediate: a second worker waits here, then sees the new table and stops
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            inspector = inspect(conn)
+            current = {c["name"]: c for c in inspector.get_columns(name)}
+            if all(current[c.name]["nullable"] or not c.nullable for c in table.columns if c.name in current):
+                conn.rollback()
+                return
+            for trigger in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (name,)).scalars().all():
+                conn.exec_driver_sql(f'DROP TRIGGER "{trigger}"')
+            for index in inspector.get_indexes(name):
+                conn.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+            conn.exec_driver_sql(f'ALTER TABLE "{name}" RENAME TO "{old}"')
+            table.create(bind=conn)  # With the model's indexes
+            columns = ", ".join(f'"{c}"' for c in current if c in table.c)
+            conn.exec_driver_sql(f'INSERT INTO "{name}" ({columns}) SELECT {columns} FROM "{old}"')
+            conn.exec_driver_sql(f'DROP TABLE "{old}"')
+            if name == "Summaries" and inspect(conn).has_table("Summaries_fts"):
+                # The copy went through the insert trigger; rebuild rather than keep doubled entries
+                conn.exec_driver_sql('INSERT INTO "Summaries_fts"("Summaries_fts") VALUES (\'rebuild\')')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+def migrate_schema(bind):
+    """
+    Brings tables created by earlier versions up to date: adds the columns
+    listed in ADDED_COLUMNS and the indexes declared on them, and drops NOT
+    NULL from the columns in NULLABLE_COLUMNS. Idempotent,
+    so every worker runs it at startup; tables that don't exist yet are
+    skipped (create_all or the table's ensure_* function creates them
+    complete).
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    for table_name in sorted({table for table, _ in ADDED_COLUMNS} & existing_tables):
+        table = Base.metadata.tables[table_name]
+        present = {c["name"] for c in inspector.get_columns(table_name)}
+        for name in (column for t, column in ADDED_COLUMNS if t == table_name):
+            if name not in present:
+                _add_column(bind, table, table.c[name])
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+    for table_name, name in NULLABLE_COLUMNS:
+        if table_name not in existing_tables:
+            continue
+        column = next(c for c in inspect(bind).get_columns(table_name) if c["name"] == name)
+        if not column["nullable"]:
+            table = Base.metadata.tables[table_name]
+            _drop_not_null(bind, table, table.c[name])
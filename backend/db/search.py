@@ -0,0 +1,232 @@
+from datetime import datetime
+from sqlalchemy import event, inspect, or_, select, text
+from sqlalchemy.orm import Session
+from models import Summary, Content
+from db.content_store import decode_body, load_content
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Must match the indexed expression exactly for Postgres to use the GIN index
+PG_SEARCH_VECTOR = "to_tsvector('english', coalesce(summary, '') || ' ' || coalesce(content, ''))"
+
+PG_SEARCH_INDEX = f'CREATE INDEX IF NOT EXISTS "ix_Summaries_search" ON "Summaries" USING gin ({PG_SEARCH_VECTOR})'
+
+# External-content FTS5 table kept in sync with Summaries by triggers
+SQLITE_FTS_STATEMENTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS "Summaries_fts"
+       USING fts5(summary, content, content='Summaries', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS "Summaries_fts_ai" AFTER INSERT ON "Summaries" BEGIN
+         INSERT INTO "Summaries_fts"(rowid, summary, content) VALUES (new.id, new.summary, new.content);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS "Summaries_fts_ad" AFTER DELETE ON "Summaries" BEGIN
+         INSERT INTO "Summaries_fts"("Summaries_fts", rowid, summary, content) VALUES ('delete', old.id, old.summary, old.content);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS "Summaries_fts_au" AFTER UPDATE ON "Summaries" BEGIN
+         INSERT INTO "Summaries_fts"("Summaries_fts", rowid, summary, content) VALUES ('delete', old.id, old.summary, old.content);
+         INSERT INTO "Summaries_fts"(rowid, summary, content) VALUES (new.id, new.summary, new.content);
+       END""",
+]
+
+# Contents bodies are compressed, so their index is fed by the application:
+# a contentless FTS5 table on SQLite, a table of stripped tsvectors on Postgres.
+SQLITE_CONTENT_FTS = 'CREATE VIRTUAL TABLE IF NOT EXISTS "Contents_fts" USING fts5(body, content=\'\')'
+SQLITE_CONTENT_INSERT = 'INSERT INTO "Contents_fts"(rowid, body) VALUES (:id, :body)'
+SQLITE_CONTENT_MATCH = 'SELECT rowid FROM "Contents_fts" WHERE "Contents_fts" MATCH :q'
+
+PG_CONTENT_STATEMENTS = [
+    """CREATE TABLE IF NOT EXISTS "ContentsSearch" (
+         content_id INTEGER PRIMARY KEY REFERENCES "Contents" (id),
+         vector tsvector NOT NULL
+       )""",
+    'CREATE INDEX IF NOT EXISTS "ix_ContentsSearch_vector" ON "ContentsSearch" USING gin (vector)',
+]
+# Positions are stripped to stay under the 1 MB tsvector limit on long transcripts
+PG_CONTENT_INSERT = (
+    'INSERT INTO "ContentsSearch" (content_id, vector) '
+    "VALUES (:id, strip(to_tsvector('english', :body))) ON CONFLICT (content_id) DO NOTHING"
+)
+PG_CONTENT_MATCH = 'SELECT content_id FROM "ContentsSearch" WHERE vector @@ plainto_tsquery(\'english\', :q)'
+
+CONTENT_INDEX_TABLES = {"postgresql": "ContentsSearch", "sqlite": "Contents_fts"}
+
+def index_contents(db: Session, texts: dict):
+    """
+    Adds newly stored Contents rows to the content search index. Does
+    nothing if the index hasn't been created yet; ensure_search_index fills
+    it from the table when it is. Does not commit.
+
+    Args:
+        db (Session): SQLAlchemy session object.
+        texts (dict): Contents.id -> uncompressed text.
+    """
+    bind = db.get_bind()
+    table = CONTENT_INDEX_TABLES.get(bind.dialect.name)
+    if not texts or table is None or not inspect(db.connection()).has_table(table):
+        return
+    statement = PG_CONTENT_INSERT if bind.dialect.name == "postgresql" else SQLITE_CONTENT_INSERT
+    db.execute(text(statement), [{"id": content_id, "body": body} for content_id, body in texts.items()])
+
+def _create_content_index(conn) -> bool:
+    # Returns True if the index was created just now and still has to be filled
+    dialect = conn.dialect.name
+    if dialect not in CONTENT_INDEX_TABLES:
+        return False
+    existed = inspect(conn).has_table(CONTENT_INDEX_TABLES[dialect])
+    for statement in PG_CONTENT_STATEMENTS if dialect == "postgresql" else [SQLITE_CONTENT_FTS]:
+        conn.execute(text(statement))
+    return not existed
+
+def _fill_content_index(conn, batch_size: int = 200):
+    statement = PG_CONTENT_INSERT if conn.dialect.name == "postgresql" else SQLITE_CONTENT_INSERT
+    last_id, indexed = 0, 0
+    while True:
+        rows = conn.execute(
+            select(Content.id, Content.body, Content.compression).where(Content.id > last_id).order_by(Content.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        conn.execute(text(statement), [{"id": row.id, "body": decode_body(row.body, row.compression)} for row in rows])
+        last_id = rows[-1].id
+        indexed += len(rows)
+    if indexed:
+        log.info("indexed stored contents for search", contents=indexed)
+
+def ensure_search_index(bind):
+    """
+    Creates the full-text index for the current database if it is missing:
+    a tsvector GIN index on Postgres, an FTS5 table plus sync triggers on
+    SQLite (rebuilt from existing rows when first created). Does nothing
+    if the Summaries table doesn't exist yet; creating it builds the index.
+
+    The Contents text index is created as well, and filled from the stored
+    contents when it is new.
+    """
+    if not inspect(bind).has_table(Summary.__tablename__):
+        return
+    dialect = bind.dialect.name
+    with bind.begin() as conn:
+        if inspect(conn).has_table(Content.__tablename__) and _create_content_index(conn):
+            _fill_content_index(conn)
+        if dialect == "postgresql":
+            conn.execute(text(PG_SEARCH_INDEX))
+        elif dialect == "sqlite":
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Summaries_fts'")
+            ).first()
+            for statement in SQLITE_FTS_STATEMENTS:
+                conn.execute(text(statement))
+            if not existed:
+                conn.execute(text('INSERT INTO "Summaries_fts"("Summaries_fts") VALUES (\'rebuild\')'))
+
+@event.listens_for(Content.__table__, "after_create")
+def _create_content_search_index(target, connection, **kw):
+    _create_content_index(connection)
+
+@event.listens_for(Summary.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(PG_SEARCH_INDEX))
+    elif connection.dialect.name == "sqlite":
+        for statement in SQLITE_FTS_STATEMENTS:
+            connection.execute(text(statement))
+
+def _fts5_query(q: str) -> str:
+    # Quote every term so user input can't inject FTS5 query syntax
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in q.split())
+
+def list_summaries(db: Session, limit: int = 20, before_id: int = None, source: str = None,
+                   q: str = None, since: datetime = None, until: datetime = None) -> dict:
+    """
+    Returns one page of stored summaries, newest first.
+
+    Full-text search covers summaries, inline content of older rows and
+    the Contents text, which is indexed separately since it is stored
+    compressed. A summary matches if all terms are in its summary or all
+    are in its content.
+
+    Pagination is keyset-based on the primary key: pass the returned
+    next_cursor as before_id to get the following page, which costs the
+    same index range scan no matter how deep the page is.
+
+    Args:
+        db (Session): SQLAlchemy session object.
+        limit (int): Page size.
+        before_id (int, optional): Only return summaries with a smaller id.
+        source (str, optional): Exact source URL.
+        q (str, optional): Full-text query over summary and content.
+        since (datetime, optional): Only summaries created at or after this time.
+        until (datetime, optional): Only summaries created before this time.
+
+    Returns:
+        dict: 'items' and 'next_cursor' (None on the last page).
+    """
+    query = db.query(
+        Summary.id, Summary.source, Summary.summary, Summary.language, Summary.sentiment, Summary.created_at
+    )
+    if before_id is not None:
+        query = query.filter(Summary.id < before_id)
+    if source:
+        query = query.filter(Summary.source == source)
+    if since is not None:
+        query = query.filter(Summary.created_at >= since)
+    if until is not None:
+        query = query.filter(Summary.created_at < until)
+
+    if q and q.strip():
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            query = query.filter(or_(
+                text(f"{PG_SEARCH_VECTOR} @@ plainto_tsquery('english', :q)"),
+                Summary.content_id.in_(text(PG_CONTENT_MATCH)),
+            )).params(q=q)
+        elif dialect == "sqlite":
+            query = query.filter(or_(
+                Summary.id.in_(text('SELECT rowid FROM "Summaries_fts" WHERE "Summaries_fts" MATCH :q')),
+                Summary.content_id.in_(text(SQLITE_CONTENT_MATCH)),
+            )).params(q=_fts5_query(q))
+        else:
+            pattern = f"%{q.strip()}%"
+            query = query.filter(Summary.summary.ilike(pattern) | Summary.content.ilike(pattern))
+
+    rows = query.order_by(Summary.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "source": row.source,
+                "summary": row.summary,
+                "language": row.language,
+                "sentiment": row.sentiment,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+            }
+            for row in rows
+        ],
+        "next_cursor": rows[-1].id if has_more else None,
+    }
+
+def get_summary(db: Session, summary_id: int, include_content: bool = True):
+    """
+    Returns one summary including its full content, or None.
+
+    Args:
+        include_content (bool): Pass False to skip loading and decompressing
+            the content (a long transcript can be megabytes); use the
+            transcript segment endpoints to read parts of it instead.
+    """
+    row = db.get(Summary, summary_id)
+    if row is None:
+        return None
+    return {
+        "id": row.id,
+        "source": row.source,
+        "content": (row.content if row.content_id is None else load_content(db, row.content_id)) if include_content else None,
+        "summary": row.summary,
+        "language": row.language,
+        "sentiment": row.sentiment,
+        "route": row.route,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
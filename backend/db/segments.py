@@ -0,0 +1,129 @@
+# segments.py
+import numpy as np
+from sqlalchemy import insert, select, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import Summary, TranscriptSegmentBlock
+from ai_pipeline.config import settings
+
+def _block_row(content_id: int, block: int, segments: list) -> dict:
+    return {
+        "content_id": content_id,
+        "block": block,
+        "start_seconds": float(segments[0]["start"]),
+        "end_seconds": float(segments[-1]["end"]),
+        "segment_count": len(segments),
+        "starts": np.asarray([s["start"] for s in segments], dtype="<f4").tobytes(),
+        "ends": np.asarray([s["end"] for s in segments], dtype="<f4").tobytes(),
+        "text": "\n".join(" ".join(s["text"].split()) for s in segments),
+    }
+
+def _decode_block(row) -> list:
+    starts = np.frombuffer(row.starts, dtype="<f4")
+    ends = np.frombuffer(row.ends, dtype="<f4")
+    return [
+        {"start": round(float(start), 3), "end": round(float(end), 3), "text": text}
+        for start, end, text in zip(starts, ends, row.text.split("\n"))
+    ]
+
+def store_segments(db: Session, content_id: int, segments: list) -> bool:
+    """
+    Stores the timed segments of a transcript once per Contents row, in
+    blocks of TRANSCRIPT_SEGMENT_BLOCK. Does nothing if they are already
+    stored. Does not commit.
+
+    Args:
+        db (Session): SQLAlchemy session object.
+        content_id (int): Contents row holding the transcript text.
+        segments (list): Dicts with 'start', 'end' (seconds) and 'text', in order.
+
+    Returns:
+        bool: True if blocks were written.
+    """
+    segments = [s for s in segments or [] if s["text"].strip()]
+    if not settings.TRANSCRIPT_SEGMENTS_ENABLED or not segments:
+        return False
+    if _has_segments(db, content_id):
+        return False
+
+    size = max(1, settings.TRANSCRIPT_SEGMENT_BLOCK)
+    rows = [_block_row(content_id, i // size, segments[i:i + size]) for i in range(0, len(segments), size)]
+    try:
+        with db.begin_nested():
+            db.execute(insert(TranscriptSegmentBlock), rows)
+    except IntegrityError:
+        return False  # Stored concurrently by another writer
+    return True
+
+def _has_segments(db: Session, content_id: int) -> bool:
+    query = select(TranscriptSegmentBlock.id).where(TranscriptSegmentBlock.content_id == content_id).limit(1)
+    return db.execute(query).first() is not None
+
+def _content_id(db: Session, summary_id: int):
+    # Content of the summary, if its transcript has stored segments
+    content_id = db.execute(select(Summary.content_id).where(Summary.id == summary_id)).scalar_one_or_none()
+    return content_id if content_id is not None and _has_segments(db, content_id) else None
+
+def load_segments(db: Session, summary_id: int, start: float = None, end: float = None):
+    """
+    Returns the transcript segments of a summary overlapping [start, end],
+    reading only the blocks that cover the range.
+
+    Args:
+        db (Session): SQLAlchemy session object.
+        summary_id (int): Summary of a transcribed video.
+        start (float, optional): Seconds from the beginning of the audio.
+        end (float, optional): Seconds; defaults to the end of the transcript.
+
+    Returns:
+        list: Segments with 'start', 'end' and 'text', or None if the
+        summary has no stored segments.
+    """
+    content_id = _content_id(db, summary_id)
+    if content_id is None:
+        return None
+    query = select(TranscriptSegmentBlock).where(TranscriptSegmentBlock.content_id == content_id)
+    if start is not None:
+        query = query.where(TranscriptSegmentBlock.end_seconds >= start)
+    if end is not None:
+        query = query.where(TranscriptSegmentBlock.start_seconds <= end)
+    blocks = db.execute(query.order_by(TranscriptSegmentBlock.block)).scalars().all()
+    return [
+        segment
+        for block in blocks
+        for segment in _decode_block(block)
+        if (start is None or segment["end"] >= start) and (end is None or segment["start"] <= end)
+    ]
+
+def search_segments(db: Session, summary_id: int, q: str, limit: int = 20):
+    """
+    Finds the segments of a summary's transcript containing the phrase q
+    (case-insensitive). The database narrows the search to matching blocks,
+    so only those are read.
+
+    Returns:
+        list: Matching segments in transcript order, or None if the summary
+        has no stored segments.
+    """
+    content_id = _content_id(db, summary_id)
+    if content_id is None:
+        return None
+
+    phrase = " ".join(q.split()).lower()
+    blocks = db.execute(
+        select(TranscriptSegmentBlock)
+        .where(
+            TranscriptSegmentBlock.content_id == content_id,
+            func.lower(TranscriptSegmentBlock.text).contains(phrase, autoescape=True),
+        )
+        .order_by(TranscriptSegmentBlock.block)
+    ).scalars().all()
+
+    matches = []
+    for block in blocks:
+        for segment in _decode_block(block):
+            if phrase in segment["text"].lower():
+                matches.append(segment)
+                if len(matches) >= limit:
+                    return matches
+    return matches
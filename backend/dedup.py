@@ -0,0 +1,65 @@
+import hashlib
+import re
+import numpy as np
+
+# Changing any of these invalidates stored signatures and band keys
+SHINGLE_WORDS = 5  # Word n-grams compared between documents
+NUM_PERMUTATIONS = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a band
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+_PRIME = np.uint64((1 << 31) - 1)  # Keeps a * x + b inside uint64 for 31-bit x
+_rng = np.random.RandomState(20240601)  # Fixed seed: signatures must match across processes and restarts
+_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+def shingles(text: str) -> np.ndarray:
+    """
+    Hashes every SHINGLE_WORDS-word window of the lowercased text to a 31-bit integer.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = [int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "little") & 0x7FFFFFFF for gram in grams]
+    return np.unique(np.array(hashes, dtype=np.uint64))
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    Returns the NUM_PERMUTATIONS-value MinHash signature of the text.
+
+    The fraction of positions where two signatures agree estimates the
+    Jaccard similarity of the two documents' shingle sets.
+    """
+    values = shingles(text)
+    if values.size == 0:
+        return np.full(NUM_PERMUTATIONS, _PRIME, dtype=np.uint32)
+    # One row per permutation, one column per shingle; min over shingles
+    permuted = (_A[:, None] * values[None, :] + _B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+def band_keys(signature: np.ndarray) -> list:
+    """
+    Splits a signature into LSH bands and hashes each band to a short key.
+    Documents sharing any key are near-duplicate candidates.
+    """
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        keys.append(f"{band:02d}{hashlib.blake2b(rows.tobytes(), digest_size=8).hexdigest()}")
+    return keys
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Estimated Jaccard similarity of two signatures.
+    """
+    return float(np.mean(a == b))
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype("<u4").tobytes()
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4").astype(np.uint32)
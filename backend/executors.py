@@ -0,0 +1,61 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from ai_pipeline.config import settings
+
+# Maximum number of concurrent calls for each blocking pipeline stage
+STAGE_LIMITS = {
+    "fetch": settings.FETCH_WORKERS,
+    "download": settings.DOWNLOAD_WORKERS,
+    "transcribe": settings.TRANSCRIBE_WORKERS,
+    "llm": settings.LLM_WORKERS,
+    "db": settings.DB_WORKERS,
+    "probe": settings.PROBE_WORKERS,
+}
+
+_executors = {}
+
+def get_executor(stage: str) -> ThreadPoolExecutor:
+    """
+    Returns the bounded thread pool that runs the given pipeline stage.
+
+    Args:
+        stage (str): One of the keys of STAGE_LIMITS.
+
+    Returns:
+        ThreadPoolExecutor: Executor sized to the stage's configured limit.
+    """
+    if stage not in STAGE_LIMITS:
+        raise ValueError(f"Unknown pipeline stage '{stage}'.")
+
+    executor = _executors.get(stage)
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, STAGE_LIMITS[stage]),
+            thread_name_prefix=f"{stage}-stage",
+        )
+        _executors[stage] = executor
+    return executor
+
+async def run_in_stage(stage: str, func, /, *args, **kwargs):
+    """
+    Runs a blocking function on its stage executor without blocking the event loop.
+
+    Args:
+        stage (str): Pipeline stage the call belongs to (fetch, download, transcribe, llm, db, probe).
+        func (callable): The blocking function to run.
+
+    Returns:
+        The return value of func.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(stage), call)
+
+def shutdown_executors(wait: bool = True):
+    """
+    Shuts down all stage executors. Called when the API process stops.
+    """
+    for executor in _executors.values():
+        executor.shutdown(wait=wait)
+    _executors.clear()
@@ -0,0 +1,642 @@
+import asyncio
+import hashlib
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+from sqlalchemy import func
+from db.database import SessionLocal, engine
+from models import Feed, FeedEntry, FeedDigest, Summary
+from executors import run_in_stage
+from fetcher import get_fetcher
+from run_pipeline import run_pipeline_async
+from scheduler import scheduler
+from summarizer_groq import summarize_text
+from llm_client import LLMError
+from transcript_cache import youtube_video_id
+from warmup import warm_up
+from ai_pipeline.config import settings
+from logs import get_logger
+from metrics import feed_polls, feed_entries
+
+log = get_logger(__name__)
+
+DIGEST_PROMPT = "The following are summaries of the articles one news source published recently. Write a short overview of the main stories:"
+
+# --- parsing ---
+
+def _local(tag) -> str:
+    # '{http://www.w3.org/2005/Atom}entry' -> 'entry'
+    return tag.rsplit("}", 1)[-1].lower() if isinstance(tag, str) else ""
+
+def _child(element, *names):
+    for child in element:
+        if _local(child.tag) in names:
+            return child
+    return None
+
+def _text(element, *names):
+    child = _child(element, *names)
+    if child is None or child.text is None:
+        return None
+    return child.text.strip() or None
+
+def _parse_date(value: str):
+    """
+    RFC 822 (RSS) or ISO 8601 (Atom, sitemaps) date as naive UTC, or None.
+    """
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _atom_link(entry):
+    for link in entry:
+        if _local(link.tag) == "link" and link.get("rel", "alternate") == "alternate" and link.get("href"):
+            return link.get("href")
+    return None
+
+def parse_feed(body: bytes, base_url: str) -> dict:
+    """
+    Parses an RSS 2.0/1.0 or Atom feed, a sitemap (including Google News
+    sitemaps) or a sitemap index.
+
+    Returns:
+        dict: 'kind', 'title', 'entries' (dicts with guid, url, title,
+        published_at; newest first when dated) and, for sitemap indexes,
+        'sitemaps' (child sitemap URLs, most recently modified first).
+    """
+    root = ET.fromstring(body)
+    kind = _local(root.tag)
+    entries, sitemaps, title = [], [], None
+
+    if kind in ("rss", "rdf"):
+        kind = "rss"
+        channel = _child(root, "channel")
+        title = _text(channel, "title") if channel is not None else None
+        for item in root.iter():
+            if _local(item.tag) != "item":
+                continue
+            url = _text(item, "link") or _text(item, "guid")
+            if url:
+                entries.append({
+                    "guid": _text(item, "guid") or url,
+                    "url": urljoin(base_url, url),
+                    "title": _text(item, "title"),
+                    "published_at": _parse_date(_text(item, "pubdate", "date")),
+                })
+    elif kind == "feed":
+        kind = "atom"
+        title = _text(root, "title")
+        for item in root:
+            if _local(item.tag) != "entry":
+                continue
+            url = _atom_link(item)
+            if url:
+                entries.append({
+                    "guid": _text(item, "id") or url,
+                    "url": urljoin(base_url, url),
+                    "title": _text(item, "title"),
+                    "published_at": _parse_date(_text(item, "published", "updated")),
+                })
+    elif kind == "urlset":
+        kind = "sitemap"
+        for item in root:
+            url = _text(item, "loc")
+            if _local(item.tag) != "url" or not url:
+                continue
+            news = _child(item, "news")
+            entries.append({
+                "guid": url,
+                "url": url,
+                "title": _text(news, "title") if news is not None else None,
+                "published_at": _parse_date((_text(news, "publication_date") if news is not None else None) or _text(item, "lastmod")),
+            })
+    elif kind == "sitemapindex":
+        children = [(_text(item, "loc"), _parse_date(_text(item, "lastmod"))) for item in root if _local(item.tag) == "sitemap"]
+        children.sort(key=lambda child: child[1] or datetime.min, reverse=True)
+        sitemaps = [url for url, _ in children if url]
+    else:
+        raise ValueError(f"❌ Not a feed or sitemap: <{kind}>")
+
+    entries.sort(key=lambda entry: entry["published_at"] or datetime.min, reverse=True)  # Stable: undated keep feed order
+    return {"kind": kind, "title": title, "entries": entries, "sitemaps": sitemaps}
+
+# --- storage ---
+
+def _guid_hash(guid: str) -> str:
+    return hashlib.sha256(guid.encode("utf-8")).hexdigest()
+
+def _feed_to_dict(feed: Feed, counts: dict = None) -> dict:
+    return {
+        "id": feed.id,
+        "url": feed.url,
+        "title": feed.title,
+        "kind": feed.kind,
+        "poll_seconds": feed.poll_seconds or settings.FEED_POLL_SECONDS,
+        "etag": feed.etag,
+        "last_modified": feed.last_modified,
+        "last_polled_at": feed.last_polled_at.isoformat() if feed.last_polled_at else None,
+        "next_poll_at": feed.next_poll_at.isoformat() if feed.next_poll_at else None,
+        "last_status": feed.last_status,
+        "error": feed.error,
+        "entries": counts or {},
+    }
+
+def ensure_feed_tables():
+    """
+    Creates the Feeds, FeedEntries and FeedDigests tables if they don't exist yet.
+    """
+    for model in (Feed, FeedEntry, FeedDigest):
+        model.__table__.create(bind=engine, checkfirst=True)
+
+def add_feed(url: str, poll_seconds: int = None) -> dict:
+    """
+    Registers a feed or sitemap URL; it is polled on the next tick.
+    Adding a URL that is already registered returns the existing feed.
+    """
+    db = SessionLocal()
+    try:
+        feed = db.query(Feed).filter(Feed.url == url).first()
+        if feed is None:
+            now = datetime.utcnow()
+            feed = Feed(url=url, poll_seconds=poll_seconds, next_poll_at=now)
+            if settings.FEED_DIGEST_SECONDS > 0:
+                feed.next_digest_at = now + timedelta(seconds=settings.FEED_DIGEST_SECONDS)
+            db.add(feed)
+            db.commit()
+        return _feed_to_dict(feed)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def register_configured_feeds():
+    """
+    Adds every URL in settings.FEEDS.
+    """
+    for url in (u.strip() for u in settings.FEEDS.split(",")):
+        if url:
+            add_feed(url)
+
+def list_feeds() -> list:
+    """
+    Returns every feed with its entry counts by status.
+    """
+    db = SessionLocal()
+    try:
+        counts = {}
+        for feed_id, status, count in db.query(FeedEntry.feed_id, FeedEntry.status, func.count()).group_by(FeedEntry.feed_id, FeedEntry.status):
+            counts.setdefault(feed_id, {})[status] = count
+        return [_feed_to_dict(feed, counts.get(feed.id)) for feed in db.query(Feed).order_by(Feed.id)]
+    finally:
+        db.close()
+
+def request_poll(feed_id: int):
+    """
+    Makes the feed due now. Returns the feed, or None if it doesn't exist.
+    """
+    db = SessionLocal()
+    try:
+        feed = db.get(Feed, feed_id)
+        if feed is None:
+            return None
+        feed.next_poll_at = datetime.utcnow()
+        db.commit()
+        return _feed_to_dict(feed)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def list_digests(feed_id: int, limit: int = 5) -> list:
+    """
+    Returns the feed's most recent digests, newest first.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.query(FeedDigest).filter(FeedDigest.feed_id == feed_id).order_by(FeedDigest.id.desc()).limit(limit)
+        return [
+            {
+                "id": row.id,
+                "feed_id": row.feed_id,
+                "period_start": row.period_start.isoformat(),
+                "period_end": row.period_end.isoformat(),
+                "entry_count": row.entry_count,
+                "overview": row.overview,
+                "body": row.body,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+            }
+            for row in rows
+        ]
+    finally:
+        db.close()
+
+def _claim_due_feeds(limit: int) -> list:
+    """
+    Claims feeds whose next poll is due by moving next_poll_at forward with
+    a compare-and-set, so each poll runs on one worker only.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        due = db.query(Feed).filter(Feed.next_poll_at <= now).order_by(Feed.next_poll_at).limit(limit).all()
+        claimed = []
+        for feed in due:
+            interval = feed.poll_seconds or settings.FEED_POLL_SECONDS
+            updated = (
+                db.query(Feed)
+                .filter(Feed.id == feed.id, Feed.next_poll_at == feed.next_poll_at)
+                .update({"next_poll_at": now + timedelta(seconds=interval)}, synchronize_session=False)
+            )
+            db.commit()
+            if updated:
+                db.refresh(feed)
+                claimed.append(_feed_to_dict(feed))
+        return claimed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _record_poll(feed_id: int, status: str, **fields):
+    db = SessionLocal()
+    try:
+        db.query(Feed).filter(Feed.id == feed_id).update(
+            {"last_status": status, "last_polled_at": datetime.utcnow(), **fields},
+            synchronize_session=False,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _record_entries(feed_id: int, entries: list) -> int:
+    """
+    Adds the entries not yet in the seen-GUID index. The newest
+    FEED_MAX_NEW_ENTRIES are queued for summarizing; older new ones (a
+    sitemap's back catalogue on the first poll) are marked skipped.
+
+    Returns:
+        int: Number of entries queued.
+    """
+    unique = {}
+    for entry in entries:
+        unique.setdefault(_guid_hash(entry["guid"]), entry)
+
+    db = SessionLocal()
+    try:
+        seen = set()
+        hashes = list(unique)
+        for start in range(0, len(hashes), 500):  # Stay under bound-parameter limits
+            seen.update(
+                digest for (digest,) in db.query(FeedEntry.guid_hash)
+                .filter(FeedEntry.feed_id == feed_id, FeedEntry.guid_hash.in_(hashes[start:start + 500]))
+            )
+        new = [(digest, entry) for digest, entry in unique.items() if digest not in seen]
+        now = datetime.utcnow()
+        queued = 0
+        for digest, entry in new:
+            status = "pending" if queued < settings.FEED_MAX_NEW_ENTRIES else "skipped"
+            queued += status == "pending"
+            db.add(FeedEntry(
+                feed_id=feed_id,
+                guid_hash=digest,
+                url=entry["url"],
+                title=(entry["title"] or "")[:500] or None,
+                mode="transcribe" if youtube_video_id(entry["url"]) else "summarize",
+                published_at=entry["published_at"],
+                status=status,
+                created_at=now,
+                updated_at=now,
+            ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    feed_entries.inc(len(unique) - len(new), result="seen")
+    feed_entries.inc(queued, result="new")
+    feed_entries.inc(len(new) - queued, result="skipped")
+    return queued
+
+def _claim_entries(feed_id: int, limit: int) -> list:
+    """
+    Moves pending entries of the feed (and running ones whose worker went
+    away) to 'running' with a compare-and-set on status and updated_at.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.FEED_STALE_SECONDS)
+        candidates = (
+            db.query(FeedEntry.id, FeedEntry.status, FeedEntry.updated_at, FeedEntry.url, FeedEntry.mode)
+            .filter(FeedEntry.feed_id == feed_id)
+            .filter((FeedEntry.status == "pending") | ((FeedEntry.status == "running") & (FeedEntry.updated_at < stale_before)))
+            .order_by(FeedEntry.published_at.desc(), FeedEntry.id)
+            .limit(limit)
+            .all()
+        )
+        claimed = []
+        for entry_id, status, updated_at, url, mode in candidates:
+            updated = (
+                db.query(FeedEntry)
+                .filter(FeedEntry.id == entry_id, FeedEntry.status == status, FeedEntry.updated_at == updated_at)
+                .update({"status": "running", "updated_at": now}, synchronize_session=False)
+            )
+            db.commit()
+            if updated:
+                claimed.append({"id": entry_id, "url": url, "mode": mode})
+        return claimed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _finish_entry(entry_id: int, status: str, error: str = None):
+    db = SessionLocal()
+    try:
+        db.query(FeedEntry).filter(FeedEntry.id == entry_id).update(
+            {"status": status, "error": error, "updated_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _claim_due_digests(limit: int) -> list:
+    """
+    Claims feeds whose digest is due by moving next_digest_at one period ahead.
+
+    Returns:
+        list: (feed ID, period start, period end) per claimed digest.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        period = timedelta(seconds=settings.FEED_DIGEST_SECONDS)
+        due = db.query(Feed.id, Feed.next_digest_at).filter(Feed.next_digest_at <= now).order_by(Feed.next_digest_at).limit(limit).all()
+        claimed = []
+        for feed_id, next_digest_at in due:
+            updated = (
+                db.query(Feed)
+                .filter(Feed.id == feed_id, Feed.next_digest_at == next_digest_at)
+                .update({"next_digest_at": now + period}, synchronize_session=False)
+            )
+            db.commit()
+            if updated:
+                claimed.append((feed_id, next_digest_at - period, now))
+        return claimed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _digest_items(feed_id: int, period_start: datetime, period_end: datetime) -> list:
+    """
+    The feed's entries summarized in the period, with their stored summary, newest first.
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(FeedEntry.url, FeedEntry.title, Summary.summary)
+            .join(Summary, Summary.source == FeedEntry.url)
+            .filter(
+                FeedEntry.feed_id == feed_id,
+                FeedEntry.status == "summarized",
+                FeedEntry.updated_at >= period_start,
+                FeedEntry.updated_at < period_end,
+            )
+            .order_by(FeedEntry.published_at.desc(), Summary.id.desc())
+            .all()
+        )
+    finally:
+        db.close()
+
+    items, seen = [], set()
+    for url, title, summary in rows:
+        if url not in seen:  # Latest summary per article
+            seen.add(url)
+            items.append({"url": url, "title": title, "summary": summary})
+    return items[:settings.FEED_DIGEST_MAX_ITEMS]
+
+def _store_digest(feed_id: int, period_start: datetime, period_end: datetime, items: list, overview: str = None) -> int:
+    body = "\n\n".join(f"{item['title'] or item['url']}\n{item['summary']}\n{item['url']}" for item in items)
+    db = SessionLocal()
+    try:
+        digest = FeedDigest(
+            feed_id=feed_id, period_start=period_start, period_end=period_end,
+            entry_count=len(items), overview=overview, body=body,
+        )
+        db.add(digest)
+        db.commit()
+        return digest.id
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def build_digest(feed_id: int, period_start: datetime, period_end: datetime):
+    """
+    Builds one digest of the feed from the stored summaries of its entries.
+    Periods without new articles produce no digest.
+
+    Returns:
+        int: The digest ID, or None.
+    """
+    items = await run_in_stage("db", _digest_items, feed_id, period_start, period_end)
+    if not items:
+        return None
+    overview = None
+    if settings.FEED_DIGEST_OVERVIEW:
+        try:
+            overview = await run_in_stage("llm", summarize_text, "\n\n".join(item["summary"] for item in items), DIGEST_PROMPT)
+        except LLMError as e:
+            log.warning("digest overview failed", feed_id=feed_id, error=str(e))  # The list alone is still a digest
+    digest_id = await run_in_stage("db", _store_digest, feed_id, period_start, period_end, items, overview and str(overview))
+    log.info("feed digest built", feed_id=feed_id, digest_id=digest_id, entries=len(items))
+    return digest_id
+
+# --- polling ---
+
+class FeedPoller:
+    """
+    Polls due feeds every FEED_TICK_SECONDS and summarizes their new
+    entries in the background, ahead of any user asking for them.
+
+    Polls are conditional requests with the feed's stored ETag and
+    Last-Modified, so an unchanged feed costs one 304. Entries already in
+    the seen-GUID index are ignored; new ones run through the regular
+    pipeline (fetch, summarize, save), which stores them where URL lookups
+    find them. Each holds a scheduler slot as client 'feeds', so background
+    ingestion gets a fair share of the summarize lane, not all of it.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._entries = set()
+        self._semaphore = None
+        self._stopping = False
+
+    def start(self):
+        self._stopping = False
+        self._semaphore = asyncio.Semaphore(max(1, settings.FEED_WORKERS))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        tasks = [t for t in (self._task, *self._entries) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                feeds = await run_in_stage("db", _claim_due_feeds, 10)
+            except Exception as e:
+                log.error("feed claim failed", error=str(e))
+                feeds = []
+            await asyncio.gather(*(self.poll(feed) for feed in feeds))
+            if settings.FEED_DIGEST_SECONDS > 0:
+                await self._digests()
+            if not feeds:
+                await asyncio.sleep(settings.FEED_TICK_SECONDS)
+
+    async def poll(self, feed: dict):
+        """
+        Polls one feed and starts summarizing its new entries. Never raises,
+        so one feed's failure can't stop the poller.
+        """
+        try:
+            await self._fetch(feed)
+        except Exception as e:
+            feed_polls.inc(result="error")
+            log.warning("feed poll failed", feed_id=feed["id"], url=feed["url"], error=str(e))
+            try:
+                await run_in_stage("db", _record_poll, feed["id"], "error", error=str(e))
+            except Exception as e:
+                log.error("feed poll record failed", feed_id=feed["id"], error=str(e))
+
+        try:
+            entries = await run_in_stage("db", _claim_entries, feed["id"], settings.FEED_MAX_NEW_ENTRIES)
+        except Exception as e:
+            log.error("feed entry claim failed", feed_id=feed["id"], error=str(e))
+            return
+        for entry in entries:
+            task = asyncio.create_task(self._summarize(entry))
+            self._entries.add(task)
+            task.add_done_callback(self._entries.discard)
+
+    async def _digests(self):
+        try:
+            due = await run_in_stage("db", _claim_due_digests, 10)
+        except Exception as e:
+            log.error("feed digest claim failed", error=str(e))
+            return
+        for feed_id, period_start, period_end in due:
+            try:
+                await build_digest(feed_id, period_start, period_end)
+            except Exception as e:
+                log.error("feed digest failed", feed_id=feed_id, error=str(e))
+
+    async def _fetch(self, feed: dict):
+        fetcher = get_fetcher()
+        body, etag, last_modified = await run_in_stage("fetch", fetcher.fetch_if_changed, feed["url"], feed["etag"], feed["last_modified"])
+        if body is None:
+            feed_polls.inc(result="not_modified")
+            await run_in_stage("db", _record_poll, feed["id"], "not_modified", error=None)
+            return
+
+        parsed = parse_feed(body, feed["url"])
+        entries = parsed["entries"]
+        for child in parsed["sitemaps"][:settings.FEED_SITEMAP_CHILDREN]:
+            child_body, _, _ = await run_in_stage("fetch", fetcher.fetch_if_changed, child)
+            entries += parse_feed(child_body, child)["entries"]
+
+        queued = await run_in_stage("db", _record_entries, feed["id"], entries)
+        feed_polls.inc(result="changed")
+        log.info("feed polled", feed_id=feed["id"], entries=len(entries), queued=queued)
+        await run_in_stage(
+            "db", _record_poll, feed["id"], "changed",
+            etag=etag, last_modified=last_modified, title=parsed["title"], kind=parsed["kind"], error=None,
+        )
+
+    async def _summarize(self, entry: dict):
+        async with self._semaphore:
+            try:
+                slot = await scheduler.admit(entry["mode"], entry["url"], client="feeds", shed=False)
+                async with slot:
+                    await run_pipeline_async(entry["mode"], entry["url"])
+            except asyncio.CancelledError:
+                if self._stopping:
+                    await asyncio.shield(run_in_stage("db", _finish_entry, entry["id"], "pending"))  # Picked up again later
+                raise
+            except Exception as e:
+                feed_entries.inc(result="failed")
+                log.warning("feed entry failed", entry_id=entry["id"], url=entry["url"], error=str(e))
+                await run_in_stage("db", _finish_entry, entry["id"], "failed", str(e))
+                return
+        feed_entries.inc(result="summarized")
+        await run_in_stage("db", _finish_entry, entry["id"], "summarized")
+
+_poller = None
+
+async def start_feed_poller():
+    """
+    Creates the feed tables, registers settings.FEEDS and starts polling in
+    the current event loop.
+    """
+    global _poller
+    await run_in_stage("db", ensure_feed_tables)
+    await run_in_stage("db", register_configured_feeds)
+    _poller = FeedPoller()
+    _poller.start()
+
+async def stop_feed_poller():
+    """
+    Stops polling; entries being summarized are handed back as pending.
+    """
+    global _poller
+    if _poller is not None:
+        await _poller.stop()
+        _poller = None
+
+async def _run_forever():
+    await asyncio.to_thread(warm_up)
+    await start_feed_poller()
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await stop_feed_poller()
+
+if __name__ == "__main__":
+    # Standalone ingestion process, sized independently from the API workers
+    log.info("starting feed poller", feeds=settings.FEEDS, tick_seconds=settings.FEED_TICK_SECONDS)
+    try:
+        asyncio.run(_run_forever())
+    except KeyboardInterrupt:
+        pass
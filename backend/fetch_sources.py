@@ -1,94 +1,142 @@
 import os
-import requests
-import newspaper
-import yt_dlp as youtube_dl
+import tempfile
+import uuid
 from pathlib import Path
-from db.db_insert import save_summary_to_db  # Import your save function
-from db.database import get_db  # Import the database session
+from concurrent.futures import ThreadPoolExecutor
+from ai_pipeline.config import settings
+from fetcher import get_fetcher
+from metrics import span
+from logs import get_logger
+from summarizer_groq import summarize_text  # Shared Groq client lives behind this
 
-# Load your Groq API key from environment variables
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-API_URL = "https://api.groq.com/openai/v1/chat/completions"
+log = get_logger(__name__)
+
+class _YtDlpLogger:
+    """
+    Sends yt-dlp's messages to the structured log instead of stdout, so
+    they don't break the JSON-lines stream. Progress lines are dropped.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def debug(self, message: str):
+        pass
+
+    def info(self, message: str):
+        pass
+
+    def warning(self, message: str):
+        log.warning("yt-dlp warning", url=self.url, message=message)
+
+    def error(self, message: str):
+        log.error("yt-dlp error", url=self.url, message=message)
+
+def _download_audio(url, output_base):
+    import yt_dlp as youtube_dl  # Imported on first download; only transcribe mode needs it
+
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': f"{output_base}.%(ext)s",
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '192',
+        }],
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+        'logger': _YtDlpLogger(url),
+    }
+
+    try:
+        with span("download", url=url) as attributes:
+            with youtube_dl.YoutubeDL(ydl_opts) as ydl:
+                ydl.extract_info(url, download=True)
+            downloaded_path = f"{output_base}.mp3"
+            if os.path.exists(downloaded_path):
+                attributes["bytes"] = os.path.getsize(downloaded_path)
+                return downloaded_path
+        log.error("audio not found after download", url=url, path=downloaded_path)
+    except Exception as e:
+        log.error("audio download failed", url=url, error=str(e))
+    return None
+
+def probe_duration(url: str):
+    """
+    Looks up the length of a video from its metadata, without downloading it.
+
+    Returns:
+        float: Duration in seconds, or None if yt-dlp doesn't report one or
+        the lookup fails.
+    """
+    import yt_dlp as youtube_dl
+
+    ydl_opts = {'quiet': True, 'no_warnings': True, 'skip_download': True, 'noplaylist': True, 'socket_timeout': 10, 'logger': _YtDlpLogger(url)}
+    try:
+        with span("probe", url=url) as attributes:
+            with youtube_dl.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False, process=False)
+            duration = info.get("duration") if info else None
+            attributes["duration_seconds"] = duration
+            return float(duration) if duration else None
+    except Exception as e:
+        log.warning("duration probe failed", url=url, error=str(e))
+        return None
 
 def get_youtube_audio(youtube_urls, base_filename="audio"):
     """
-    Downloads the audio from the given YouTube URLs.
+    Downloads the audio from the given YouTube URLs, up to DOWNLOAD_WORKERS at a time.
 
     Args:
         youtube_urls (list): A list of YouTube URLs to download audio from.
         base_filename (str): Base name for the saved audio files.
 
     Returns:
-        list: A list of paths to the downloaded audio files.
+        list: The path of each URL's audio file, in input order; None where
+        the download failed.
     """
-    Path("./downloads").mkdir(parents=True, exist_ok=True)
-    audio_files = []
+    Path(settings.DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    # Unique per call, so concurrent requests never overwrite each other's files
+    call_id = uuid.uuid4().hex[:12]
+    bases = [os.path.join(settings.DOWNLOAD_DIR, f"{base_filename}_{call_id}_{i}") for i in range(len(youtube_urls))]
 
-    for i, url in enumerate(youtube_urls):
-        try:
-            output_name = f"./downloads/{base_filename}_{i}.%(ext)s"
-            
-            # Updated ydl_opts with logging
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': output_name,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'quiet': False  # Set to False to see download progress
-            }
+    if len(youtube_urls) == 1:
+        paths = [_download_audio(youtube_urls[0], bases[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, settings.DOWNLOAD_WORKERS)) as executor:
+            paths = list(executor.map(_download_audio, youtube_urls, bases))
 
-            with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                downloaded_path = f"./downloads/{base_filename}_{i}.mp3"
-                if os.path.exists(downloaded_path):
-                    audio_files.append(downloaded_path)
-                else:
-                    print(f"❌ Audio not found at expected path: {downloaded_path}")
-        except Exception as e:
-            print(f"❌ Error downloading audio from {url}: {e}")
+    return paths
+
+def audio_temp_dir() -> tempfile.TemporaryDirectory:
+    """
+    Returns a private temporary directory under DOWNLOAD_DIR for one job's
+    audio. Use it as a context manager; the directory and everything in it
+    are removed on exit, even when the job fails.
+    """
+    Path(settings.DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
+    return tempfile.TemporaryDirectory(prefix="audio_", dir=settings.DOWNLOAD_DIR)
 
-    return audio_files
+def download_youtube_audio(url: str, directory: str) -> str:
+    """
+    Downloads the audio of one video as MP3 into the given directory.
+
+    Returns:
+        str: Path to the audio file. Raises FileNotFoundError if the download failed.
+    """
+    path = _download_audio(url, os.path.join(directory, "audio"))
+    if not path:
+        raise FileNotFoundError("❌ Audio file not found after downloading.")
+    return path
 
 def fetch_news_content(url):
     try:
-        article = newspaper.Article(url)
-        article.download()
-        article.parse()
-        return article.text
+        # Pooled, polite, conditional fetch; parsing happens in a worker process
+        return get_fetcher().fetch_article_text(url)
     except Exception as e:
         raise Exception(f"Error fetching news article from {url}: {e}")
 
-def summarize_text(text):
-    if not GROQ_API_KEY:
-        raise Exception("Groq API key is not set in the environment variables.")
-    
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "model": "llama3-8b-8192",
-        "messages": [
-            {"role": "system", "content": "You are a summarizer that gives concise and informative summaries of news content."},
-            {"role": "user", "content": f"Summarize the following news content:\n\n{text}"}
-        ],
-        "temperature": 0.5
-    }
-
-    try:
-        response = requests.post(API_URL, headers=headers, json=data)
-        response.raise_for_status()
-        response_data = response.json()
-        return response_data["choices"][0]["message"]["content"]
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Error in API request: {str(e)}")
-    except (KeyError, IndexError) as e:
-        raise Exception(f"Unexpected response format from Groq API. Error: {str(e)}")
-
 def process_user_request(url=None, text=None):
     if url:
         content = fetch_news_content(url)
@@ -103,53 +151,28 @@ def fetch_sources(youtube_urls=None, news_urls=None, raw_texts=None):
     """
     Fetches audio and text summaries from provided sources and saves them to the database.
 
+    News URLs and raw texts run through the staged batch pipeline, so
+    fetching, summarization and bulk DB writes overlap.
+
     Returns:
         dict: A dictionary containing 'audio_files' and 'summaries' with status information.
     """
+    from batch import BatchRunner  # batch imports this module
+
     audio_files = []
     summaries = []
 
-    # Initialize the database session
-    db = next(get_db())
-
     if youtube_urls:
         audio_files = get_youtube_audio(youtube_urls, base_filename="audio")
 
-    if news_urls:
-        for url in news_urls:
-            try:
-                article_text = fetch_news_content(url)
-                summary = summarize_text(article_text)
-                
-                # Save the summary in the database with "NEUTRAL" sentiment
-                save_summary_to_db(db, source=url, content=article_text, summary=summary, sentiment="NEUTRAL")
-
-                summaries.append(summary)
-            except Exception as e:
-                print(f"❌ Error summarizing article {url}: {e}")
-                summaries.append(None)
-
-    if raw_texts:
-        for text in raw_texts:
-            try:
-                summary = summarize_text(text)
-                
-                # Save the summary in the database with "NEUTRAL" sentiment
-                save_summary_to_db(db, source="Raw Text", content=text, summary=summary, sentiment="NEUTRAL")
-
-                summaries.append(summary)
-            except Exception as e:
-                print(f"❌ Error summarizing raw text: {e}")
-                summaries.append(None)
-
-    # Commit and close the session
-    try:
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"❌ Error during commit to database: {e}")
-    finally:
-        db.close()
+    items = [{"source": url, "mode": "summarize"} for url in news_urls or []]
+    items += [{"source": "Raw Text", "mode": "text", "text": text} for text in raw_texts or []]
+
+    if items:
+        runner = BatchRunner(items)
+        runner.run()
+        # Failed items are None, as before
+        summaries = [runner.results.get(i) for i in range(len(items))]
 
     return {
         "audio_files": audio_files,
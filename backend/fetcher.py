@@ -0,0 +1,408 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+import httpx
+from metrics import span
+from ai_pipeline.config import settings
+
+# Temp files this old belong to a writer that died before renaming them
+ORPHAN_TMP_SECONDS = 3600
+
+class RobotsDisallowed(Exception):
+    """Raised when robots.txt forbids fetching a URL."""
+
+class RawHtmlStore:
+    """
+    Stores the last fetched HTML of every URL together with its ETag and
+    Last-Modified headers, so later fetches can be conditional requests.
+
+    Entries older than max_age_seconds are evicted, then the least recently
+    stored ones until the store is under max_bytes. A scan runs in the
+    background after a put, at most every RAW_HTML_EVICT_INTERVAL_SECONDS.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = None, max_age_seconds: float = None):
+        self.directory = directory
+        self.max_bytes = max_bytes if max_bytes is not None else settings.RAW_HTML_MAX_MB * 1024 * 1024
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else settings.RAW_HTML_MAX_AGE_SECONDS
+        self._next_eviction = 0.0
+        self._eviction_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return f"{base}.html", f"{base}.json"
+
+    def get(self, url: str):
+        """
+        Returns (meta, html) for the URL, or (None, None) if it was never stored.
+        """
+        html_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(html_path, "r", encoding="utf-8") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def _write(self, path: str, write):
+        # Unique temp file per writer, renamed into place so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def put(self, url: str, html: str, etag: str = None, last_modified: str = None):
+        html_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(html_path), exist_ok=True)
+        meta = {"url": url, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+        self._write(html_path, lambda f: f.write(html))
+        # Metadata last: an entry only counts once its validators are in place
+        self._write(meta_path, lambda f: json.dump(meta, f))
+        self._schedule_eviction()
+
+    def _schedule_eviction(self):
+        if not (self.max_bytes or self.max_age_seconds):
+            return
+        with self._eviction_lock:
+            now = time.monotonic()
+            if now < self._next_eviction:
+                return
+            self._next_eviction = now + max(1.0, settings.RAW_HTML_EVICT_INTERVAL_SECONDS)
+        threading.Thread(target=self.evict, name="raw-html-evict", daemon=True).start()
+
+    def _entries(self) -> tuple:
+        # (stored at, bytes, html path, meta path) per entry, plus temp files left by crashed writers
+        entries, orphans = [], []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # Removed concurrently
+                if entry.name.endswith(".tmp"):
+                    orphans.append((stat.st_mtime, entry.path))
+                elif entry.name.endswith(".json"):
+                    html_path = entry.path[: -len(".json")] + ".html"
+                    try:
+                        size = stat.st_size + os.path.getsize(html_path)
+                    except OSError:
+                        size = stat.st_size
+                    entries.append((stat.st_mtime, size, html_path, entry.path))
+        return entries, orphans
+
+    def evict(self) -> int:
+        """
+        Removes expired entries, then the oldest ones until the store fits
+        in max_bytes.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        entries, orphans = self._entries()
+        now = time.time()
+        for mtime, path in orphans:
+            if now - mtime > ORPHAN_TMP_SECONDS:
+                _remove(path)
+
+        entries.sort()
+        total = sum(size for _, size, _, _ in entries)
+        removed = 0
+        for stored_at, size, html_path, meta_path in entries:
+            expired = self.max_age_seconds and now - stored_at > self.max_age_seconds
+            if not expired and not (self.max_bytes and total > self.max_bytes):
+                break  # Sorted oldest first: everything after is newer and fits
+            _remove(meta_path)
+            _remove(html_path)
+            total -= size
+            removed += 1
+        return removed
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class HostLimiter:
+    """
+    Per-host politeness: at most `concurrency` requests in flight to one host
+    and at least `delay` seconds between the starts of two requests.
+    """
+
+    def __init__(self, concurrency: int, delay: float):
+        self.concurrency = max(1, concurrency)
+        self.delay = delay
+        self._semaphores = {}
+        self._locks = {}
+        self._next_start = {}
+
+    async def __call__(self, host: str):
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        await semaphore.acquire()
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._next_start.get(host, 0.0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_start[host] = time.monotonic() + self.delay
+        return semaphore
+
+def parse_article(url: str, html: str) -> str:
+    """
+    Extracts the article text from already downloaded HTML with newspaper.
+    Runs in a worker process so parsing never blocks fetching.
+    """
+    import newspaper
+
+    article = newspaper.Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return article.text
+
+def _import_newspaper(hold_seconds: float = 0):
+    import newspaper
+
+    time.sleep(hold_seconds)
+
+class ArticleFetcher:
+    """
+    Async article fetcher: one pooled HTTP client, per-host rate limits,
+    robots.txt checks and conditional GETs backed by a RawHtmlStore, with
+    newspaper parsing offloaded to a process pool.
+
+    The fetcher runs on its own event loop thread so synchronous callers
+    (stage executors, batch workers) all share the same connection pool.
+    """
+
+    def __init__(self):
+        self.store = RawHtmlStore(settings.RAW_HTML_DIR)
+        self.stats = {"requests": 0, "not_modified": 0, "robots_blocked": 0, "errors": 0, "parsed": 0}
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._limiter = None
+        self._robots = {}
+        self._robots_locks = {}
+        self._parse_pool = None
+        self._start_lock = threading.Lock()
+
+    # --- event loop ---
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+
+            def run():
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                self._client = httpx.AsyncClient(
+                    timeout=settings.FETCH_TIMEOUT_SECONDS,
+                    follow_redirects=True,
+                    headers={"User-Agent": settings.FETCH_USER_AGENT},
+                    limits=httpx.Limits(max_connections=settings.FETCH_MAX_CONNECTIONS, max_keepalive_connections=settings.FETCH_MAX_CONNECTIONS),
+                )
+                self._limiter = HostLimiter(settings.FETCH_PER_HOST_CONCURRENCY, settings.FETCH_PER_HOST_DELAY_SECONDS)
+                ready.set()
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="article-fetcher", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def _submit(self, coro):
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    # --- fetching ---
+
+    async def _allowed(self, url: str) -> bool:
+        if not settings.FETCH_RESPECT_ROBOTS:
+            return True
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        async with self._robots_locks.setdefault(origin, asyncio.Lock()):
+            entry = self._robots.get(origin)
+            if entry is None or entry[1] < time.monotonic():
+                parser = RobotFileParser()
+                try:
+                    response = await self._client.get(f"{origin}/robots.txt")
+                    if response.status_code >= 400:
+                        parser.allow_all = True
+                    else:
+                        parser.parse(response.text.splitlines())
+                except httpx.HTTPError:
+                    parser.allow_all = True  # Unreachable robots.txt: don't block the article
+                entry = (parser, time.monotonic() + settings.FETCH_ROBOTS_TTL_SECONDS)
+                self._robots[origin] = entry
+        return entry[0].can_fetch(settings.FETCH_USER_AGENT, url)
+
+    async def _conditional_get(self, url: str, etag: str = None, last_modified: str = None, stage: str = "fetch") -> httpx.Response:
+        """
+        Polite GET (robots.txt, per-host limits) that sends the validators
+        of a previous response. Returns the response; a 304 is not an error.
+        """
+        if not await self._allowed(url):
+            self.stats["robots_blocked"] += 1
+            raise RobotsDisallowed(f"robots.txt disallows fetching {url}")
+
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        semaphore = await self._limiter(urlparse(url).netloc.lower())
+        with span(stage, url=url) as attributes:
+            try:
+                self.stats["requests"] += 1
+                response = await self._client.get(url, headers=headers)
+            except httpx.HTTPError:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                semaphore.release()
+            attributes["status"] = response.status_code
+
+            if response.status_code == 304 and headers:
+                self.stats["not_modified"] += 1
+                return response
+
+            if response.status_code >= 400:
+                self.stats["errors"] += 1
+            response.raise_for_status()
+            attributes["bytes"] = len(response.content)
+        return response
+
+    async def fetch_html(self, url: str) -> str:
+        """
+        Downloads the page HTML, reusing the stored copy when the server
+        answers a conditional request with 304 Not Modified.
+        """
+        meta, cached_html = await asyncio.to_thread(self.store.get, url)
+        if not meta or cached_html is None:
+            meta = {}
+        response = await self._conditional_get(url, meta.get("etag"), meta.get("last_modified"))
+        if response.status_code == 304:
+            return cached_html
+
+        html = response.text
+        await asyncio.to_thread(self.store.put, url, html, response.headers.get("etag"), response.headers.get("last-modified"))
+        return html
+
+    async def _fetch_if_changed(self, url: str, etag: str = None, last_modified: str = None) -> tuple:
+        response = await self._conditional_get(url, etag, last_modified, stage="feed_fetch")
+        if response.status_code == 304:
+            return None, etag, last_modified
+        return response.content, response.headers.get("etag"), response.headers.get("last-modified")
+
+    async def _parse(self, url: str, html: str) -> str:
+        with span("parse", url=url) as attributes:
+            if settings.PARSE_PROCESSES <= 0:
+                text = await asyncio.to_thread(parse_article, url, html)
+            else:
+                text = await self._loop.run_in_executor(self._get_parse_pool(), parse_article, url, html)
+            attributes["chars"] = len(text)
+        self.stats["parsed"] += 1
+        return text
+
+    def _get_parse_pool(self) -> ProcessPoolExecutor:
+        with self._start_lock:
+            if self._parse_pool is None:
+                self._parse_pool = ProcessPoolExecutor(max_workers=settings.PARSE_PROCESSES)
+            return self._parse_pool
+
+    async def _fetch_article(self, url: str) -> str:
+        html = await self.fetch_html(url)
+        return await self._parse(url, html)
+
+    async def _fetch_many(self, urls: list) -> list:
+        return await asyncio.gather(*(self._fetch_article(url) for url in urls), return_exceptions=True)
+
+    # --- public interface, callable from any thread or loop ---
+
+    def fetch_article_text(self, url: str) -> str:
+        """
+        Fetches and parses one article, blocking the calling thread.
+        """
+        return self._submit(self._fetch_article(url)).result()
+
+    async def afetch_article_text(self, url: str) -> str:
+        """
+        Fetches and parses one article from another event loop.
+        """
+        return await asyncio.wrap_future(self._submit(self._fetch_article(url)))
+
+    def fetch_if_changed(self, url: str, etag: str = None, last_modified: str = None) -> tuple:
+        """
+        Conditional GET for callers that keep the validators themselves
+        (feeds, sitemaps), blocking the calling thread.
+
+        Returns:
+            tuple: (body bytes, or None if the server answered 304 Not
+            Modified, new ETag, new Last-Modified).
+        """
+        return self._submit(self._fetch_if_changed(url, etag, last_modified)).result()
+
+    def fetch_many(self, urls: list) -> list:
+        """
+        Fetches many articles concurrently (subject to per-host limits).
+
+        Returns:
+            list: Article text or the raised exception, in input order.
+        """
+        return self._submit(self._fetch_many(urls)).result()
+
+    def warm_up(self):
+        """
+        Starts the fetch loop and the parse worker processes and imports
+        newspaper in each, ahead of the first article.
+        """
+        self._ensure_started()
+        if settings.PARSE_PROCESSES <= 0:
+            _import_newspaper()
+            return
+        pool = self._get_parse_pool()
+        # One task per worker; each blocks briefly so the pool spawns them all
+        for future in [pool.submit(_import_newspaper, 0.2) for _ in range(settings.PARSE_PROCESSES)]:
+            future.result()
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(wait=False)
+        self._loop = None
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def get_fetcher() -> ArticleFetcher:
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = ArticleFetcher()
+        return _fetcher
@@ -0,0 +1,337 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from db.database import SessionLocal, engine
+from db.migrations import migrate_schema
+from models import Job
+from executors import run_in_stage
+from run_pipeline import run_pipeline_async
+from singleflight import ensure_lock_table
+from scheduler import scheduler
+from memory import track_memory
+from warmup import warm_up
+from ai_pipeline.config import settings
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Rough share of the job completed once each stage starts
+STAGE_PROGRESS = {
+    "summarize": {"waiting": 0.05, "fetching": 0.1, "summarizing": 0.5, "saving": 0.9},
+    "transcribe": {"waiting": 0.02, "downloading": 0.05, "transcribing": 0.3, "summarizing": 0.8, "saving": 0.95},
+}
+
+class JobCancelled(Exception):
+    """Raised inside a running job once a cancel has been requested."""
+
+def _job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "mode": job.mode,
+        "url": job.url,
+        "model_size": job.model_size,
+        "client": job.client,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error,
+        "peak_rss_mb": job.peak_rss_mb,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+def ensure_jobs_table():
+    """
+    Creates the Jobs table if it doesn't exist yet.
+    """
+    Job.__table__.create(bind=engine, checkfirst=True)
+
+def create_job(mode: str, url: str, model_size: str = None, client: str = None) -> dict:
+    """
+    Queues a new pipeline job.
+
+    Args:
+        mode (str): Either 'summarize' or 'transcribe'
+        url (str): URL of the news article or YouTube video
+        model_size (str, optional): Whisper model size for transcribe jobs
+        client (str, optional): Who submitted the job, for per-client quotas and fair share
+
+    Returns:
+        dict: The queued job.
+    """
+    db = SessionLocal()
+    try:
+        job = Job(id=str(uuid.uuid4()), mode=mode, url=url, model_size=model_size, client=client, status="queued", progress=0.0)
+        db.add(job)
+        db.commit()
+        return _job_to_dict(job)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def count_queued_jobs(mode: str, client: str = None) -> int:
+    """
+    Returns how many jobs of the mode are waiting for a worker, in total or
+    from one client.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Job).filter(Job.mode == mode, Job.status == "queued")
+        if client is not None:
+            query = query.filter(Job.client == client)
+        return query.count()
+    finally:
+        db.close()
+
+def get_job(job_id: str):
+    """
+    Returns the job as a dict, or None if it doesn't exist.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        return _job_to_dict(job) if job else None
+    finally:
+        db.close()
+
+def cancel_job(job_id: str):
+    """
+    Cancels a job. Queued jobs are cancelled immediately; running jobs are
+    flagged and stopped by their worker at the next heartbeat or stage change.
+
+    Returns:
+        dict: The updated job, or None if it doesn't exist.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).with_for_update().first()
+        if job is None:
+            return None
+        if job.status == "queued":
+            job.status = "cancelled"
+        elif job.status == "running":
+            job.cancel_requested = True
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        return _job_to_dict(job)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _claim_next_job(mode: str):
+    """
+    Atomically moves the oldest queued job of the given mode to 'running'.
+    Jobs whose worker stopped heartbeating are picked up again as well.
+
+    The claim is a compare-and-set on (status, updated_at), so two workers can
+    never run the same job even on databases without SKIP LOCKED.
+
+    Returns:
+        dict: The claimed job, or None if the queue is empty.
+    """
+    db = SessionLocal()
+    try:
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+        candidates = (
+            db.query(Job.id, Job.status, Job.updated_at)
+            .filter(Job.mode == mode)
+            .filter(
+                (Job.status == "queued")
+                | ((Job.status == "running") & (Job.updated_at < stale_before))
+            )
+            .order_by(Job.created_at)
+            .limit(settings.JOB_CLAIM_BATCH)
+            .all()
+        )
+        for job_id, status, updated_at in candidates:
+            claimed = (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.status == status, Job.updated_at == updated_at)
+                .update(
+                    {"status": "running", "stage": None, "progress": 0.0, "updated_at": datetime.utcnow()},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if claimed:
+                return _job_to_dict(db.get(Job, job_id))
+        return None
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _update_job(job_id: str, **fields) -> bool:
+    """
+    Updates a running job and refreshes its heartbeat.
+
+    Returns:
+        bool: True if a cancel has been requested for the job.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if job is None:
+            return True
+        for key, value in fields.items():
+            setattr(job, key, value)
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        return job.cancel_requested
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+class JobWorkerPool:
+    """
+    A fixed number of asyncio workers that pull jobs of one mode from the
+    Jobs table and run them through run_pipeline_async.
+
+    Summarize and transcribe jobs get separate pools, so a backlog of
+    transcriptions never blocks cheap summaries. Each run also holds a slot
+    in its scheduler lane, shared with /process requests in the same
+    process; jobs wait for it rather than being shed. Cancelling a running job
+    stops it at the next await point; a stage that is already executing on a
+    thread (e.g. a Whisper pass) finishes in the background and is discarded.
+    """
+
+    def __init__(self, mode: str, workers: int):
+        self.mode = mode
+        self.workers = workers
+        self._tasks = []
+        self._stopping = False
+
+    def start(self):
+        self._stopping = False
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while not self._stopping:
+            try:
+                job = await run_in_stage("db", _claim_next_job, self.mode)
+            except Exception as e:
+                log.error("job claim failed", mode=self.mode, error=str(e))
+                job = None
+
+            if job is None:
+                await asyncio.sleep(settings.JOB_POLL_SECONDS)
+                continue
+
+            try:
+                await self._run_job(job)
+            except Exception as e:
+                # e.g. the status update itself failed; the job is left running
+                # and gets reclaimed once its heartbeat goes stale
+                log.error("job status update failed", job_id=job["id"], error=str(e))
+
+    async def _run_job(self, job: dict):
+        job_id = job["id"]
+        progress = STAGE_PROGRESS.get(job["mode"], {})
+
+        async def on_stage(stage: str):
+            cancelled = await run_in_stage("db", _update_job, job_id, stage=stage, progress=progress.get(stage, 0.0))
+            if cancelled:
+                raise JobCancelled()
+
+        async def run():
+            # Jobs share their submitter's fair-share tag with its /process requests
+            slot = await scheduler.admit(job["mode"], job["url"], job["model_size"], client=job["client"] or "jobs", shed=False)
+            async with slot:
+                return await run_pipeline_async(job["mode"], job["url"], on_stage=on_stage, model_size=job["model_size"])
+
+        # Peak RSS of the worker while this job ran, reported with its status
+        with track_memory(job["mode"], observe=False) as memory:
+            pipeline = asyncio.create_task(run())
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, pipeline))
+
+            try:
+                summary = await pipeline
+                await run_in_stage(
+                    "db", _update_job, job_id,
+                    status="completed", stage="done", progress=1.0, result=summary, peak_rss_mb=memory.stats()["peak_rss_mb"],
+                )
+                log.info("job completed", job_id=job_id)
+            except (JobCancelled, asyncio.CancelledError):
+                if self._stopping:
+                    # Worker shutdown: leave the job for another worker to pick up
+                    pipeline.cancel()
+                    await run_in_stage("db", _update_job, job_id, status="queued", stage=None)
+                    raise
+                await run_in_stage("db", _update_job, job_id, status="cancelled")
+                log.warning("job cancelled", job_id=job_id)
+            except Exception as e:
+                await run_in_stage("db", _update_job, job_id, status="failed", error=str(e), peak_rss_mb=memory.stats()["peak_rss_mb"])
+                log.error("job failed", job_id=job_id, error=str(e))
+            finally:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str, pipeline: asyncio.Task):
+        while not pipeline.done():
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            try:
+                cancelled = await run_in_stage("db", _update_job, job_id)
+            except Exception as e:
+                log.warning("job heartbeat failed", job_id=job_id, error=str(e))
+                continue
+            if cancelled:
+                pipeline.cancel()
+                return
+
+_pools = []
+
+async def start_job_workers():
+    """
+    Starts the summarize and transcribe worker pools in the current event loop.
+    """
+    await run_in_stage("db", ensure_jobs_table)
+    await run_in_stage("db", ensure_lock_table)  # Standalone workers may start before the API
+    for mode, workers in (
+        ("summarize", settings.JOB_SUMMARIZE_WORKERS),
+        ("transcribe", settings.JOB_TRANSCRIBE_WORKERS),
+    ):
+        if workers > 0:
+            pool = JobWorkerPool(mode, workers)
+            pool.start()
+            _pools.append(pool)
+
+async def stop_job_workers():
+    """
+    Stops all worker pools; running jobs are handed back to the queue.
+    """
+    await asyncio.gather(*(pool.stop() for pool in _pools), return_exceptions=True)
+    _pools.clear()
+
+async def _run_forever():
+    await asyncio.to_thread(warm_up)  # Load what settings.WARMUP names before claiming jobs
+    await run_in_stage("db", migrate_schema, engine)  # Workers may be upgraded before the API
+    await start_job_workers()
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await stop_job_workers()
+
+if __name__ == "__main__":
+    # Standalone worker process, sized independently from the API workers
+    log.info("starting job workers", summarize=settings.JOB_SUMMARIZE_WORKERS, transcribe=settings.JOB_TRANSCRIBE_WORKERS)
+    try:
+        asyncio.run(_run_forever())
+    except KeyboardInterrupt:
+        pass
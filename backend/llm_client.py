@@ -0,0 +1,351 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from ai_pipeline.config import settings
+from chunking import estimate_tokens
+from metrics import span, llm_requests, record_llm_usage
+from logs import get_logger
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+log = get_logger(__name__)
+
+class LLMError(Exception):
+    """Raised when a chat completion fails after all retries."""
+
+    def __init__(self, message: str, status_code: int = None, timed_out: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.timed_out = timed_out
+
+class TokenBucket:
+    """
+    Client-side rate limiter. Holds up to `capacity` units and refills at
+    `rate` units per second; callers block until enough units are available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount: float) -> float:
+        # Takes the units now (possibly going negative) and returns how long to wait for them
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, amount: float = 1.0):
+        if self.rate <= 0:
+            return
+        delay = self._reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+
+    def delay(self, amount: float = 1.0) -> float:
+        """Seconds a caller taking `amount` units now would wait, without taking them."""
+        if self.rate <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        with self._lock:
+            available = min(self.capacity, self._tokens + (time.monotonic() - self._updated) * self.rate)
+            return max(0.0, (amount - available) / self.rate)
+
+    async def acquire_async(self, amount: float = 1.0):
+        if self.rate <= 0:
+            return
+        delay = self._reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def _retry_after_seconds(headers) -> float:
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _backoff_seconds(attempt: int, headers=None) -> float:
+    """
+    Honors Retry-After when the server sends it, otherwise exponential
+    backoff with full jitter so concurrent callers don't retry in lockstep.
+    """
+    if headers is not None:
+        retry_after = _retry_after_seconds(headers)
+        if retry_after is not None:
+            return min(retry_after, settings.LLM_BACKOFF_MAX_SECONDS)
+    ceiling = min(settings.LLM_BACKOFF_MAX_SECONDS, settings.LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+def _json_body(response) -> dict:
+    # No status code on the error: a malformed body from one route fails over like an outage
+    try:
+        data = response.json()
+    except ValueError as e:
+        raise LLMError(f"Invalid JSON in response from Groq API. Error: {str(e)}")
+    if not isinstance(data, dict):
+        raise LLMError(f"Unexpected response format from Groq API: {type(data).__name__}")
+    return data
+
+def _parse_completion(data: dict) -> str:
+    try:
+        return data["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError) as e:
+        raise LLMError(f"Unexpected response format from Groq API. Error: {str(e)}")
+
+def _record_usage(attributes: dict, usage: dict, messages: list, completion: str):
+    # Prefer the server's counts; fall back to the same estimate used for rate limiting
+    usage = usage or {}
+    prompt_tokens = usage.get("prompt_tokens") or sum(estimate_tokens(m.get("content", "")) for m in messages)
+    completion_tokens = usage.get("completion_tokens") or estimate_tokens(completion)
+    record_llm_usage(prompt_tokens, completion_tokens)
+    attributes.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+class LLMClient:
+    """
+    Shared client for OpenAI-compatible chat completion endpoints (Groq).
+
+    Keeps a keep-alive connection pool for both the sync (requests) and async
+    (httpx) interfaces, retries 429/5xx responses with backoff and paces
+    requests with request- and token-per-minute buckets.
+    """
+
+    def __init__(self, api_url: str = None, api_key: str = None, model: str = None,
+                 requests_per_minute: int = None, tokens_per_minute: int = None):
+        self.api_url = api_url or settings.GROQ_API_URL
+        self.api_key = api_key or settings.GROQ_API_KEY
+        self.model = model or settings.MODEL_NAME
+        rpm = settings.GROQ_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute
+        tpm = settings.GROQ_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+        self.request_bucket = TokenBucket(rpm / 60.0, max(1, rpm // 10))
+        self.token_bucket = TokenBucket(tpm / 60.0, max(1, tpm // 2))
+        self._session = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def _headers(self) -> dict:
+        if not self.api_key:
+            raise LLMError("Groq API key is not set in the environment variables.")
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def _payload(self, messages: list, temperature: float, model: str, **extra) -> dict:
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+        }
+        payload.update(extra)
+        return payload
+
+    def queue_delay(self, messages: list) -> float:
+        """Seconds the rate limiters would hold a request for these messages right now."""
+        return max(self.request_bucket.delay(), self.token_bucket.delay(self._cost(messages)))
+
+    def _cost(self, messages: list) -> int:
+        # Prompt tokens plus a typical completion, charged against the TPM bucket
+        return sum(estimate_tokens(m.get("content", "")) for m in messages) + settings.LLM_EXPECTED_COMPLETION_TOKENS
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.LLM_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=settings.LLM_POOL_SIZE, max_keepalive_connections=settings.LLM_POOL_SIZE),
+            )
+        return self._async_client
+
+    def chat(self, messages: list, temperature: float = 0.5, model: str = None, max_retries: int = None, timeout: float = None) -> str:
+        """
+        Sends a chat completion request and returns the message content.
+
+        Args:
+            max_retries (int, optional): Overrides LLM_MAX_RETRIES for this call.
+            timeout (float, optional): Overrides LLM_TIMEOUT_SECONDS for this call.
+
+        Raises:
+            LLMError: If the request still fails after all retries.
+        """
+        headers = self._headers()
+        payload = self._payload(messages, temperature, model)
+        cost = self._cost(messages)
+        max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+
+        with span("llm", model=payload["model"]) as attributes:
+            for attempt in range(max_retries + 1):
+                self.request_bucket.acquire()
+                self.token_bucket.acquire(cost)
+                try:
+                    response = self.session.post(self.api_url, headers=headers, json=payload, timeout=timeout or settings.LLM_TIMEOUT_SECONDS)
+                except requests.exceptions.RequestException as e:
+                    if attempt >= max_retries:
+                        raise LLMError(f"Error in API request: {str(e)}", timed_out=isinstance(e, requests.exceptions.Timeout))
+                    time.sleep(_backoff_seconds(attempt))
+                    continue
+
+                llm_requests.inc(status=str(response.status_code))
+                if response.status_code in RETRY_STATUSES and attempt < max_retries:
+                    delay = _backoff_seconds(attempt, response.headers)
+                    attributes["retries"] = attempt + 1
+                    log.warning("llm retry", status=response.status_code, delay_seconds=round(delay, 2))
+                    time.sleep(delay)
+                    continue
+
+                if response.status_code >= 400:
+                    raise LLMError(f"Error in API request: {response.status_code} {response.text[:200]}", status_code=response.status_code)
+                data = _json_body(response)
+                text = _parse_completion(data)
+                _record_usage(attributes, data.get("usage"), messages, text)
+                return text
+
+    async def achat(self, messages: list, temperature: float = 0.5, model: str = None, max_retries: int = None, timeout: float = None) -> str:
+        """
+        Async variant of chat() for use directly on the event loop.
+        """
+        headers = self._headers()
+        payload = self._payload(messages, temperature, model)
+        cost = self._cost(messages)
+        max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+
+        with span("llm", model=payload["model"]) as attributes:
+            for attempt in range(max_retries + 1):
+                await self.request_bucket.acquire_async()
+                await self.token_bucket.acquire_async(cost)
+                try:
+                    response = await self.async_client.post(self.api_url, headers=headers, json=payload, timeout=timeout or settings.LLM_TIMEOUT_SECONDS)
+                except httpx.HTTPError as e:
+                    if attempt >= max_retries:
+                        raise LLMError(f"Error in API request: {str(e)}", timed_out=isinstance(e, httpx.TimeoutException))
+                    await asyncio.sleep(_backoff_seconds(attempt))
+                    continue
+
+                llm_requests.inc(status=str(response.status_code))
+                if response.status_code in RETRY_STATUSES and attempt < max_retries:
+                    delay = _backoff_seconds(attempt, response.headers)
+                    attributes["retries"] = attempt + 1
+                    log.warning("llm retry", status=response.status_code, delay_seconds=round(delay, 2))
+                    await asyncio.sleep(delay)
+                    continue
+
+                if response.status_code >= 400:
+                    raise LLMError(f"Error in API request: {response.status_code} {response.text[:200]}", status_code=response.status_code)
+                data = _json_body(response)
+                text = _parse_completion(data)
+                _record_usage(attributes, data.get("usage"), messages, text)
+                return text
+
+    async def astream_chat(self, messages: list, temperature: float = 0.5, model: str = None, max_retries: int = None, timeout: float = None):
+        """
+        Streams a chat completion (stream: true) and yields content deltas as
+        they arrive. Retries only happen before the first token is received.
+        The timeout applies to the first token and to each gap between chunks.
+        """
+        headers = self._headers()
+        payload = self._payload(messages, temperature, model, stream=True)
+        cost = self._cost(messages)
+        received = False
+        parts = []
+        usage = None
+        max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+
+        with span("llm", model=payload["model"], streaming=True) as attributes:
+            for attempt in range(max_retries + 1):
+                await self.request_bucket.acquire_async()
+                await self.token_bucket.acquire_async(cost)
+                try:
+                    async with self.async_client.stream(
+                        "POST", self.api_url, headers=headers, json=payload, timeout=timeout or settings.LLM_TIMEOUT_SECONDS
+                    ) as response:
+                        llm_requests.inc(status=str(response.status_code))
+                        if response.status_code in RETRY_STATUSES and attempt < max_retries:
+                            delay = _backoff_seconds(attempt, response.headers)
+                            attributes["retries"] = attempt + 1
+                            log.warning("llm retry", status=response.status_code, delay_seconds=round(delay, 2))
+                            await asyncio.sleep(delay)
+                            continue
+
+                        if response.status_code >= 400:
+                            body = (await response.aread()).decode("utf-8", "replace")
+                            raise LLMError(f"Error in API request: {response.status_code} {body[:200]}", status_code=response.status_code)
+
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                break
+                            try:
+                                chunk = json.loads(data)
+                                # Groq reports usage on the last chunk under x_groq, OpenAI at the top level
+                                usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or usage
+                                choices = chunk.get("choices") or []
+                                delta = choices[0]["delta"].get("content") if choices else None
+                            except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                                raise LLMError(f"Unexpected stream format from Groq API. Error: {str(e)}")
+                            if delta:
+                                received = True
+                                parts.append(delta)
+                                yield delta
+                        _record_usage(attributes, usage, messages, "".join(parts))
+                        return
+                except httpx.HTTPError as e:
+                    if received or attempt >= max_retries:
+                        raise LLMError(f"Error in API request: {str(e)}", timed_out=isinstance(e, httpx.TimeoutException))
+                    await asyncio.sleep(_backoff_seconds(attempt))
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    async def aclose(self):
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """
+    Returns the process-wide LLM client so every caller shares one pool and
+    one set of rate limits.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
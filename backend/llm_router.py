@@ -0,0 +1,314 @@
+import json
+import os
+import threading
+import time
+from ai_pipeline.config import settings
+from chunking import estimate_tokens
+from llm_client import LLMClient, LLMError
+from logs import get_logger
+from metrics import CallbackMetric, llm_route_requests, llm_failovers
+
+log = get_logger(__name__)
+
+# Weight of the newest call in a route's average latency
+LATENCY_SMOOTHING = 0.2
+# Errors another route may not have: throttling, outages, timeouts and prompts too large for the model
+FAILOVER_STATUSES = {413, 429}
+
+class RoutedText(str):
+    """
+    Completion text that remembers which route produced it, as
+    '<route name>:<model>', so the summary row can record it.
+    """
+
+    def __new__(cls, text: str, route: str):
+        routed = super().__new__(cls, text)
+        routed.route = route
+        return routed
+
+def _fails_over(error: LLMError) -> bool:
+    return error.status_code is None or error.status_code in FAILOVER_STATUSES or error.status_code >= 500
+
+def _reason(error: LLMError) -> str:
+    if error.timed_out:
+        return "timeout"
+    return str(error.status_code) if error.status_code is not None else "unavailable"
+
+class Route:
+    """
+    One model on one OpenAI-compatible endpoint, with its own connection
+    pool, rate limits and health.
+
+    Args:
+        name (str): Label used in metrics, logs and the stored route.
+        model (str): Model name sent to the endpoint.
+        api_url (str, optional): Chat completions URL (default GROQ_API_URL).
+        api_key (str, optional): Bearer token (default GROQ_API_KEY).
+        max_input_tokens (int): Largest input the route is used for (default CHUNK_MAX_TOKENS).
+        cost_per_million_tokens (float): USD per million prompt and completion
+            tokens, checked against LLM_MAX_COST_PER_REQUEST.
+        fallback_only (bool): Only tried after every other route has failed.
+        requests_per_minute (int, optional): The endpoint's limit (default GROQ_REQUESTS_PER_MINUTE).
+        tokens_per_minute (int, optional): The endpoint's limit (default GROQ_TOKENS_PER_MINUTE).
+    """
+
+    def __init__(self, name: str, model: str, api_url: str = None, api_key: str = None,
+                 max_input_tokens: int = None, cost_per_million_tokens: float = 0.0, fallback_only: bool = False,
+                 requests_per_minute: int = None, tokens_per_minute: int = None):
+        self.name = name
+        self.model = model
+        self.max_input_tokens = max_input_tokens or settings.CHUNK_MAX_TOKENS
+        self.cost_per_million_tokens = cost_per_million_tokens
+        self.fallback_only = fallback_only
+        self.client = LLMClient(api_url, api_key, model, requests_per_minute, tokens_per_minute)
+        self.latency = None  # Moving average of successful calls, in seconds
+        self.failures = 0  # Consecutive
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    def cost(self, tokens: int) -> float:
+        return tokens * self.cost_per_million_tokens / 1_000_000
+
+    def is_open(self) -> bool:
+        # Circuit breaker: skipped until the cooldown ends, then tried again
+        return time.monotonic() < self.open_until
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.latency = seconds if self.latency is None else (1 - LATENCY_SMOOTHING) * self.latency + LATENCY_SMOOTHING * seconds
+        llm_route_requests.inc(route=self.name, result="served")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            opened = self.failures >= settings.LLM_CIRCUIT_FAILURES and not self.is_open()
+            if opened:
+                self.open_until = time.monotonic() + settings.LLM_CIRCUIT_COOLDOWN_SECONDS
+        llm_route_requests.inc(route=self.name, result="failed")
+        if opened:
+            log.warning("llm route circuit open", route=self.name, failures=self.failures, cooldown_seconds=settings.LLM_CIRCUIT_COOLDOWN_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "model": self.model,
+            "api_url": self.client.api_url,
+            "max_input_tokens": self.max_input_tokens,
+            "cost_per_million_tokens": self.cost_per_million_tokens,
+            "fallback_only": self.fallback_only,
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "consecutive_failures": self.failures,
+            "circuit_open": self.is_open(),
+        }
+
+class LLMRouter:
+    """
+    Picks a route for each chat completion and fails over along the others.
+
+    Routes are tried in configured order (list the fastest, cheapest model
+    first), skipping ones whose context is too small for the prompt or whose
+    estimated cost exceeds LLM_MAX_COST_PER_REQUEST. Routes whose rate
+    limiter would hold the request past LLM_LATENCY_SLO_SECONDS, fallback-only
+    routes and routes with an open circuit are moved to the back.
+
+    Every route but the last gets LLM_ROUTE_RETRIES retries and the latency
+    SLO as its timeout, so a throttled or slow route is left quickly; the
+    last one gets the client's full retry budget.
+    """
+
+    def __init__(self, routes: list):
+        if not routes:
+            raise ValueError("❌ At least one LLM route is required.")
+        self.routes = routes
+
+    def max_input_tokens(self) -> int:
+        """Largest input a regular (not fallback-only) route takes in one request."""
+        regular = [r for r in self.routes if not r.fallback_only] or self.routes
+        return max(r.max_input_tokens for r in regular)
+
+    def plan(self, messages: list, input_tokens: int = None) -> list:
+        """
+        Returns the routes to try for these messages, in order.
+
+        Args:
+            input_tokens (int, optional): Size of the text being processed,
+                compared to max_input_tokens; defaults to the whole prompt.
+        """
+        tokens = input_tokens if input_tokens is not None else sum(estimate_tokens(m.get("content", "")) for m in messages)
+        candidates = [r for r in self.routes if r.max_input_tokens >= tokens]
+        if not candidates:
+            candidates = sorted(self.routes, key=lambda r: -r.max_input_tokens)  # Nothing fits; the largest context truncates least
+
+        if settings.LLM_MAX_COST_PER_REQUEST > 0:
+            total = sum(estimate_tokens(m.get("content", "")) for m in messages) + settings.LLM_EXPECTED_COMPLETION_TOKENS
+            affordable = [r for r in candidates if r.cost(total) <= settings.LLM_MAX_COST_PER_REQUEST]
+            candidates = affordable or sorted(candidates, key=lambda r: r.cost(total))[:1]
+
+        slo = settings.LLM_LATENCY_SLO_SECONDS
+        return sorted(candidates, key=lambda r: (r.is_open(), r.fallback_only, slo > 0 and r.client.queue_delay(messages) > slo))
+
+    def _limits(self, plan: list, i: int) -> dict:
+        if i == len(plan) - 1:
+            return {}
+        return {"max_retries": settings.LLM_ROUTE_RETRIES, "timeout": settings.LLM_LATENCY_SLO_SECONDS or None}
+
+    def _fail_over(self, plan: list, i: int, error: LLMError) -> bool:
+        """
+        Records a failed call on plan[i]; True if the request moves on to the next route.
+        """
+        if not _fails_over(error):
+            return False
+        route = plan[i]
+        route.record_failure()
+        if i == len(plan) - 1:
+            return False
+        reason = _reason(error)
+        llm_failovers.inc(route=route.name, reason=reason)
+        log.warning("llm failover", route=route.name, to=plan[i + 1].name, reason=reason, error=str(error))
+        return True
+
+    def chat(self, messages: list, temperature: float = 0.5, input_tokens: int = None) -> RoutedText:
+        """
+        Blocking chat completion on the first route that answers.
+
+        Args:
+            input_tokens (int, optional): See plan().
+
+        Raises:
+            LLMError: The error of the last route tried.
+        """
+        plan = self.plan(messages, input_tokens)
+        for i, route in enumerate(plan):
+            started = time.monotonic()
+            try:
+                text = route.client.chat(messages, temperature, **self._limits(plan, i))
+            except LLMError as e:
+                if self._fail_over(plan, i, e):
+                    continue
+                raise
+            route.record_success(time.monotonic() - started)
+            return RoutedText(text, route.label)
+
+    async def achat(self, messages: list, temperature: float = 0.5, input_tokens: int = None) -> RoutedText:
+        """
+        Async variant of chat().
+        """
+        plan = self.plan(messages, input_tokens)
+        for i, route in enumerate(plan):
+            started = time.monotonic()
+            try:
+                text = await route.client.achat(messages, temperature, **self._limits(plan, i))
+            except LLMError as e:
+                if self._fail_over(plan, i, e):
+                    continue
+                raise
+            route.record_success(time.monotonic() - started)
+            return RoutedText(text, route.label)
+
+    async def astream_chat(self, messages: list, temperature: float = 0.5, input_tokens: int = None, served: dict = None):
+        """
+        Streams content deltas from the first route that answers. Failover
+        only happens before the first token; after that an error is raised.
+
+        Args:
+            input_tokens (int, optional): See plan().
+            served (dict, optional): Receives 'route' once the first token arrives.
+        """
+        plan = self.plan(messages, input_tokens)
+        for i, route in enumerate(plan):
+            started = time.monotonic()
+            received = False
+            try:
+                async for delta in route.client.astream_chat(messages, temperature, **self._limits(plan, i)):
+                    if not received:
+                        received = True
+                        if served is not None:
+                            served["route"] = route.label
+                    yield delta
+            except LLMError as e:
+                if received:
+                    route.record_failure()
+                    raise
+                if self._fail_over(plan, i, e):
+                    continue
+                raise
+            route.record_success(time.monotonic() - started)
+            return
+
+    def stats(self) -> list:
+        return [route.stats() for route in self.routes]
+
+    def close(self):
+        for route in self.routes:
+            route.client.close()
+
+    async def aclose(self):
+        for route in self.routes:
+            await route.client.aclose()
+
+def load_routes() -> list:
+    """
+    Builds the routes from LLM_ROUTES, a JSON list such as
+        [{"name": "fast", "model": "llama-3.1-8b-instant", "max_input_tokens": 6000},
+         {"name": "long", "model": "llama-3.3-70b-versatile", "max_input_tokens": 100000,
+          "cost_per_million_tokens": 0.7},
+         {"name": "backup", "model": "gpt-4o-mini", "api_url": "https://api.openai.com/v1/chat/completions",
+          "api_key_env": "OPENAI_API_KEY", "max_input_tokens": 100000, "fallback_only": true}]
+    where each object takes Route's arguments, with the API key read from
+    the environment variable named by api_key_env.
+
+    Without LLM_ROUTES: MODEL_NAME on GROQ_API_URL, followed by
+    LLM_FALLBACK_MODEL / LLM_FALLBACK_API_URL as a fallback-only route if set.
+    """
+    if not settings.LLM_ROUTES:
+        routes = [Route("primary", settings.MODEL_NAME)]
+        if settings.LLM_FALLBACK_MODEL or settings.LLM_FALLBACK_API_URL:
+            routes.append(Route(
+                "fallback",
+                settings.LLM_FALLBACK_MODEL or settings.MODEL_NAME,
+                settings.LLM_FALLBACK_API_URL or None,
+                settings.LLM_FALLBACK_API_KEY or None,
+                fallback_only=True,
+            ))
+        return routes
+
+    try:
+        specs = json.loads(settings.LLM_ROUTES)
+        routes = []
+        for spec in specs:
+            spec = dict(spec)
+            key_env = spec.pop("api_key_env", None)
+            if key_env:
+                spec["api_key"] = os.getenv(key_env)
+            spec.setdefault("name", spec.get("model"))
+            routes.append(Route(**spec))
+        return routes
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"❌ Invalid LLM_ROUTES: {e}")
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_llm_router() -> LLMRouter:
+    """
+    Returns the process-wide router, so every caller shares the routes'
+    pools, rate limits and health.
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LLMRouter(load_routes())
+        return _router
+
+CallbackMetric(
+    "flashdigest_llm_route_circuit_open",
+    "1 while an LLM route is skipped after consecutive failures.",
+    ("route",),
+    lambda: {(route.name,): int(route.is_open()) for route in get_llm_router().routes},
+)
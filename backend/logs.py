@@ -0,0 +1,85 @@
+import json
+import logging
+import sys
+import threading
+from datetime import datetime, timezone
+from ai_pipeline.config import settings
+
+_configured = False
+_configure_lock = threading.Lock()
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON object per line: timestamp, level,
+    logger, event and any structured fields passed with the call.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{record.levelname:<7} {record.name}: {record.getMessage()}" + (f" {fields}" if fields else "")
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+def configure_logging():
+    """
+    Installs the JSON (or text) handler on the root logger once per process.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(TextFormatter() if settings.LOG_FORMAT == "text" else JsonFormatter())
+        root = logging.getLogger()
+        root.addHandler(handler)
+        root.setLevel(settings.LOG_LEVEL.upper())
+        # Per-request access lines from the HTTP clients would drown out the pipeline events
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        logging.getLogger("httpcore").setLevel(logging.WARNING)
+        _configured = True
+
+class StructuredLogger:
+    """
+    Thin wrapper over logging.Logger that takes structured fields as keyword
+    arguments: log.info("summary saved", source=url, chars=len(text)).
+    """
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level: int, event: str, exc_info=False, **fields):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, **fields):
+        self._log(logging.ERROR, event, **fields)
+
+    def exception(self, event: str, **fields):
+        self._log(logging.ERROR, event, exc_info=True, **fields)
+
+def get_logger(name: str) -> StructuredLogger:
+    configure_logging()
+    return StructuredLogger(name)
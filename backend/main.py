@@ -1,12 +1,33 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+from datetime import datetime
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from summarizer_groq import summarize_text  # Function for summarization
-from transcription import transcribe_audio  # Function for transcription
-import os
-from fetch_sources import get_youtube_audio, fetch_news_content
-from db.db_insert import save_summary_to_db
-from db.database import get_db
+from run_pipeline import run_pipeline_async, stream_pipeline  # Non-blocking summarize/transcribe pipeline
+from executors import run_in_stage, shutdown_executors
+from jobs import create_job, get_job, cancel_job, count_queued_jobs, start_job_workers, stop_job_workers
+from feeds import ensure_feed_tables, add_feed, list_feeds, request_poll, list_digests, start_feed_poller, stop_feed_poller
+from cache import cache_stats
+from transcript_cache import transcript_cache_stats
+from llm_router import get_llm_router
+from fetcher import get_fetcher
+from whisper_pool import whisper_pool, MODEL_SIZES
+from batch import parse_url_lines, is_valid_batch_id, start_batch, get_batch, cancel_batch
+from db.database import SessionLocal, engine
+from db.search import ensure_search_index, list_summaries, get_summary
+from db.migrations import ensure_summary_tables, migrate_schema
+from db.segments import load_segments, search_segments
+from singleflight import ensure_lock_table
+from warmup import resolve_hooks, warm_up, warmup_status
+from scheduler import scheduler, Overloaded
+from ai_pipeline.config import settings
+from logs import get_logger
+from metrics import render_metrics
+
+log = get_logger(__name__)
 
 app = FastAPI()
 
@@ -22,76 +43,289 @@ app.add_middleware(
 class ProcessRequest(BaseModel):
     url: str
     mode: str  # 'summarize' or 'transcribe'
+    background: bool = False  # Return a job ID right away instead of waiting for the result
+    model_size: Optional[str] = None  # Whisper model for transcribe mode: 'tiny', 'base' or 'small'
+
+def _validate(data: ProcessRequest):
+    if data.mode not in ["summarize", "transcribe"]:
+        raise HTTPException(status_code=400, detail="Invalid mode selected. Choose either 'summarize' or 'transcribe'.")
+    if data.model_size is not None and data.model_size not in MODEL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Invalid model size. Choose one of {', '.join(MODEL_SIZES)}.")
+
+_trusted_proxies = {address.strip() for address in settings.SCHEDULER_TRUSTED_PROXIES.split(",") if address.strip()}
+
+def _client_id(request: Request) -> str:
+    # Fair-share identity: the remote address, or the client header when a trusted proxy sets it
+    peer = request.client.host if request.client else "unknown"
+    header = request.headers.get(settings.SCHEDULER_CLIENT_HEADER)
+    if header and peer in _trusted_proxies:
+        return header[:128]
+    return peer
+
+def _too_many_requests(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+class BatchRequest(BaseModel):
+    urls: List[str]  # One URL (or 'mode URL') per entry
+    mode: Optional[str] = None  # Default for entries without a mode; otherwise picked from the URL
+    model_size: Optional[str] = None
+    batch_id: Optional[str] = None  # Resume an earlier batch from its progress file
+
+class FeedRequest(BaseModel):
+    url: str  # RSS/Atom feed, sitemap or sitemap index
+    poll_seconds: Optional[int] = None  # Default FEED_POLL_SECONDS
+
+_background_tasks = set()
+
+@app.on_event("startup")
+async def start_workers():
+    # Creates missing tables on a fresh database, then adds columns introduced since they were created
+    await run_in_stage("db", ensure_summary_tables, engine)
+    await run_in_stage("db", migrate_schema, engine)
+    # Idempotent: creates the full-text index only if it's missing
+    await run_in_stage("db", ensure_search_index, engine)
+    await run_in_stage("db", ensure_lock_table)
+    get_llm_router()  # Raises on an invalid LLM_ROUTES before any request needs it
+    if settings.JOB_WORKERS_IN_API:
+        await start_job_workers()
+    await run_in_stage("db", ensure_feed_tables)
+    if settings.FEED_POLLER_IN_API:
+        await start_feed_poller()
+    if resolve_hooks(settings.WARMUP):  # Raises on unknown targets before any are run
+        warming = asyncio.create_task(asyncio.to_thread(warm_up))
+        _background_tasks.add(warming)
+        warming.add_done_callback(_background_tasks.discard)
+        if settings.WARMUP_BLOCKING:
+            await warming
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await stop_job_workers()
+    await stop_feed_poller()
+    await get_llm_router().aclose()
+    get_fetcher().close()
+    # Let in-flight stage calls finish before the worker exits
+    shutdown_executors(wait=True)
+
+@app.get("/")
+async def root():
+    return {"message": "Welcome to the API!"}
+
+@app.post("/process")
+async def process_request(data: ProcessRequest, request: Request):
+    _validate(data)
 
-def run_pipeline(mode: str, url: str):
-    """
-    Runs the summarization or transcription pipeline based on user input.
+    if data.background:
+        if settings.JOB_MAX_QUEUED and await run_in_stage("db", count_queued_jobs, data.mode) >= settings.JOB_MAX_QUEUED:
+            raise _too_many_requests(Overloaded(f"Too many queued {data.mode} jobs.", settings.SCHEDULER_RETRY_AFTER_SECONDS))
+        client = _client_id(request)
+        if settings.JOB_CLIENT_MAX_QUEUED and await run_in_stage("db", count_queued_jobs, data.mode, client) >= settings.JOB_CLIENT_MAX_QUEUED:
+            raise _too_many_requests(Overloaded(f"Too many queued {data.mode} jobs from this client.", settings.SCHEDULER_RETRY_AFTER_SECONDS))
+        job = await run_in_stage("db", create_job, data.mode, data.url, data.model_size, client)
+        return JSONResponse(status_code=202, content={"job_id": job["id"], "status": job["status"]})
 
-    Args:
-        mode (str): Either 'summarize' or 'transcribe'
-        url (str): URL of the news article or YouTube video
-    """
+    try:
+        # Picks the lane before anything is fetched or downloaded
+        slot = await scheduler.admit(data.mode, data.url, data.model_size, _client_id(request))
+    except Overloaded as e:
+        raise _too_many_requests(e)
 
-    # Initialize database session
     try:
-        db = next(get_db())
+        # Blocking stages run on their own executors, so the event loop stays free
+        async with slot:
+            result = await run_pipeline_async(mode=data.mode, url=data.url, model_size=data.model_size)
+    except Overloaded as e:
+        raise _too_many_requests(e)
     except Exception as e:
-        print(f"❌ Failed to initialize DB session: {e}")
-        return {"error": f"Failed to initialize DB session: {e}"}
+        log.exception("pipeline failed", mode=data.mode, url=data.url)
+        result = {"error": f"An error occurred: {str(e)}"}
+
+    # Return result to the user
+    return {"result": result}
+
+def _sse(event: str, data) -> str:
+    # JSON-encode the payload so newlines in summaries don't break SSE framing
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/process/stream")
+async def process_stream(data: ProcessRequest, request: Request):
+    _validate(data)
 
     try:
-        if mode == "summarize":
-            print(f"📰 Summarizing news article: {url}")
-            content = fetch_news_content(url)
-            summary = summarize_text(content)
-            # Save summary to DB
-            save_summary_to_db(db, source=url, content=content, summary=summary)
-            db.commit()  # Commit the changes
-            return summary
-
-        elif mode == "transcribe":
-            print(f"🎥 Transcribing YouTube video: {url}")
-            audio_files = get_youtube_audio([url], base_filename="temp_audio")
-
-            if not audio_files or not os.path.exists(audio_files[0]):
-                raise FileNotFoundError("❌ Audio file not found after downloading.")
-
-            # Perform transcription
-            transcript = transcribe_audio(audio_files[0])
-            summary = summarize_text(transcript)
-            
-            # Save summary to DB
-            save_summary_to_db(db, source=url, content=transcript, summary=summary)
-            db.commit()  # Commit the changes
-            return summary
-
-        else:
-            raise ValueError(f"❌ Invalid mode '{mode}'. Choose 'summarize' or 'transcribe'.")
+        slot = await scheduler.admit(data.mode, data.url, data.model_size, _client_id(request))
+    except Overloaded as e:
+        raise _too_many_requests(e)
 
-    except Exception as e:
-        db.rollback()
-        print(f"\n❌ Pipeline failed with error:\n{e}")
-        return {"error": f"An error occurred: {str(e)}"}
+    async def events():
+        try:
+            # The slot is taken inside the stream, so a disconnect before it starts holds nothing
+            yield _sse("stage", "queued")
+            async with slot:
+                async for event, payload in stream_pipeline(mode=data.mode, url=data.url, model_size=data.model_size):
+                    yield _sse(event, payload)
+        except Overloaded as e:
+            yield _sse("error", f"{e} Retry in {e.retry_after} seconds.")
+        except Exception as e:
+            log.exception("pipeline failed", mode=data.mode, url=data.url)
+            yield _sse("error", f"An error occurred: {str(e)}")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # Stop proxies from buffering the stream
+    )
+
+@app.post("/batch")
+async def create_batch(data: BatchRequest):
+    if data.mode is not None and data.mode not in ["summarize", "transcribe"]:
+        raise HTTPException(status_code=400, detail="Invalid mode selected. Choose either 'summarize' or 'transcribe'.")
+    if data.model_size is not None and data.model_size not in MODEL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Invalid model size. Choose one of {', '.join(MODEL_SIZES)}.")
+    if data.batch_id is not None and not is_valid_batch_id(data.batch_id):
+        raise HTTPException(status_code=400, detail="Invalid batch ID; expected the 32-character ID returned when the batch was created.")
+
+    items = parse_url_lines(data.urls, default_mode=data.mode)
+    if not items:
+        raise HTTPException(status_code=400, detail="No URLs provided.")
+
+    try:
+        batch_id = start_batch(items, batch_id=data.batch_id, model_size=data.model_size)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse(status_code=202, content={"batch_id": batch_id, "total": len(items)})
 
+@app.get("/batch/{batch_id}")
+async def batch_status(batch_id: str):
+    status = get_batch(batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return status
+
+@app.post("/batch/{batch_id}/cancel")
+async def batch_cancel(batch_id: str):
+    status = cancel_batch(batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return status
+
+def _list_summaries(**filters):
+    db = SessionLocal()
+    try:
+        return list_summaries(db, **filters)
     finally:
         db.close()
 
-@app.get("/")
-async def root():
-    return {"message": "Welcome to the API!"}
+def _get_summary(summary_id: int, include_content: bool = True):
+    db = SessionLocal()
+    try:
+        return get_summary(db, summary_id, include_content)
+    finally:
+        db.close()
 
-@app.post("/process")
-async def process_request(data: ProcessRequest):
+def _transcript_segments(query, summary_id: int, *args):
+    db = SessionLocal()
     try:
-        if data.mode not in ["summarize", "transcribe"]:
-            raise HTTPException(status_code=400, detail="Invalid mode selected. Choose either 'summarize' or 'transcribe'.")
+        return query(db, summary_id, *args)
+    finally:
+        db.close()
 
-        # Call the pipeline function based on mode
-        result = run_pipeline(mode=data.mode, url=data.url)
+@app.get("/summaries")
+async def summaries(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[int] = None,  # next_cursor from the previous page
+    source: Optional[str] = None,
+    q: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    return await run_in_stage(
+        "db", _list_summaries, limit=limit, before_id=cursor, source=source, q=q, since=since, until=until
+    )
 
-        # Return result to the user
-        return {"result": result}
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+@app.get("/summaries/{summary_id}")
+async def summary_detail(summary_id: int, content: bool = True):
+    summary = await run_in_stage("db", _get_summary, summary_id, content)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Summary not found.")
+    return summary
+
+@app.get("/summaries/{summary_id}/transcript")
+async def summary_transcript(summary_id: int, start: Optional[float] = Query(None, ge=0), end: Optional[float] = Query(None, ge=0)):
+    # Timed segments overlapping [start, end] seconds; reads only the stored blocks covering the range
+    segments = await run_in_stage("db", _transcript_segments, load_segments, summary_id, start, end)
+    if segments is None:
+        raise HTTPException(status_code=404, detail="No timed transcript for this summary.")
+    return {"summary_id": summary_id, "start": start, "end": end, "segments": segments}
+
+@app.get("/summaries/{summary_id}/transcript/search")
+async def summary_transcript_search(summary_id: int, q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=200)):
+    segments = await run_in_stage("db", _transcript_segments, search_segments, summary_id, q, limit)
+    if segments is None:
+        raise HTTPException(status_code=404, detail="No timed transcript for this summary.")
+    return {"summary_id": summary_id, "q": q, "segments": segments}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await run_in_stage("db", get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.post("/jobs/{job_id}/cancel")
+async def job_cancel(job_id: str):
+    job = await run_in_stage("db", cancel_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.get("/feeds")
+async def feeds():
+    return await run_in_stage("db", list_feeds)
+
+@app.post("/feeds")
+async def feed_add(data: FeedRequest):
+    if not data.url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="Feed URL must start with http:// or https://.")
+    if data.poll_seconds is not None and data.poll_seconds < 60:
+        raise HTTPException(status_code=400, detail="poll_seconds must be at least 60.")
+    return JSONResponse(status_code=201, content=await run_in_stage("db", add_feed, data.url, data.poll_seconds))
+
+@app.post("/feeds/{feed_id}/poll")
+async def feed_poll(feed_id: int):
+    # Due on the poller's next tick (within FEED_TICK_SECONDS)
+    feed = await run_in_stage("db", request_poll, feed_id)
+    if feed is None:
+        raise HTTPException(status_code=404, detail="Feed not found.")
+    return feed
+
+@app.get("/feeds/{feed_id}/digests")
+async def feed_digests(feed_id: int, limit: int = Query(5, ge=1, le=50)):
+    return await run_in_stage("db", list_digests, feed_id, limit)
+
+@app.get("/health")
+async def health():
+    # Liveness plus warm-up progress; heavy dependencies not listed load on first use
+    return {"status": "ok", "warmup": warmup_status()}
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {**cache_stats(), "transcripts": transcript_cache_stats()}
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format; counters are per worker process
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/whisper/models")
+async def get_whisper_models():
+    return whisper_pool.stats()
+
+@app.get("/llm/routes")
+async def get_llm_routes():
+    # Configured routes in order of preference, with their latency and circuit state
+    return get_llm_router().stats()
 
+@app.get("/scheduler/stats")
+async def get_scheduler_stats():
+    # Per-lane slots, queue depth and the Retry-After a shed request would get
+    return scheduler.stats()
@@ -0,0 +1,117 @@
+import os
+import resource
+import sys
+import threading
+from contextlib import contextmanager
+from ai_pipeline.config import settings
+from logs import get_logger
+from metrics import job_peak_rss_bytes
+
+log = get_logger(__name__)
+
+MB = 1024 * 1024
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def current_rss() -> int:
+    """
+    Resident set size of this process in bytes. Falls back to ru_maxrss
+    (the peak since process start) where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+def job_budget_bytes() -> int:
+    """Per-job memory budget in bytes, or 0 for no limit."""
+    return max(0, settings.JOB_MEMORY_BUDGET_MB) * MB
+
+class JobMemory:
+    """
+    Process RSS observed while one job ran: at its start and the peak.
+
+    RSS is per process, so with several jobs running at once each one's
+    peak includes the others; rss_growth (peak minus start) is the closer
+    estimate of what the job itself added.
+    """
+
+    def __init__(self):
+        self.start_rss = current_rss()
+        self.peak_rss = self.start_rss
+
+    def sample(self, rss: int):
+        if rss > self.peak_rss:
+            self.peak_rss = rss
+
+    @property
+    def growth(self) -> int:
+        return self.peak_rss - self.start_rss
+
+    def stats(self) -> dict:
+        return {"peak_rss_mb": round(self.peak_rss / MB, 1), "rss_growth_mb": round(self.growth / MB, 1)}
+
+class _RssSampler:
+    """
+    One background thread sampling RSS every MEMORY_SAMPLE_SECONDS for all
+    tracked jobs; it exits when none are left.
+    """
+
+    def __init__(self):
+        self._jobs = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, job: JobMemory):
+        with self._lock:
+            self._jobs.add(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, job: JobMemory):
+        job.sample(current_rss())
+        with self._lock:
+            self._jobs.discard(job)
+
+    def _run(self):
+        while True:
+            rss = current_rss()
+            with self._lock:
+                if not self._jobs:
+                    self._thread = None
+                    return
+                for job in self._jobs:
+                    job.sample(rss)
+            threading.Event().wait(max(0.01, settings.MEMORY_SAMPLE_SECONDS))
+
+_sampler = _RssSampler()
+
+@contextmanager
+def track_memory(mode: str, observe: bool = True, **fields):
+    """
+    Tracks peak RSS while the block runs.
+
+    Args:
+        mode (str): Pipeline mode, used as the metric label.
+        observe (bool): Record flashdigest_job_peak_rss_bytes and log the
+            result; pass False when an enclosing tracker already does.
+        **fields: Added to the log event (e.g. url).
+
+    Yields:
+        JobMemory
+    """
+    job = JobMemory()
+    _sampler.add(job)
+    try:
+        yield job
+    finally:
+        _sampler.remove(job)
+        if observe:
+            job_peak_rss_bytes.observe(job.peak_rss, mode=mode)
+            budget = job_budget_bytes()
+            if budget and job.growth > budget:
+                log.warning("job exceeded memory budget", mode=mode, budget_mb=settings.JOB_MEMORY_BUDGET_MB, **job.stats(), **fields)
+            else:
+                log.info("job memory", mode=mode, **job.stats(), **fields)
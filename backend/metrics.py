@@ -0,0 +1,185 @@
+import threading
+import time
+from contextlib import contextmanager
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Seconds; covers a cached DB lookup up to a long transcription
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    """
+    Monotonic counter with optional labels, rendered in Prometheus text format.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.label_names, key)} {value}" for key, value in values.items()]
+        return lines
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in snapshot.items():
+            for bound, count in zip(self.buckets, series):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+class CallbackMetric:
+    """
+    Gauge or counter whose samples are read from a callback at scrape time,
+    for values that already live elsewhere (cache hit counters, pool sizes).
+    The callback returns {label value tuple: value}.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple, callback, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.callback = callback
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def render(self) -> list:
+        try:
+            values = self.callback()
+        except Exception as e:
+            log.warning("metric callback failed", metric=self.name, error=str(e))
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{_labels(self.label_names, key)} {value}" for key, value in values.items()]
+        return lines
+
+REGISTRY = []
+
+def render_metrics() -> str:
+    """
+    Returns every registered metric in Prometheus text exposition format.
+    Metrics are per process; scrape each worker separately.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+stage_seconds = Histogram("flashdigest_stage_duration_seconds", "Wall-clock time spent per pipeline stage.", ("stage",))
+stage_errors = Counter("flashdigest_stage_errors_total", "Pipeline stage calls that raised.", ("stage",))
+llm_tokens = Counter("flashdigest_llm_tokens_total", "Tokens sent to and received from the LLM.", ("kind",))
+llm_requests = Counter("flashdigest_llm_requests_total", "LLM HTTP responses by status code.", ("status",))
+llm_route_requests = Counter("flashdigest_llm_route_requests_total", "Routed LLM calls by route and result.", ("route", "result"))
+llm_failovers = Counter("flashdigest_llm_failovers_total", "LLM calls moved on to the next route, by route left and reason.", ("route", "reason"))
+audio_seconds = Counter("flashdigest_audio_seconds_total", "Seconds of audio transcribed.")
+realtime_factor = Histogram(
+    "flashdigest_transcribe_realtime_factor",
+    "Transcription wall-clock time divided by audio duration (below 1 is faster than real time).",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5),
+)
+compression_tokens = Counter("flashdigest_compression_tokens_total", "Estimated tokens before and after extractive compression.", ("kind",))
+extractive_summaries = Counter("flashdigest_extractive_summaries_total", "Summaries produced without the LLM.", ("reason",))
+pipeline_requests = Counter("flashdigest_pipeline_requests_total", "Pipeline runs by mode and outcome.", ("mode", "outcome"))
+feed_polls = Counter("flashdigest_feed_polls_total", "Feed polls by result (changed, not_modified, error).", ("result",))
+feed_entries = Counter("flashdigest_feed_entries_total", "Feed entries by outcome (new, seen, skipped, summarized, failed).", ("result",))
+scheduler_shed = Counter("flashdigest_scheduler_shed_total", "Requests rejected with 429, by lane and reason.", ("lane", "reason"))
+scheduler_wait_seconds = Histogram(
+    "flashdigest_scheduler_wait_seconds",
+    "Time requests waited for a lane slot.",
+    ("lane",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+job_peak_rss_bytes = Histogram(
+    "flashdigest_job_peak_rss_bytes",
+    "Peak resident set size of the worker process while a pipeline run was in progress.",
+    ("mode",),
+    buckets=tuple(mb * 1024 * 1024 for mb in (128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)),
+)
+
+@contextmanager
+def span(stage: str, **fields):
+    """
+    Times a pipeline stage: observes flashdigest_stage_duration_seconds,
+    counts failures and logs one structured 'span' event.
+
+    Yields a dict; keys added to it (token counts, sizes) are included in
+    the log event.
+    """
+    attributes = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield attributes
+    except Exception as e:
+        stage_errors.inc(stage=stage)
+        attributes["error"] = str(e) or type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        log.info("span", stage=stage, duration_ms=round(elapsed * 1000, 2), **attributes)
+
+def record_llm_usage(prompt_tokens: int, completion_tokens: int):
+    llm_tokens.inc(prompt_tokens, kind="prompt")
+    llm_tokens.inc(completion_tokens, kind="completion")
+
+def record_transcription(audio_duration: float, elapsed: float):
+    """
+    Records audio seconds and the real-time factor of one transcription.
+    """
+    if audio_duration > 0:
+        audio_seconds.inc(audio_duration)
+        realtime_factor.observe(elapsed / audio_duration)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, LargeBinary, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -7,11 +8,163 @@ class Summary(Base):
     __tablename__ = "Summaries"  # Corrected table name to lowercase
 
     id = Column(Integer, primary_key=True, index=True)  # Primary key
-    source = Column(String, nullable=False)  # Made 'source' non-nullable
-    content = Column(Text, nullable=False)  # Made 'content' non-nullable
+    source = Column(String, nullable=False, index=True)  # Made 'source' non-nullable, indexed for cache lookups
+    content = Column(Text)  # Inline text for rows written before the Contents table; new rows reference content_id
+    content_id = Column(Integer, ForeignKey("Contents.id"), index=True)  # Deduplicated text shared by every summary of it
     summary = Column(Text, nullable=False)  # Made 'summary' non-nullable
     language = Column(String)  # Optional 'language' column
     sentiment = Column(String)  # Optional 'sentiment' column
+    content_hash = Column(String(64), index=True)  # SHA-256 of the normalized content, used by the summary cache
+    mode = Column(String(16))  # 'summarize', 'transcribe' or batch 'text'; URL cache hits must match it. None on older rows
+    route = Column(String(128))  # LLM route and model that wrote the summary ('primary:llama3-8b-8192', 'extractive'); None if reused
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Cache staleness and time-range queries
 
     def __repr__(self):
         return f"<Summary(id={self.id}, source={self.source}, language={self.language}, sentiment={self.sentiment})>"
+
+class Content(Base):
+    __tablename__ = "Contents"  # Article and transcript text, stored once per distinct content
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True)  # SHA-256 of the normalized text
+    body = Column(LargeBinary, nullable=False)  # UTF-8 text, compressed according to 'compression'
+    compression = Column(String(16))  # 'zlib' or None
+    length = Column(Integer, nullable=False)  # Characters in the uncompressed text
+    minhash = Column(LargeBinary)  # MinHash signature for near-duplicate detection
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Content(id={self.id}, length={self.length}, compression={self.compression})>"
+
+class ContentBand(Base):
+    __tablename__ = "ContentBands"  # LSH index: one row per (band key, content)
+
+    band_key = Column(String(18), primary_key=True)
+    content_id = Column(Integer, ForeignKey("Contents.id"), primary_key=True)
+
+class TranscriptSegmentBlock(Base):
+    __tablename__ = "TranscriptSegments"  # Timed Whisper segments of a transcript, in blocks of consecutive segments
+    __table_args__ = (
+        UniqueConstraint("content_id", "block"),
+        Index("ix_TranscriptSegments_range", "content_id", "start_seconds"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    content_id = Column(Integer, ForeignKey("Contents.id"), nullable=False)  # The transcript text, shared with its summaries
+    block = Column(Integer, nullable=False)  # Position in the transcript
+    start_seconds = Column(Float, nullable=False)  # Start of the block's first segment
+    end_seconds = Column(Float, nullable=False)  # End of its last segment
+    segment_count = Column(Integer, nullable=False)
+    starts = Column(LargeBinary, nullable=False)  # Little-endian float32 per segment
+    ends = Column(LargeBinary, nullable=False)
+    text = Column(Text, nullable=False)  # One line per segment, uncompressed so the database can search it
+
+    def __repr__(self):
+        return f"<TranscriptSegmentBlock(content_id={self.content_id}, block={self.block}, start={self.start_seconds}, end={self.end_seconds})>"
+
+class Transcript(Base):
+    __tablename__ = "Transcripts"  # Whisper output cached per video and model size
+    __table_args__ = (UniqueConstraint("video_id", "model_size"),)
+
+    id = Column(Integer, primary_key=True)
+    video_id = Column(String(32), nullable=False)  # Canonical YouTube video ID
+    model_size = Column(String(16), nullable=False)  # Whisper model that produced the text
+    text = Column(Text, nullable=False)
+    duration = Column(Float)  # Audio length in seconds, when known
+    audio_fingerprint = Column(String(64), index=True)  # Catches re-uploads of the same audio under another ID
+    audio_envelope = Column(LargeBinary)  # Int8 dB loudness per 100 ms of the fingerprinted audio, to verify fingerprint matches
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Transcript(video_id={self.video_id}, model_size={self.model_size}, duration={self.duration})>"
+
+class Job(Base):
+    __tablename__ = "Jobs"  # Persistent queue for background /process requests
+
+    id = Column(String(36), primary_key=True)  # UUID handed back to the client
+    mode = Column(String, nullable=False, index=True)  # 'summarize' or 'transcribe'
+    url = Column(String, nullable=False)
+    model_size = Column(String)  # Whisper model size for transcribe jobs
+    client = Column(String(128), index=True)  # Submitting client, for per-client quotas
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, completed, failed, cancelled
+    stage = Column(String)  # Current pipeline stage, e.g. 'downloading'
+    progress = Column(Float, nullable=False, default=0.0)  # 0.0 - 1.0
+    result = Column(Text)  # Summary once the job completes
+    error = Column(Text)  # Error message if the job failed
+    peak_rss_mb = Column(Float)  # Worker process RSS peak while the job ran
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Doubles as the worker heartbeat
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, mode={self.mode}, status={self.status}, stage={self.stage})>"
+
+class PipelineLock(Base):
+    __tablename__ = "PipelineLocks"  # One row per (mode, normalized URL) run, so workers share in-flight pipelines
+
+    key = Column(String(64), primary_key=True)  # SHA-256 of the flight key
+    mode = Column(String, nullable=False)
+    url = Column(String, nullable=False)  # URL of the run that holds the lock
+    owner = Column(String(64), nullable=False)  # Worker that is running (or last ran) the pipeline
+    status = Column(String, nullable=False, default="running")  # running, completed, failed
+    result = Column(Text)  # Summary, once completed
+    error = Column(Text)  # singleflight.encode_error() of the exception, if failed
+    expires_at = Column(DateTime, nullable=False)  # Lease; renewed by the owner while it runs
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<PipelineLock(key={self.key}, mode={self.mode}, status={self.status}, owner={self.owner})>"
+
+class Feed(Base):
+    __tablename__ = "Feeds"  # RSS/Atom feeds and news sitemaps polled for new articles
+
+    id = Column(Integer, primary_key=True)
+    url = Column(String, nullable=False, unique=True)
+    title = Column(String)  # From the feed itself, once polled
+    kind = Column(String(16))  # 'rss', 'atom', 'sitemap' or 'sitemapindex', once polled
+    poll_seconds = Column(Integer)  # Overrides FEED_POLL_SECONDS
+    etag = Column(String)  # Validators of the last changed response, for conditional polls
+    last_modified = Column(String)
+    next_poll_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)  # Claimed with a compare-and-set
+    last_polled_at = Column(DateTime)
+    last_status = Column(String(16))  # 'changed', 'not_modified' or 'error'
+    error = Column(Text)
+    next_digest_at = Column(DateTime, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Feed(id={self.id}, url={self.url}, kind={self.kind}, last_status={self.last_status})>"
+
+class FeedEntry(Base):
+    __tablename__ = "FeedEntries"  # Seen-GUID index: one row per feed item ever seen
+    __table_args__ = (UniqueConstraint("feed_id", "guid_hash"),)
+
+    id = Column(Integer, primary_key=True)
+    feed_id = Column(Integer, ForeignKey("Feeds.id"), nullable=False, index=True)
+    guid_hash = Column(String(64), nullable=False)  # SHA-256 of the entry's GUID (or link)
+    url = Column(String, nullable=False, index=True)  # Joined to Summaries.source for digests
+    title = Column(String)
+    mode = Column(String(16), nullable=False, default="summarize")  # 'transcribe' for video entries
+    published_at = Column(DateTime)
+    status = Column(String(16), nullable=False, default="pending", index=True)  # pending, running, summarized, failed, skipped
+    error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)  # When it was summarized, for digests
+
+    def __repr__(self):
+        return f"<FeedEntry(id={self.id}, feed_id={self.feed_id}, status={self.status}, url={self.url})>"
+
+class FeedDigest(Base):
+    __tablename__ = "FeedDigests"  # Periodic digest of what a feed published
+
+    id = Column(Integer, primary_key=True)
+    feed_id = Column(Integer, ForeignKey("Feeds.id"), nullable=False, index=True)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    entry_count = Column(Integer, nullable=False)
+    overview = Column(Text)  # LLM summary of the period's summaries, if FEED_DIGEST_OVERVIEW
+    body = Column(Text, nullable=False)  # Title, summary and link of every article
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<FeedDigest(id={self.id}, feed_id={self.feed_id}, entries={self.entry_count})>"
@@ -0,0 +1,182 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from ai_pipeline.config import settings
+from audio_stream import SAMPLE_RATE, decode_audio_file
+
+FRAME_SECONDS = 0.03  # Energy is measured over 30 ms frames
+
+def split_on_silence(samples: np.ndarray, target_seconds: float, min_silence_seconds: float = 0.3) -> list:
+    """
+    Splits audio into segments of roughly target_seconds, cutting at the
+    quietest point near each boundary so words aren't cut in half.
+
+    Frame RMS energy is smoothed over min_silence_seconds, and each cut is
+    placed at the energy minimum between 0.5x and 1.5x the target length
+    from the previous cut.
+
+    Returns:
+        list: (start_sample, end_sample) tuples covering the whole input.
+    """
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = len(samples) // frame
+    target_frames = max(1, int(target_seconds / FRAME_SECONDS))
+    if n_frames <= target_frames * 1.5:
+        return [(0, len(samples))]
+
+    frames = samples[: n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    smooth = max(1, int(min_silence_seconds / FRAME_SECONDS))
+    energy = np.convolve(rms, np.ones(smooth) / smooth, mode="same")
+
+    bounds = []
+    start = 0
+    while n_frames - start > target_frames * 1.5:
+        low = start + target_frames // 2
+        high = min(n_frames, start + target_frames * 3 // 2)
+        cut = low + int(np.argmin(energy[low:high]))
+        bounds.append((start * frame, cut * frame))
+        start = cut
+    bounds.append((start * frame, len(samples)))
+    return bounds
+
+# Per-process state for pool workers
+_worker_model = None
+
+def _init_worker(model_size: str, threads: int):
+    global _worker_model
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_size, device="cpu")
+
+def _transcribe_segment(samples: np.ndarray, offset_seconds: float) -> dict:
+    result = _worker_model.transcribe(samples, fp16=False)
+    segments = [
+        {
+            "start": round(segment["start"] + offset_seconds, 3),
+            "end": round(segment["end"] + offset_seconds, 3),
+            "text": segment["text"].strip(),
+        }
+        for segment in result.get("segments", [])
+    ]
+    return {"offset": offset_seconds, "text": result["text"].strip(), "segments": segments}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(model_size: str, processes: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        key = (model_size, processes)
+        pool = _pools.get(key)
+        if pool is None:
+            threads = settings.WHISPER_TORCH_THREADS or max(1, (os.cpu_count() or 1) // processes)
+            pool = ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_worker,
+                initargs=(model_size, threads),
+            )
+            _pools[key] = pool
+        return pool
+
+def _worker_ready(barrier) -> int:
+    # Holds this worker until every worker has picked up a probe
+    barrier.wait()
+    return os.getpid()
+
+def warm_up_pool(model_size: str = None, processes: int = None, timeout: float = 600) -> int:
+    """
+    Starts every worker process of the pool and waits until each one has
+    loaded its Whisper model. One probe per process waits on a shared
+    barrier, so a worker that is ready early can't take the others' probes.
+
+    Returns:
+        int: Number of worker processes that answered.
+    """
+    model_size = model_size or settings.WHISPER_MODEL_SIZE
+    processes = max(1, processes or settings.TRANSCRIBE_PROCESSES)
+    pool = _get_pool(model_size, processes)
+    with multiprocessing.Manager() as manager:
+        barrier = manager.Barrier(processes, timeout=timeout)
+        futures = [pool.submit(_worker_ready, barrier) for _ in range(processes)]
+        return len({future.result() for future in futures})
+
+def shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+def transcribe_samples_parallel(samples: np.ndarray, model_size: str = None, processes: int = None) -> dict:
+    """
+    Transcribes 16 kHz mono samples by fanning silence-delimited segments out
+    to a pool of Whisper worker processes, then stitches the results back in
+    order with absolute timestamps.
+
+    Returns:
+        dict: 'text', 'segments' (start, end, text) and 'chunks' (number of pieces).
+    """
+    model_size = model_size or settings.WHISPER_MODEL_SIZE
+    processes = max(1, processes or settings.TRANSCRIBE_PROCESSES)
+
+    duration = len(samples) / SAMPLE_RATE
+    # Small enough that every worker gets a piece, never shorter than one Whisper window
+    target = min(settings.PARALLEL_SEGMENT_SECONDS, max(30.0, duration / processes))
+    bounds = split_on_silence(samples, target)
+
+    pool = _get_pool(model_size, processes)
+    futures = [
+        pool.submit(_transcribe_segment, samples[start:end], start / SAMPLE_RATE)
+        for start, end in bounds
+    ]
+    pieces = sorted((future.result() for future in futures), key=lambda piece: piece["offset"])
+
+    return {
+        "text": " ".join(piece["text"] for piece in pieces if piece["text"]),
+        "segments": [segment for piece in pieces for segment in piece["segments"]],
+        "chunks": len(pieces),
+    }
+
+def transcribe_windows_parallel(windows, model_size: str = None, processes: int = None) -> dict:
+    """
+    Transcribes fixed-length windows (see audio_stream.iter_file_windows and
+    iter_pcm_windows) on the worker pool. At most two windows per worker are
+    submitted ahead of the results, so memory stays bounded by the window
+    size however long the audio is.
+
+    Windows are transcribed independently: unlike the sequential path, a
+    window gets no prompt from the end of the previous one.
+
+    Returns:
+        dict: 'text', 'segments' (start, end, text), 'chunks' (number of
+        windows) and 'seconds' (audio duration).
+    """
+    model_size = model_size or settings.WHISPER_MODEL_SIZE
+    processes = max(1, processes or settings.TRANSCRIBE_PROCESSES)
+    pool = _get_pool(model_size, processes)
+
+    pending, pieces = deque(), []
+    offset = 0.0
+    for window in windows:
+        if len(pending) >= 2 * processes:
+            pieces.append(pending.popleft().result())
+        pending.append(pool.submit(_transcribe_segment, window, offset))
+        offset += len(window) / SAMPLE_RATE
+    pieces += [future.result() for future in pending]
+
+    return {
+        "text": " ".join(piece["text"] for piece in pieces if piece["text"]),
+        "segments": [segment for piece in pieces for segment in piece["segments"]],
+        "chunks": len(pieces),
+        "seconds": offset,
+    }
+
+def transcribe_file_parallel(audio_path: str, model_size: str = None, processes: int = None) -> dict:
+    """
+    Decodes an audio file and transcribes it with transcribe_samples_parallel.
+    """
+    return transcribe_samples_parallel(decode_audio_file(audio_path), model_size, processes)
@@ -1,9 +1,35 @@
-import os
-from fetch_sources import get_youtube_audio, fetch_news_content
-from transcription import transcribe_audio
-from summarizer_groq import summarize_text
+from fetch_sources import audio_temp_dir, download_youtube_audio, fetch_news_content
+from transcription import transcribe_samples, transcribe_windows, transcribe_youtube_stream
+from transcript_cache import lookup_transcript, store_transcript, cached_transcribe_file
+from summarizer_groq import (
+    summarize_long_text,
+    summarize_transcript,
+    prepare_summary_input,
+    stream_summary_text,
+    can_fall_back,
+    fallback_summary,
+)
+from llm_client import LLMError
+from llm_router import RoutedText
 from db.db_insert import save_summary_to_db
 from db.database import get_db
+from executors import run_in_stage
+from metrics import span, pipeline_requests
+from memory import track_memory
+from singleflight import pipeline_flights, flight_key, coordinate
+from logs import get_logger
+from ai_pipeline.config import settings
+from cache import (
+    content_hash,
+    lookup_summary_by_url,
+    lookup_summary_by_hash,
+    remember_url_summary,
+    remember_content_summary,
+    cached_fetch_news_content,
+    cached_summarize_text,
+)
+
+log = get_logger(__name__)
 
 def run_pipeline(mode: str, url: str):
     """
@@ -18,44 +44,39 @@ def run_pipeline(mode: str, url: str):
     try:
         db = next(get_db())
     except Exception as e:
-        print(f"❌ Failed to initialize DB session: {e}")
+        log.error("failed to initialize DB session", error=str(e))
         return
 
     try:
         if mode == "summarize":
-            print(f"📰 Summarizing news article: {url}")
-            content = fetch_news_content(url)
-            summary = summarize_text(content)
+            log.info("summarizing article", url=url)
+            cached = lookup_summary_by_url(url, mode)
+            if cached is not None:
+                log.info("served from summary cache", url=url)
+                return cached
+
+            content = cached_fetch_news_content(url, fetch_news_content)
+            summary = cached_summarize_text(content, summarize_long_text)
             # Save summary without sentiment to DB
-            save_summary_to_db(db, source=url, content=content, summary=summary)
-            print("✅ Summarization completed.")
-            db.commit()  # Commit the changes
+            save_summary_to_db(db, source=url, content=content, summary=summary, mode=mode)
+            log.info("summarization completed", url=url)
+            remember_url_summary(url, mode, summary)
             return summary
 
         elif mode == "transcribe":
-            print(f"🎥 Transcribing YouTube video: {url}")
-            audio_files = get_youtube_audio([url], base_filename="temp_audio")
+            log.info("transcribing video", url=url)
+            transcript = lookup_transcript(url)
+            if transcript is None:
+                # Private temp directory, removed with the audio in it when done
+                with audio_temp_dir() as directory:
+                    audio_path = download_youtube_audio(url, directory)
+                    transcript = cached_transcribe_file(url, audio_path, None, transcribe_samples, transcribe_windows)
 
-            if not audio_files or not os.path.exists(audio_files[0]):
-                raise FileNotFoundError("❌ Audio file not found after downloading.")
-
-            # Perform transcription
-            transcript = transcribe_audio(audio_files[0])
-            summary = summarize_text(transcript)
+            summary = cached_summarize_text(transcript, summarize_transcript)
             
             # Save summary without sentiment to DB
-            save_summary_to_db(db, source=url, content=transcript, summary=summary)
-            print("✅ Transcription & summarization completed.")
-            
-            db.commit()  # Commit the changes
-
-            # Optional: clean up temp audio files
-            try:
-                os.remove(audio_files[0])
-                print("✅ Temporary audio file deleted.")
-            except Exception as e:
-                print(f"⚠️ Failed to delete temporary audio file: {e}")
-
+            save_summary_to_db(db, source=url, content=transcript, summary=summary, mode=mode)
+            log.info("transcription and summarization completed", url=url)
             return summary
 
         else:
@@ -63,12 +84,221 @@ def run_pipeline(mode: str, url: str):
 
     except Exception as e:
         db.rollback()
-        print(f"\n❌ Pipeline failed with error:\n{e}")
+        log.exception("pipeline failed", mode=mode, url=url)
         return str(e)
 
     finally:
         db.close()
 
+def _persist_summary(source: str, mode: str, content: str, summary: str):
+    """
+    Saves a summary in its own session so it can run on the DB stage executor.
+    The timed segments of a transcript (transcription.TimedTranscript) are
+    stored with its content here, whether or not the transcript cache is
+    enabled.
+
+    Raises if the row could not be written. The summary stays in the
+    content-hash cache, so a retry doesn't call the LLM again.
+    """
+    db = next(get_db())
+    try:
+        # Single commit, no refresh
+        if not save_summary_to_db(db, source=source, content=content, summary=summary, mode=mode):
+            raise RuntimeError(f"❌ Failed to save the summary of {source} to the database.")
+    finally:
+        db.close()
+
+async def _report(on_stage, stage: str):
+    if on_stage is not None:
+        await on_stage(stage)
+
+async def _fetch_article(url: str) -> str:
+    return await run_in_stage("fetch", cached_fetch_news_content, url, fetch_news_content)
+
+async def _stream_transcript(url: str, model_size: str = None) -> str:
+    transcript = await run_in_stage("transcribe", transcribe_youtube_stream, url, model_size=model_size)
+    await run_in_stage("db", store_transcript, url, model_size, transcript)
+    return transcript
+
+async def _transcribe_file(url: str, audio_path: str, model_size: str = None) -> str:
+    return await run_in_stage("transcribe", cached_transcribe_file, url, audio_path, model_size, transcribe_samples, transcribe_windows)
+
+def _check_mode(mode: str):
+    if mode not in ("summarize", "transcribe"):
+        raise ValueError(f"❌ Invalid mode '{mode}'. Choose 'summarize' or 'transcribe'.")
+
+async def run_pipeline_async(mode: str, url: str, on_stage=None, model_size: str = None):
+    """
+    Non-blocking variant of run_pipeline for the API.
+
+    Every blocking step (article download, yt-dlp, Whisper, Groq, DB commit)
+    runs on its bounded stage executor, so the event loop keeps serving other
+    requests while a long transcription is in progress.
+
+    Concurrent requests for the same normalized URL, mode and model size
+    share one run, in this worker and across workers, and all receive its
+    summary.
+
+    Args:
+        mode (str): Either 'summarize' or 'transcribe'
+        url (str): URL of the news article or YouTube video
+        on_stage (callable, optional): Coroutine function awaited with the
+            name of each stage ('waiting', 'fetching', 'downloading',
+            'transcribing', 'summarizing', 'saving') before it starts.
+        model_size (str, optional): Whisper model size for transcribe mode.
+
+    Returns:
+        str: The generated summary. Errors are raised to the caller.
+    """
+    _check_mode(mode)
+
+    async def execute(emit):
+        async def report(stage: str):
+            emit("stage", stage)
+        return await _tracked(mode, url, _run_pipeline_async(mode, url, report, model_size))
+
+    outcome = "failed"
+    try:
+        with span("pipeline", mode=mode, url=url) as attributes:
+            async with _join_flight(mode, url, model_size, execute) as flight:
+                async for event, data in flight:
+                    if event == "stage":
+                        await _report(on_stage, data)
+                summary, outcome = flight.result()
+            if flight.shared:
+                outcome = "coalesced"
+            attributes.update(outcome=outcome, route=getattr(summary, "route", None))
+        return summary
+    finally:
+        pipeline_requests.inc(mode=mode, outcome=outcome)
+
+async def _tracked(mode: str, url: str, run):
+    # Peak RSS is reported once per executed run, not per request joining it
+    with track_memory(mode, url=url):
+        return await run
+
+def _join_flight(mode: str, url: str, model_size: str, execute):
+    """
+    Joins the run in flight for the request, or starts execute(emit) as a
+    new one coordinated with the other workers.
+    """
+    key = flight_key(mode, url, model_size)
+    return pipeline_flights.join(
+        key if settings.SINGLEFLIGHT_ENABLED else None,
+        lambda emit: coordinate(key, mode, url, lambda: execute(emit), emit),
+    )
+
+async def _run_pipeline_async(mode: str, url: str, on_stage, model_size: str):
+    cached = await run_in_stage("db", lookup_summary_by_url, url, mode)
+    if cached is not None:
+        log.info("served from summary cache", url=url)
+        return cached, "cached"
+
+    if mode == "summarize":
+        log.info("summarizing article", url=url)
+        await _report(on_stage, "fetching")
+        content = await _fetch_article(url)
+    elif (content := await run_in_stage("db", lookup_transcript, url, model_size)) is not None:
+        log.info("served transcript from cache", url=url)
+    elif settings.AUDIO_STREAMING:
+        log.info("transcribing video while streaming", url=url)
+        await _report(on_stage, "transcribing")
+        content = await _stream_transcript(url, model_size)
+    else:
+        log.info("transcribing video", url=url)
+        with audio_temp_dir() as directory:  # Removed with the audio in it, even on failure
+            await _report(on_stage, "downloading")
+            audio_path = await run_in_stage("download", download_youtube_audio, url, directory)
+            await _report(on_stage, "transcribing")
+            content = await _transcribe_file(url, audio_path, model_size)
+
+    await _report(on_stage, "summarizing")
+    summarize = summarize_transcript if mode == "transcribe" else summarize_long_text
+    summary = await run_in_stage("llm", cached_summarize_text, content, summarize)
+    await _report(on_stage, "saving")
+    await run_in_stage("db", _persist_summary, url, mode, content, summary)
+    remember_url_summary(url, mode, summary)
+    log.info("pipeline completed", mode=mode, url=url)
+    return summary, "completed"
+
+async def stream_pipeline(mode: str, url: str, model_size: str = None):
+    """
+    Streaming variant of run_pipeline_async.
+
+    Yields (event, data) tuples: ('stage', name) before each stage,
+    ('token', text) for every piece of the summary as Groq streams it, and
+    ('done', summary) once the summary has been saved. Cached summaries, and
+    summaries of runs this request joined without streaming, are sent as a
+    single token.
+    """
+    _check_mode(mode)
+
+    outcome = "failed"
+    try:
+        streamed = False
+        async with _join_flight(mode, url, model_size, lambda emit: _tracked(mode, url, _stream_pipeline(mode, url, model_size, emit))) as flight:
+            async for event, data in flight:
+                streamed = streamed or event == "token"
+                yield event, data
+            summary, outcome = flight.result()
+        if flight.shared:
+            outcome = "coalesced"
+        if not streamed:
+            yield "token", summary
+        yield "done", summary
+    finally:
+        pipeline_requests.inc(mode=mode, outcome=outcome)
+
+async def _stream_pipeline(mode: str, url: str, model_size: str, emit):
+    cached = await run_in_stage("db", lookup_summary_by_url, url, mode)
+    if cached is not None:
+        return cached, "cached"
+
+    if mode == "summarize":
+        emit("stage", "fetching")
+        content = await _fetch_article(url)
+    elif (content := await run_in_stage("db", lookup_transcript, url, model_size)) is not None:
+        pass  # Cached transcript: nothing to download
+    elif settings.AUDIO_STREAMING:
+        emit("stage", "transcribing")
+        content = await _stream_transcript(url, model_size)
+    else:
+        with audio_temp_dir() as directory:
+            emit("stage", "downloading")
+            audio_path = await run_in_stage("download", download_youtube_audio, url, directory)
+            emit("stage", "transcribing")
+            content = await _transcribe_file(url, audio_path, model_size)
+
+    emit("stage", "summarizing")
+    transcript = mode == "transcribe"
+    summary = await run_in_stage("db", lookup_summary_by_hash, content_hash(content))
+    if summary is not None:
+        emit("token", summary)
+    elif settings.SUMMARY_MODE == "extractive":
+        summary = await run_in_stage("llm", summarize_long_text, content, transcript)
+        emit("token", summary)
+        remember_content_summary(content, summary)
+    else:
+        # Long inputs are reduced first; only the final pass is streamed
+        parts, served = [], {}
+        try:
+            final_text, prompt = await run_in_stage("llm", prepare_summary_input, content, transcript)
+            async for delta in stream_summary_text(final_text, prompt=prompt, served=served):
+                parts.append(delta)
+                emit("token", delta)
+            summary = RoutedText("".join(parts), served.get("route"))
+        except LLMError as e:
+            if parts or not can_fall_back(e):
+                raise  # Half a summary is already on the client's screen
+            summary = await run_in_stage("llm", fallback_summary, content, transcript, e)
+            emit("token", summary)
+        remember_content_summary(content, summary)
+
+    emit("stage", "saving")
+    await run_in_stage("db", _persist_summary, url, mode, content, summary)
+    remember_url_summary(url, mode, summary)
+    return summary, "completed"
+
 if __name__ == "__main__":
     # Ask user for mode and URL dynamically
     mode = input("Enter mode (summarize or transcribe): ").strip().lower()
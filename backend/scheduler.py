@@ -0,0 +1,273 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import defaultdict
+from ai_pipeline.config import settings
+from cache import TTLCache, article_cache, lookup_summary_by_url
+from chunking import estimate_tokens
+from executors import run_in_stage
+from fetch_sources import probe_duration
+from transcript_cache import lookup_transcript
+from singleflight import pipeline_flights, flight_key
+from logs import get_logger
+from metrics import CallbackMetric, scheduler_shed, scheduler_wait_seconds
+
+log = get_logger(__name__)
+
+# Weight of the newest run in a lane's average service time
+SERVICE_SMOOTHING = 0.2
+RETRY_AFTER_MAX_SECONDS = 600
+
+class Overloaded(Exception):
+    """Raised when a lane sheds a request; the API answers 429 with Retry-After."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Waiter:
+    def __init__(self, client: str, cost: float, tag: float, seq: int):
+        self.client = client
+        self.cost = cost
+        self.tag = tag
+        self.seq = seq
+        self.future = asyncio.get_running_loop().create_future()
+
+class Lane:
+    """
+    A bounded number of concurrently running pipelines plus a bounded
+    waiting list.
+
+    Waiting requests are served by start-time fair queuing: each gets a tag
+    of its client's previous tag (or the lane's virtual time, if later) plus
+    its estimated cost, and a free slot goes to the lowest tag. Clients take
+    turns in proportion to cost, so one client's burst can't starve the
+    others.
+
+    Args:
+        name (str): Lane name, used in metrics and errors.
+        slots (int): Pipelines running at once.
+        max_queue (int): Requests allowed to wait; more are shed.
+    """
+
+    def __init__(self, name: str, slots: int, max_queue: int):
+        self.name = name
+        self.slots = max(1, slots)
+        self.max_queue = max(0, max_queue)
+        self.running = 0
+        self.waiting = []
+        self.client_requests = defaultdict(int)  # Waiting or running, per client
+        self.client_tags = {}  # Finish tag of each client's latest request
+        self.virtual_time = 0.0  # Start tag of the request served last
+        self.service_seconds = None  # Moving average of run time
+        self.admitted = 0
+        self._seq = itertools.count()
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a request joining the back of the queue."""
+        if self.service_seconds is None:
+            return settings.SCHEDULER_RETRY_AFTER_SECONDS
+        seconds = self.service_seconds * (len(self.waiting) + 1) / self.slots
+        return min(RETRY_AFTER_MAX_SECONDS, max(1, math.ceil(seconds)))
+
+    def check(self, client: str):
+        """
+        Raises Overloaded if a request from the client would be shed right now.
+        """
+        if self.running < self.slots and not self.waiting:
+            return
+        limit = settings.SCHEDULER_CLIENT_MAX_REQUESTS
+        if limit > 0 and self.client_requests.get(client, 0) >= limit:
+            scheduler_shed.inc(lane=self.name, reason="client_quota")
+            raise Overloaded(f"Too many requests from this client in the {self.name} lane.", self.retry_after())
+        if len(self.waiting) >= self.max_queue:
+            scheduler_shed.inc(lane=self.name, reason="queue_full")
+            raise Overloaded(f"The {self.name} lane is full.", self.retry_after())
+
+    def _tag(self, client: str, cost: float) -> float:
+        tag = max(self.virtual_time, self.client_tags.get(client, 0.0)) + cost
+        self.client_tags[client] = tag
+        return tag
+
+    def _grant(self, start_tag: float):
+        self.running += 1
+        self.admitted += 1
+        self.virtual_time = max(self.virtual_time, start_tag)
+
+    def _dispatch(self):
+        while self.running < self.slots and self.waiting:
+            waiter = min(self.waiting, key=lambda w: (w.tag, w.seq))
+            self.waiting.remove(waiter)
+            self._grant(waiter.tag - waiter.cost)
+            waiter.future.set_result(None)
+
+    async def acquire(self, client: str, cost: float, shed: bool = True):
+        """
+        Waits for a slot.
+
+        Args:
+            client (str): Who the request is for, for fair share and quotas.
+            cost (float): Estimated size of the run, relative to the lane's other runs.
+            shed (bool): Raise Overloaded instead of queueing past the limits.
+        """
+        if shed:
+            self.check(client)
+        self.client_requests[client] += 1
+        cost = max(cost, 0.01)
+        tag = self._tag(client, cost)
+        if self.running < self.slots and not self.waiting:
+            self._grant(tag - cost)
+            scheduler_wait_seconds.observe(0.0, lane=self.name)
+            return
+
+        waiter = _Waiter(client, cost, tag, next(self._seq))
+        self.waiting.append(waiter)
+        started = time.perf_counter()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self.waiting:
+                self.waiting.remove(waiter)
+                self._forget(client)
+            else:
+                self.release(client)  # Granted just as the caller went away
+            raise
+        finally:
+            scheduler_wait_seconds.observe(time.perf_counter() - started, lane=self.name)
+
+    def release(self, client: str, elapsed: float = None):
+        self.running -= 1
+        self._forget(client)
+        if elapsed is not None:
+            self.service_seconds = elapsed if self.service_seconds is None else (
+                (1 - SERVICE_SMOOTHING) * self.service_seconds + SERVICE_SMOOTHING * elapsed
+            )
+        self._dispatch()
+
+    def _forget(self, client: str):
+        self.client_requests[client] -= 1
+        if self.client_requests[client] <= 0:
+            del self.client_requests[client]
+            self.client_tags.pop(client, None)  # An idle client starts again from the lane's virtual time
+
+    def stats(self) -> dict:
+        return {
+            "slots": self.slots,
+            "running": self.running,
+            "waiting": len(self.waiting),
+            "max_queue": self.max_queue,
+            "clients": len(self.client_requests),
+            "admitted": self.admitted,
+            "service_seconds": round(self.service_seconds, 3) if self.service_seconds is not None else None,
+            "retry_after": self.retry_after(),
+        }
+
+def _in_flight(key: str) -> bool:
+    # A request that will join a run already going in this process adds no work
+    return key is not None and settings.SINGLEFLIGHT_ENABLED and key in pipeline_flights
+
+class _Slot:
+    def __init__(self, lane: Lane, client: str, cost: float, shed: bool, key: str = None):
+        self.lane = lane
+        self.client = client
+        self.cost = cost
+        self.shed = shed
+        self.key = key
+        self._started = None
+
+    async def __aenter__(self):
+        if self.lane is not None and _in_flight(self.key):
+            self.lane = None  # The run started while this request was being admitted
+        if self.lane is not None:
+            await self.lane.acquire(self.client, self.cost, self.shed)
+        self._started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.lane is not None:
+            # Only completed runs inform Retry-After; failures are often fast
+            self.lane.release(self.client, time.perf_counter() - self._started if exc_type is None else None)
+
+class Scheduler:
+    """
+    Admission control for pipeline runs in this process: each run is placed
+    in a priority lane by its estimated cost and holds one of the lane's
+    slots while it runs.
+
+    Lanes are independent, so a transcription backlog never delays article
+    summaries: summarize (articles and videos whose transcript is stored),
+    transcribe (short videos) and transcribe_long (videos longer than
+    SCHEDULER_LONG_VIDEO_SECONDS, by yt-dlp metadata, fetched before
+    anything is downloaded).
+    """
+
+    def __init__(self):
+        self.lanes = {
+            "summarize": Lane("summarize", settings.SCHEDULER_SUMMARIZE_SLOTS, settings.SCHEDULER_SUMMARIZE_QUEUE),
+            "transcribe": Lane("transcribe", settings.SCHEDULER_TRANSCRIBE_SLOTS, settings.SCHEDULER_TRANSCRIBE_QUEUE),
+            "transcribe_long": Lane("transcribe_long", settings.SCHEDULER_LONG_SLOTS, settings.SCHEDULER_LONG_QUEUE),
+        }
+        self._durations = TTLCache("video_durations", settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+
+    def _video_seconds(self, url: str) -> float:
+        seconds = self._durations.get(url)
+        if seconds is None:
+            seconds = probe_duration(url) or settings.SCHEDULER_DEFAULT_VIDEO_SECONDS
+            self._durations.set(url, seconds)
+        return seconds
+
+    def _estimate(self, mode: str, url: str, model_size: str = None) -> tuple:
+        """
+        Returns (lane name, cost): cost is thousands of article tokens or
+        minutes of audio. Cached summaries need no lane (lane None).
+        """
+        if lookup_summary_by_url(url, mode) is not None:
+            return None, 0.0
+        if mode == "summarize":
+            text = article_cache.get(url)
+            return "summarize", max(1.0, estimate_tokens(text) / 1000) if text else 1.0
+        if lookup_transcript(url, model_size) is not None:
+            return "summarize", 1.0
+        seconds = self._video_seconds(url)
+        lane = "transcribe_long" if seconds > settings.SCHEDULER_LONG_VIDEO_SECONDS else "transcribe"
+        return lane, seconds / 60
+
+    async def admit(self, mode: str, url: str, model_size: str = None, client: str = "anonymous", shed: bool = True) -> _Slot:
+        """
+        Estimates the request's cost and picks its lane. Requests that will
+        join a pipeline already running in this process need no lane.
+
+        Returns:
+            Async context manager that waits for a slot on entry and frees
+            it on exit.
+
+        Raises:
+            Overloaded: The lane's queue or the client's quota is full.
+        """
+        key = flight_key(mode, url, model_size)
+        if not settings.SCHEDULER_ENABLED or _in_flight(key):
+            return _Slot(None, client, 0.0, shed)
+        lane_name, cost = await run_in_stage("probe", self._estimate, mode, url, model_size)
+        lane = self.lanes.get(lane_name)
+        if lane is not None and shed:
+            lane.check(client)  # Shed now, before a streaming response has started
+        return _Slot(lane, client, cost, shed, key)
+
+    def stats(self) -> dict:
+        return {"enabled": settings.SCHEDULER_ENABLED, "lanes": {name: lane.stats() for name, lane in self.lanes.items()}}
+
+scheduler = Scheduler()
+
+CallbackMetric(
+    "flashdigest_scheduler_running",
+    "Pipelines holding a slot, per lane.",
+    ("lane",),
+    lambda: {(name,): lane.running for name, lane in scheduler.lanes.items()},
+)
+CallbackMetric(
+    "flashdigest_scheduler_queue_depth",
+    "Requests waiting for a slot, per lane.",
+    ("lane",),
+    lambda: {(name,): len(lane.waiting) for name, lane in scheduler.lanes.items()},
+)
@@ -0,0 +1,452 @@
+import asyncio
+import builtins
+import hashlib
+import json
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from sqlalchemy.exc import IntegrityError
+from db.database import SessionLocal, engine
+from models import PipelineLock
+from executors import run_in_stage
+from transcript_cache import youtube_video_id
+from ai_pipeline.config import settings
+from logs import get_logger
+from metrics import CallbackMetric
+
+log = get_logger(__name__)
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = ("fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "_ga")
+TRACKING_PREFIXES = ("utm_",)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_END = object()
+
+def normalize_url(url: str) -> str:
+    """
+    Returns a canonical form of the URL, so links that differ only in
+    tracking parameters, parameter order, host case, default port, fragment
+    or a trailing slash map to the same key. YouTube links of any shape map
+    to their video ID.
+    """
+    video_id = youtube_video_id(url)
+    if video_id is not None:
+        return f"youtube:{video_id}"
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/") or "/", urlencode(query), ""))
+
+def flight_key(mode: str, url: str, model_size: str = None) -> str:
+    """
+    Returns the key identical requests share: SHA-256 of the mode, the Whisper
+    model size for transcriptions, and the normalized URL.
+    """
+    if mode == "transcribe":
+        model_size = model_size or settings.WHISPER_MODEL_SIZE
+    else:
+        model_size = ""
+    return hashlib.sha256(f"{mode}|{model_size}|{normalize_url(url)}".encode("utf-8")).hexdigest()
+
+class _Flight:
+    def __init__(self, key):
+        self.key = key
+        self.task = None
+        self.events = []  # Everything emitted so far, replayed to late joiners
+        self.queues = set()
+        self.waiters = 0
+
+    def emit(self, event: str, data):
+        self.events.append((event, data))
+        for queue in self.queues:
+            queue.put_nowait((event, data))
+
+    def finish(self, task: asyncio.Task):
+        if not task.cancelled():
+            task.exception()  # Retrieved here so a flight nobody waits for doesn't log a warning
+        for queue in self.queues:
+            queue.put_nowait(_END)
+
+class Subscription:
+    """
+    One caller's view of a shared flight. Iterate it for the (event, data)
+    pairs the run emits, from the start, then read result().
+
+    Use it as an async context manager: leaving it detaches the caller, and
+    the run is cancelled once its last caller has left.
+    """
+
+    def __init__(self, flight: _Flight, shared: bool):
+        self.shared = shared  # False for the caller that started the run
+        self._flight = flight
+        self._queue = asyncio.Queue()
+        for event in flight.events:
+            self._queue.put_nowait(event)
+        if flight.task.done():
+            self._queue.put_nowait(_END)
+        flight.queues.add(self._queue)
+        flight.waiters += 1
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._queue.get()
+        if event is _END:
+            raise StopAsyncIteration
+        return event
+
+    def result(self):
+        return self._flight.task.result()
+
+    def close(self):
+        flight = self._flight
+        if self._queue in flight.queues:
+            flight.queues.discard(self._queue)
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                log.info("flight abandoned by all callers", key=flight.key)
+                flight.task.cancel()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+class AsyncSingleFlight:
+    """
+    Shares one execution of a coroutine between all concurrent callers that
+    use the same key, within one event loop.
+
+    The run is started by the first caller as its own task, so a caller
+    that goes away (client disconnect, cancelled job) does not take the run
+    down with it while others are still waiting.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights = {}
+
+    def join(self, key, func) -> Subscription:
+        """
+        Joins the run in flight for the key, or starts func(emit) as a new one.
+
+        Args:
+            key: Flight key; None always starts a private run.
+            func (callable): Coroutine function taking emit(event, data),
+                which publishes progress to every caller of the run.
+
+        Returns:
+            Subscription: Async context manager and iterator of the run's events.
+        """
+        flight = self._flights.get(key) if key is not None else None
+        if flight is not None:
+            return Subscription(flight, shared=True)
+
+        flight = _Flight(key)
+        flight.task = asyncio.create_task(func(flight.emit))
+        flight.task.add_done_callback(flight.finish)
+        if key is not None:
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(flight))
+        return Subscription(flight, shared=False)
+
+    def _forget(self, flight: _Flight):
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def __contains__(self, key):
+        return key in self._flights
+
+    def __len__(self):
+        return len(self._flights)
+
+# Pipelines keyed by flight_key(mode, url, model_size)
+pipeline_flights = AsyncSingleFlight("pipelines")
+
+CallbackMetric(
+    "flashdigest_pipelines_in_flight",
+    "Distinct pipeline runs in progress in this worker; identical requests share one.",
+    (),
+    lambda: {(): len(pipeline_flights)},
+)
+
+# Attributes callers act on, kept when an error is handed to waiting workers
+ERROR_ATTRIBUTES = {
+    "LLMError": ("status_code", "timed_out"),
+    "Overloaded": ("retry_after",),
+}
+
+def encode_error(error: Exception) -> str:
+    """
+    Serializes a failed run's exception for the lock row: its type name,
+    message and the attributes in ERROR_ATTRIBUTES.
+    """
+    name = type(error).__name__
+    return json.dumps({
+        "type": name,
+        "message": str(error),
+        "attributes": {attribute: getattr(error, attribute, None) for attribute in ERROR_ATTRIBUTES.get(name, ())},
+    })
+
+def _error_class(name: str):
+    from fetcher import RobotsDisallowed
+    from llm_client import LLMError
+    from scheduler import Overloaded
+
+    known = {cls.__name__: cls for cls in (LLMError, Overloaded, RobotsDisallowed)}
+    if name in known:
+        return known[name]
+    builtin = getattr(builtins, name, None)
+    return builtin if isinstance(builtin, type) and issubclass(builtin, Exception) else Exception
+
+def decode_error(text: str) -> Exception:
+    """
+    Rebuilds the exception stored by encode_error, so a waiting worker
+    raises the same type as the worker that ran the pipeline (e.g. an
+    LLMError with its status code). Unknown types become Exception.
+    """
+    try:
+        data = json.loads(text)
+        name, message, attributes = data["type"], data["message"], data.get("attributes") or {}
+    except (TypeError, ValueError, KeyError):
+        return Exception(text)  # Written before errors were encoded
+    try:
+        return _error_class(name)(message, **attributes)
+    except TypeError:
+        return Exception(message)
+
+def ensure_lock_table():
+    """
+    Creates the PipelineLocks table if it doesn't exist yet.
+    """
+    PipelineLock.__table__.create(bind=engine, checkfirst=True)
+
+def claim_lock(key: str, mode: str, url: str, owner: str) -> bool:
+    """
+    Takes the cross-worker lock for a flight key.
+
+    Succeeds if no row exists, or if the existing run finished or its owner
+    stopped renewing the lease. Taking over is a compare-and-set on the
+    previous owner and status, so only one worker wins.
+
+    Returns:
+        bool: True if this worker now runs the pipeline for the key.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=settings.SINGLEFLIGHT_LEASE_SECONDS)
+        db.add(PipelineLock(key=key, mode=mode, url=url, owner=owner, status="running", expires_at=expires_at, updated_at=now))
+        try:
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+
+        row = db.get(PipelineLock, key)
+        if row is None or (row.status == "running" and row.expires_at > now):
+            return False
+
+        claimed = (
+            db.query(PipelineLock)
+            .filter(PipelineLock.key == key, PipelineLock.owner == row.owner, PipelineLock.status == row.status)
+            .update(
+                {"url": url, "owner": owner, "status": "running", "result": None, "error": None, "expires_at": expires_at, "updated_at": now},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(claimed)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def renew_lock(key: str, owner: str) -> bool:
+    """
+    Extends the lease of a running flight.
+
+    Returns:
+        bool: False if another worker has taken the lock over.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        renewed = (
+            db.query(PipelineLock)
+            .filter(PipelineLock.key == key, PipelineLock.owner == owner, PipelineLock.status == "running")
+            .update(
+                {"expires_at": now + timedelta(seconds=settings.SINGLEFLIGHT_LEASE_SECONDS), "updated_at": now},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(renewed)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def finish_lock(key: str, owner: str, result: str = None, error: str = None):
+    """
+    Publishes the outcome of a flight to waiting workers and prunes lock rows
+    that finished more than SINGLEFLIGHT_RETENTION_SECONDS ago.
+
+    Args:
+        error (str, optional): encode_error() of the run's exception.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db.query(PipelineLock).filter(PipelineLock.key == key, PipelineLock.owner == owner).update(
+            {"status": "failed" if error is not None else "completed", "result": result, "error": error, "updated_at": now},
+            synchronize_session=False,
+        )
+        db.query(PipelineLock).filter(
+            PipelineLock.status != "running",
+            PipelineLock.updated_at < now - timedelta(seconds=settings.SINGLEFLIGHT_RETENTION_SECONDS),
+        ).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def release_lock(key: str, owner: str):
+    """
+    Drops a lock without a result (the run was cancelled), so a waiting
+    worker takes over.
+    """
+    db = SessionLocal()
+    try:
+        db.query(PipelineLock).filter(PipelineLock.key == key, PipelineLock.owner == owner).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def read_lock(key: str):
+    """
+    Returns the lock row for the key as a dict, or None.
+    """
+    db = SessionLocal()
+    try:
+        row = db.get(PipelineLock, key)
+        if row is None:
+            return None
+        return {
+            "status": row.status,
+            "result": row.result,
+            "error": row.error,
+            "expired": row.expires_at <= datetime.utcnow(),
+        }
+    finally:
+        db.close()
+
+async def _renew_periodically(key: str, owner: str):
+    while True:
+        await asyncio.sleep(settings.SINGLEFLIGHT_LEASE_SECONDS / 3)
+        try:
+            if not await run_in_stage("db", renew_lock, key, owner):
+                log.warning("pipeline lock taken over", key=key)
+                return
+        except Exception as e:
+            log.warning("pipeline lock renewal failed", key=key, error=str(e))
+
+async def _update_lock(func, key: str, *args, **kwargs):
+    # The run's own outcome matters more than publishing it; waiters take over once the lease expires
+    try:
+        await run_in_stage("db", func, key, *args, **kwargs)
+    except Exception as e:
+        log.warning("pipeline lock update failed", key=key, error=str(e))
+
+async def _lead(key: str, owner: str, execute):
+    renewer = asyncio.create_task(_renew_periodically(key, owner))
+    try:
+        summary, outcome = await execute()
+    except asyncio.CancelledError:
+        renewer.cancel()
+        await asyncio.shield(_update_lock(release_lock, key, owner))
+        raise
+    except Exception as e:
+        renewer.cancel()
+        await _update_lock(finish_lock, key, owner, error=encode_error(e))
+        raise
+    renewer.cancel()
+    await _update_lock(finish_lock, key, owner, result=summary)
+    return summary, outcome
+
+async def coordinate(key: str, mode: str, url: str, execute, emit):
+    """
+    Runs execute() at most once across all workers sharing the database.
+
+    The worker that claims the key's lock runs the pipeline and stores the
+    summary in the lock row; the others emit a 'waiting' stage and poll the
+    row until it is completed or failed, taking over if the owner's lease
+    runs out.
+
+    Args:
+        key (str): flight_key() of the request.
+        mode (str): Pipeline mode, recorded for inspection.
+        url (str): Request URL, recorded for inspection.
+        execute (callable): Coroutine function returning (summary, outcome).
+        emit (callable): The flight's emit(event, data).
+
+    Returns:
+        tuple: (summary, outcome); outcome is 'coalesced' when another worker
+        produced the summary.
+    """
+    if not (settings.SINGLEFLIGHT_ENABLED and settings.SINGLEFLIGHT_DISTRIBUTED):
+        return await execute()
+
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    waiting = False
+    while True:
+        try:
+            claimed = await run_in_stage("db", claim_lock, key, mode, url, owner)
+        except Exception as e:
+            # Coalescing is an optimization; never fail a request over it
+            log.warning("pipeline lock unavailable, running uncoordinated", key=key, error=str(e))
+            return await execute()
+        if claimed:
+            return await _lead(key, owner, execute)
+
+        if not waiting:
+            log.info("waiting for pipeline on another worker", mode=mode, url=url)
+            emit("stage", "waiting")
+            waiting = True
+
+        while True:
+            await asyncio.sleep(settings.SINGLEFLIGHT_POLL_SECONDS)
+            try:
+                lock = await run_in_stage("db", read_lock, key)
+            except Exception as e:
+                log.warning("pipeline lock unavailable, running uncoordinated", key=key, error=str(e))
+                return await execute()
+            if lock is None or (lock["status"] == "running" and lock["expired"]):
+                break  # Released or abandoned: try to take it over
+            if lock["status"] == "completed":
+                return lock["result"], "coalesced"
+            if lock["status"] == "failed":
+                raise decode_error(lock["error"])
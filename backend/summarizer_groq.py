@@ -1,135 +1,135 @@
-import os
-import requests
-import newspaper
-from db.database import SessionLocal  # Assuming you're using SQLAlchemy with a session
-from models import Summary  # Assuming your Summary model is imported from models.py
+from concurrent.futures import ThreadPoolExecutor
+from ai_pipeline.config import settings
+from chunking import chunk_text, estimate_tokens, CHARS_PER_TOKEN
+from llm_client import LLMError
+from llm_router import get_llm_router, RoutedText
+from compression import compress_text, extractive_summary, FallbackSummary
+from logs import get_logger
+from metrics import extractive_summaries
 
-# Load your Groq API key from environment variables
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")  # Ensure it's set in your .env file
-API_URL = "https://api.groq.com/openai/v1/chat/completions"  # Correct endpoint for Groq's chat API
+log = get_logger(__name__)
 
-def fetch_news_content(url):
+SUMMARY_PROMPT = "Summarize the following news content:"
+CHUNK_PROMPT = "Summarize this part of a longer news article or transcript. Keep every key fact, name and number:"
+REDUCE_PROMPT = "The following are summaries of consecutive parts of one news article or transcript. Combine them into a single concise and informative summary:"
+
+def _summary_messages(text, prompt):
+    return [
+        {"role": "system", "content": "You are a summarizer that gives concise and informative summaries of news content."},
+        {"role": "user", "content": f"{prompt}\n\n{text}"}
+    ]
+
+def summarize_text(text, prompt=SUMMARY_PROMPT):
     """
-    Fetches and parses text from a news article.
+    Summarizes the given text on the model the LLM router picks for its
+    size, failing over to the next route if that one is throttled or down.
+
+    Returns:
+        RoutedText: The summary, with the route that wrote it in .route.
     """
-    try:
-        article = newspaper.Article(url)
-        article.download()
-        article.parse()
-        return article.text
-    except Exception as e:
-        raise Exception(f"Error fetching news article from {url}: {e}")
-
-def summarize_text(text):
-    """
-    Summarizes the given text using Groq's LLM API.
-    """
-    if not GROQ_API_KEY:
-        raise Exception("Groq API key is not set in the environment variables.")
-    
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "model": "llama3-8b-8192",
-        "messages": [
-            {"role": "system", "content": "You are a summarizer that gives concise and informative summaries of news content."},
-            {"role": "user", "content": f"Summarize the following news content:\n\n{text}"}
-        ],
-        "temperature": 0.5
-    }
+    return get_llm_router().chat(_summary_messages(text, prompt), temperature=0.5, input_tokens=estimate_tokens(text))
+
+async def stream_summary_text(text, prompt=SUMMARY_PROMPT, served=None):
+    """
+    Streams the summary of the given text token by token.
+
+    Args:
+        served (dict, optional): Receives the serving route under 'route'.
+    """
+    messages = _summary_messages(text, prompt)
+    async for delta in get_llm_router().astream_chat(messages, temperature=0.5, input_tokens=estimate_tokens(text), served=served):
+        yield delta
+
+# Shared by all long-text summaries so chunk calls stay bounded process-wide
+_chunk_executor = ThreadPoolExecutor(max_workers=max(1, settings.CHUNK_PARALLELISM), thread_name_prefix="llm-chunk")
+
+def prepare_summary_input(text, transcript=False):
+    """
+    Runs the map phase for inputs that don't fit in one prompt.
+
+    With COMPRESSION_ENABLED the text is first reduced locally to its most
+    central sentences, which usually makes the map phase unnecessary. Long
+    texts are split on sentence boundaries into overlapping chunks, the
+    chunks are summarized concurrently and the partial summaries are combined
+    (repeatedly, if they are still too long) until they fit.
+
+    Returns:
+        tuple: (text, prompt) for the final summary request.
+    """
+    if settings.COMPRESSION_ENABLED:
+        text = compress_text(text, transcript=transcript)
+
+    # A long-context route takes the whole text; chunks stay sized for the regular routes
+    if estimate_tokens(text) <= max(settings.CHUNK_MAX_TOKENS, get_llm_router().max_input_tokens()):
+        return text, SUMMARY_PROMPT
+
+    max_tokens = settings.CHUNK_MAX_TOKENS
+    chunks = chunk_text(text, max_tokens, settings.CHUNK_OVERLAP_TOKENS)
+    log.info("summarizing long input", chunks=len(chunks))
+    partials = list(_chunk_executor.map(lambda chunk: summarize_text(chunk, prompt=CHUNK_PROMPT), chunks))
+
+    combined = "\n\n".join(partials)
+    while estimate_tokens(combined) > max_tokens:
+        groups = chunk_text(combined, max_tokens)
+        if len(groups) >= len(partials):
+            # Partial summaries aren't shrinking; cut them down so the final request fits
+            combined = _truncate_partials(partials, max_tokens)
+            break
+        partials = list(_chunk_executor.map(lambda group: summarize_text(group, prompt=REDUCE_PROMPT), groups))
+        combined = "\n\n".join(partials)
+
+    return combined, REDUCE_PROMPT
+
+def _truncate_partials(partials, max_tokens):
+    """
+    Joins partial summaries within max_tokens, keeping the leading sentences
+    of every part rather than dropping the later parts of the input.
+    """
+    per_part = max(1, max_tokens // len(partials))
+    kept = [chunk_text(part, per_part)[0] if estimate_tokens(part) > per_part else part for part in partials]
+    combined = "\n\n".join(kept)
+    # Separators and per-sentence rounding can still overshoot slightly
+    limit = max_tokens * CHARS_PER_TOKEN
+    return combined if len(combined) <= limit else combined[:limit].rsplit(" ", 1)[0]
+
+def can_fall_back(error: LLMError) -> bool:
+    """
+    True if the LLM error is throttling or an outage (429, 5xx, no response)
+    and EXTRACTIVE_FALLBACK allows serving an extractive summary instead.
+    """
+    return settings.EXTRACTIVE_FALLBACK and (error.status_code is None or error.status_code == 429 or error.status_code >= 500)
+
+def fallback_summary(text, transcript=False, error=None):
+    """
+    Extractive summary served in place of a failed LLM summary.
+    """
+    log.warning("llm unavailable, serving extractive summary", error=str(error) if error else None)
+    extractive_summaries.inc(reason="fallback")
+    return FallbackSummary(extractive_summary(text, transcript=transcript))
+
+def summarize_long_text(text, transcript=False):
+    """
+    Map-reduce summarization: short texts go straight to summarize_text,
+    long ones are summarized chunk by chunk and then combined.
+
+    In SUMMARY_MODE 'extractive' no LLM is called at all. If Groq is
+    throttling or down after all retries, an extractive summary is returned
+    instead of an error (see EXTRACTIVE_FALLBACK).
+    """
+    if settings.SUMMARY_MODE == "extractive":
+        extractive_summaries.inc(reason="mode")
+        return RoutedText(extractive_summary(text, transcript=transcript), "extractive")
 
     try:
-        response = requests.post(API_URL, headers=headers, json=data)
-        response.raise_for_status()
-        response_data = response.json()
-        return response_data["choices"][0]["message"]["content"]
-    
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"Error in API request: {str(e)}")
-    
-    except (KeyError, IndexError) as e:
-        raise Exception(f"Unexpected response format from Groq API. Error: {str(e)}")
-
-def save_summary_to_db(source, content, summary):
-    """
-    Function to save the summary to the database with a fixed "NEUTRAL" sentiment.
-    """
-    # Create a new Summary instance
-    db_session = SessionLocal()  # Initialize the database session
-    summary_entry = Summary(
-        source=source,
-        content=content,
-        summary=summary,
-        sentiment="NEUTRAL"  # Always set the sentiment as 'NEUTRAL'
-    )
-    # Add to the session and commit
-    db_session.add(summary_entry)
-    db_session.commit()
-    db_session.close()  # Close the session to prevent memory leaks
-
-def summarize_url(url: str):
-    """
-    Summary interface function for main.py.
-    """
-    content = fetch_news_content(url)
-    summary = summarize_text(content)
-    save_summary_to_db(url, content, summary)  # Save summary to DB with "NEUTRAL" sentiment
-    return summary
-
-def process_user_request(url=None, text=None):
-    """
-    Unified interface for summarizing either a URL or raw text.
-    """
-    if url:
-        content = fetch_news_content(url)
-    elif text:
-        content = text
-    else:
-        raise Exception("No content provided for summarization.")
-    
-    summary = summarize_text(content)
-    save_summary_to_db("User Input", content, summary)  # Save user input summary to DB with "NEUTRAL" sentiment
-    return summary
-
-def fetch_sources(youtube_urls=None, news_urls=None, raw_texts=None):
-    """
-    Fetches and processes audio + summarization based on various sources.
-    """
-    audio_files = []
-    summaries = []
-
-    # Assuming get_youtube_audio is defined somewhere
-    if youtube_urls:
-        if isinstance(youtube_urls, list) and all(isinstance(url, str) for url in youtube_urls):
-            audio_files = get_youtube_audio(youtube_urls)
-        else:
-            print("Error: youtube_urls is not a valid list of strings.")
-
-    if news_urls:
-        for news_url in news_urls:
-            try:
-                text = fetch_news_content(news_url)
-                summary = summarize_text(text)
-                save_summary_to_db(news_url, text, summary)  # Save summary to DB with "NEUTRAL" sentiment
-                summaries.append(summary)
-            except Exception as e:
-                print(f"Error summarizing news article {news_url}: {e}")
-                summaries.append(None)
-
-    if raw_texts:
-        for raw_text in raw_texts:
-            try:
-                summary = summarize_text(raw_text)
-                save_summary_to_db("Raw Text", raw_text, summary)  # Save raw text summary to DB with "NEUTRAL" sentiment
-                summaries.append(summary)
-            except Exception as e:
-                print(f"Error summarizing raw text: {e}")
-                summaries.append(None)
-
-    return {
-        'audio_files': audio_files,
-        'summaries': summaries
-    }
+        final_text, prompt = prepare_summary_input(text, transcript)
+        return summarize_text(final_text, prompt=prompt)
+    except LLMError as e:
+        if not can_fall_back(e):
+            raise
+        return fallback_summary(text, transcript, e)
+
+def summarize_transcript(text):
+    """
+    summarize_long_text for Whisper output: filler is removed before scoring.
+    """
+    return summarize_long_text(text, transcript=True)
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+# Modules are imported flat from backend/, as when the app runs
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# db.database builds its engine at import time; point it at a throwaway SQLite file
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='flashdigest-tests-')}/test.db")
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+@pytest.fixture(scope="session", autouse=True)
+def _tables():
+    from db.database import engine
+    from db.search import ensure_search_index
+    from models import Base
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
+    yield
+    engine.dispose()
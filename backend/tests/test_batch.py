@@ -0,0 +1,66 @@
+import pytest
+import batch
+from batch import is_valid_batch_id, start_batch
+
+@pytest.fixture
+def no_run(monkeypatch, tmp_path):
+    # Runners are registered but their threads never start, so they stay 'pending'
+    monkeypatch.setattr(batch.settings, "BATCH_DIR", str(tmp_path))
+    monkeypatch.setattr(batch.BatchRunner, "run", lambda self: None)
+    monkeypatch.setattr(batch, "_batches", {})
+
+@pytest.mark.parametrize("batch_id", ["../../etc/passwd", "ABCDEF" * 6, "a" * 31, "a" * 33, "a" * 32 + "\n", ""])
+def test_rejects_malformed_batch_ids(batch_id, no_run):
+    assert not is_valid_batch_id(batch_id)
+    with pytest.raises(ValueError):
+        start_batch([{"source": "https://a.example/x", "mode": "summarize"}], batch_id=batch_id)
+
+def test_pending_batch_counts_as_busy(no_run):
+    items = [{"source": "https://a.example/x", "mode": "summarize"}]
+    batch_id = start_batch(items)
+    assert is_valid_batch_id(batch_id)
+    with pytest.raises(ValueError, match="already running"):
+        start_batch(items, batch_id=batch_id)
+
+def _text_items(n):
+    return [{"source": f"text:{i}", "mode": "text", "text": f"Item {i} says something worth summarizing."} for i in range(n)]
+
+def test_runner_writes_through_buffered_writer(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch, "cached_summarize_text", lambda content, summarize: "summary of " + content)
+    progress = tmp_path / "progress.jsonl"
+    runner = batch.BatchRunner(_text_items(5), progress_path=str(progress), write_batch_size=2, flush_seconds=0.05)
+
+    status = runner.run()
+
+    assert status["state"] == "completed"
+    assert status["counts"]["completed"] == 5
+    assert runner.results[3] == "summary of Item 3 says something worth summarizing."
+    assert progress.read_text().count('"status": "done"') == 5
+
+def test_runner_marks_items_failed_when_the_write_fails(monkeypatch, tmp_path):
+    import db.db_insert
+
+    def fail(db, rows):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(batch, "cached_summarize_text", lambda content, summarize: "summary")
+    monkeypatch.setattr(db.db_insert, "save_summaries_bulk", fail)
+    runner = batch.BatchRunner(_text_items(3), progress_path=str(tmp_path / "p.jsonl"), write_batch_size=10, flush_seconds=60)
+
+    status = runner.run()
+
+    assert status["counts"]["failed"] == 3
+    assert all(summary is None for summary in runner.results.values())
+
+def test_cancel_removes_downloaded_audio_it_skips(tmp_path):
+    audio = tmp_path / "batch_audio.mp3"
+    audio.write_bytes(b"ID3")
+    runner = batch.BatchRunner(_text_items(1), progress_path=str(tmp_path / "p.jsonl"))
+    runner.cancel()
+
+    inbox = batch.queue.Queue()
+    inbox.put({"index": 0, "source": "https://www.youtube.com/watch?v=x", "mode": "transcribe", "audio_path": str(audio)})
+    inbox.put(batch._STOP)
+    runner._worker(inbox, lambda item: pytest.fail("handled a cancelled item"))
+
+    assert not audio.exists()
@@ -0,0 +1,45 @@
+from cache import (
+    cached_summarize_text,
+    hash_summary_cache,
+    lookup_summary_by_url,
+    remember_url_summary,
+    url_summary_cache,
+)
+from compression import FallbackSummary
+from db.database import SessionLocal
+from db.db_insert import save_summary_to_db
+
+URL = "https://www.youtube.com/watch?v=cachekey001"
+
+def test_url_cache_is_keyed_by_mode():
+    url_summary_cache.clear()
+    remember_url_summary(URL, "summarize", "summary of the watch page")
+
+    assert lookup_summary_by_url(URL, "summarize") == "summary of the watch page"
+    assert lookup_summary_by_url(URL, "transcribe") is None
+
+def test_database_lookup_matches_mode():
+    url = URL + "-db"
+    db = SessionLocal()
+    try:
+        assert save_summary_to_db(db, source=url, content="spoken words " * 20, summary="transcript summary", mode="transcribe")
+    finally:
+        db.close()
+    url_summary_cache.clear()
+
+    assert lookup_summary_by_url(url, "summarize") is None
+    assert lookup_summary_by_url(url, "transcribe") == "transcript summary"
+
+def test_fallback_summaries_are_not_reused():
+    url = "https://news.example/fallback-story"
+    text = " ".join(f"The harbour authority reported item {i} of its annual review." for i in range(40))
+    db = SessionLocal()
+    try:
+        assert save_summary_to_db(db, source=url, content=text, summary=FallbackSummary("fallback stand-in"), mode="summarize")
+    finally:
+        db.close()
+    url_summary_cache.clear()
+    hash_summary_cache.clear()
+
+    assert lookup_summary_by_url(url, "summarize") is None
+    assert cached_summarize_text(text, lambda text: "llm summary") == "llm summary"
@@ -0,0 +1,25 @@
+from compression import clean_sentences
+
+def test_transcript_keeps_words_that_look_like_fillers():
+    text = "Turn right, then left at the church. The well, which was dry, sat behind it. I like, in general, quiet towns."
+    assert clean_sentences(text, transcript=True) == [
+        "Turn right, then left at the church.",
+        "The well, which was dry, sat behind it.",
+        "I like, in general, quiet towns.",
+    ]
+
+def test_transcript_drops_leading_discourse_markers_and_hesitations():
+    text = "Um, so, well, the bridge opened in May. You know, it took ten years. Uh the the council paid for it."
+    assert clean_sentences(text, transcript=True) == [
+        "The bridge opened in May.",
+        "It took ten years.",
+        "The council paid for it.",
+    ]
+
+def test_transcript_drops_outros_and_repeated_lines():
+    text = "The vote passed on Tuesday. The vote passed on Tuesday. Thanks for watching and see you next time."
+    assert clean_sentences(text, transcript=True) == ["The vote passed on Tuesday."]
+
+def test_article_drops_boilerplate_and_link_fragments():
+    text = "Advertisement. The mayor resigned on Friday after the audit. Read more: City news. Most popular\nShe denies wrongdoing."
+    assert clean_sentences(text) == ["The mayor resigned on Friday after the audit.", "She denies wrongdoing."]
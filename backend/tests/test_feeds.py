@@ -0,0 +1,36 @@
+import asyncio
+import feeds
+from feeds import FeedPoller
+
+FEED = {"id": 1, "url": "https://news.example/rss", "etag": None, "last_modified": None}
+
+def _fail(message):
+    def fail(*args, **kwargs):
+        raise RuntimeError(message)
+    return fail
+
+def test_poll_survives_database_errors(monkeypatch):
+    async def fetch(self, feed):
+        raise RuntimeError("feed unreachable")
+    monkeypatch.setattr(FeedPoller, "_fetch", fetch)
+    monkeypatch.setattr(feeds, "_record_poll", _fail("database is locked"))
+    monkeypatch.setattr(feeds, "_claim_entries", _fail("database is locked"))
+
+    asyncio.run(FeedPoller().poll(FEED))
+
+def test_run_keeps_polling_after_a_failed_poll(monkeypatch):
+    polls = []
+
+    async def fetch(self, feed):
+        polls.append(feed["id"])
+        if len(polls) >= 2:
+            self._stopping = True
+        raise RuntimeError("feed unreachable")
+    monkeypatch.setattr(FeedPoller, "_fetch", fetch)
+    monkeypatch.setattr(feeds, "_claim_due_feeds", lambda limit: [FEED])
+    monkeypatch.setattr(feeds, "_record_poll", _fail("database is locked"))
+    monkeypatch.setattr(feeds, "_claim_entries", _fail("database is locked"))
+    monkeypatch.setattr(feeds.settings, "FEED_DIGEST_SECONDS", 0)
+
+    asyncio.run(asyncio.wait_for(FeedPoller()._run(), 5))
+    assert polls == [1, 1]
@@ -0,0 +1,20 @@
+import fetch_sources
+
+def test_youtube_audio_keeps_input_order_with_failures(monkeypatch, tmp_path):
+    monkeypatch.setattr(fetch_sources.settings, "DOWNLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(fetch_sources, "_download_audio", lambda url, base: None if url.endswith("gone") else f"{base}.mp3")
+
+    paths = fetch_sources.get_youtube_audio(["https://y.example/a", "https://y.example/gone", "https://y.example/c"])
+
+    assert paths[1] is None
+    assert paths[0].endswith("_0.mp3") and paths[2].endswith("_2.mp3")
+
+def test_yt_dlp_messages_go_to_the_structured_log(capsys, caplog):
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL({"quiet": True, "noprogress": True, "logger": fetch_sources._YtDlpLogger("https://y.example/a")}) as ydl:
+        ydl.to_screen("[download]  42.0% of 3.00MiB")
+        ydl.report_warning("Falling back to generic extractor")
+
+    assert capsys.readouterr().out == ""
+    assert [(r.getMessage(), r.fields["url"]) for r in caplog.records] == [("yt-dlp warning", "https://y.example/a")]
@@ -0,0 +1,44 @@
+import os
+import threading
+import time
+from fetcher import RawHtmlStore
+
+def _age(store, url, seconds):
+    for path in store._paths(url):
+        stored_at = time.time() - seconds
+        os.utime(path, (stored_at, stored_at))
+
+def test_concurrent_puts_leave_a_complete_entry(tmp_path):
+    store = RawHtmlStore(str(tmp_path), max_bytes=0, max_age_seconds=0)
+    pages = [f"<html>{i}</html>" * 2000 for i in range(8)]
+    threads = [threading.Thread(target=store.put, args=("https://a.example/x", page, f'"{i}"')) for i, page in enumerate(pages)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    meta, html = store.get("https://a.example/x")
+    assert html in pages
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".tmp")]
+
+def test_evicts_expired_entries(tmp_path):
+    store = RawHtmlStore(str(tmp_path), max_bytes=0, max_age_seconds=60)
+    store.put("https://a.example/old", "old")
+    store.put("https://a.example/new", "new")
+    _age(store, "https://a.example/old", 120)
+
+    assert store.evict() == 1
+    assert store.get("https://a.example/old") == (None, None)
+    assert store.get("https://a.example/new")[1] == "new"
+
+def test_evicts_oldest_entries_above_size_limit(tmp_path):
+    store = RawHtmlStore(str(tmp_path), max_bytes=0, max_age_seconds=0)
+    for i in range(4):
+        store.put(f"https://a.example/{i}", "x" * 1000)
+        _age(store, f"https://a.example/{i}", 100 - i)
+    store.max_bytes = 2500
+
+    assert store.evict() == 2
+    assert store.get("https://a.example/0") == (None, None)
+    assert store.get("https://a.example/1") == (None, None)
+    assert store.get("https://a.example/3")[1] == "x" * 1000
@@ -0,0 +1,155 @@
+import asyncio
+import httpx
+import pytest
+import requests
+import llm_router
+from llm_client import LLMClient, LLMError
+from llm_router import LLMRouter, Route
+
+MESSAGES = [{"role": "user", "content": "Summarize the council meeting."}]
+
+class StubClient:
+    """Stands in for a route's LLMClient: answers with the text or raises the errors queued for it."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def queue_delay(self, messages):
+        return 0.0
+
+    def _next(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def chat(self, messages, temperature=0.5, **limits):
+        return self._next()
+
+    async def achat(self, messages, temperature=0.5, **limits):
+        return self._next()
+
+    async def astream_chat(self, messages, temperature=0.5, **limits):
+        outcome = self._next()
+        for part in outcome:
+            if isinstance(part, Exception):
+                raise part
+            yield part
+
+def _route(name, client, **options):
+    route = Route(name, f"model-{name}", **options)
+    route.client = client
+    return route
+
+@pytest.fixture(autouse=True)
+def router_settings(monkeypatch):
+    monkeypatch.setattr(llm_router.settings, "LLM_CIRCUIT_FAILURES", 3)
+    monkeypatch.setattr(llm_router.settings, "LLM_CIRCUIT_COOLDOWN_SECONDS", 30)
+    monkeypatch.setattr(llm_router.settings, "LLM_MAX_COST_PER_REQUEST", 0)
+
+def test_throttled_route_fails_over_and_labels_the_answer():
+    first, second = StubClient(LLMError("rate limited", status_code=429)), StubClient("summary")
+    router = LLMRouter([_route("fast", first), _route("long", second)])
+
+    text = router.chat(MESSAGES)
+    assert text == "summary" and text.route == "long:model-long"
+    assert (first.calls, second.calls) == (1, 1)
+    assert router.routes[0].failures == 1 and router.routes[1].failures == 0
+
+def test_async_timeout_fails_over():
+    first, second = StubClient(LLMError("timed out", timed_out=True)), StubClient("summary")
+    router = LLMRouter([_route("fast", first), _route("long", second)])
+
+    assert asyncio.run(router.achat(MESSAGES)).route == "long:model-long"
+
+def test_bad_request_does_not_fail_over():
+    first, second = StubClient(LLMError("bad request", status_code=400)), StubClient("summary")
+    router = LLMRouter([_route("fast", first), _route("long", second)])
+
+    with pytest.raises(LLMError, match="bad request"):
+        router.chat(MESSAGES)
+    assert second.calls == 0
+    assert router.routes[0].failures == 0  # The prompt was at fault, not the route
+
+def test_stream_fails_over_before_first_token_only():
+    async def collect(router, served):
+        return [delta async for delta in router.astream_chat(MESSAGES, served=served)]
+
+    router = LLMRouter([_route("fast", StubClient([LLMError("overloaded", status_code=503)])), _route("long", StubClient(["Council ", "met."]))])
+    served = {}
+    assert asyncio.run(collect(router, served)) == ["Council ", "met."]
+    assert served["route"] == "long:model-long"
+
+    second = StubClient(["never"])
+    router = LLMRouter([_route("fast", StubClient(["Council ", LLMError("connection reset")])), _route("long", second)])
+    served = {}
+    with pytest.raises(LLMError, match="connection reset"):
+        asyncio.run(collect(router, served))
+    assert served["route"] == "fast:model-fast" and second.calls == 0
+    assert router.routes[0].failures == 1
+
+def test_circuit_opens_after_consecutive_failures(monkeypatch):
+    monkeypatch.setattr(llm_router.settings, "LLM_CIRCUIT_FAILURES", 2)
+    first, second = StubClient(LLMError("down", status_code=502)), StubClient("summary")
+    router = LLMRouter([_route("fast", first), _route("long", second)])
+
+    router.chat(MESSAGES)
+    assert not router.routes[0].is_open()
+    router.chat(MESSAGES)
+    assert router.routes[0].is_open()
+
+    assert [r.name for r in router.plan(MESSAGES)] == ["long", "fast"]
+    router.chat(MESSAGES)
+    assert first.calls == 2  # Skipped while open
+
+    router.routes[0].open_until = 0.0  # Cooldown over: probed again, and a success closes it
+    first.outcomes = ["recovered"]
+    router.routes[1].client = StubClient(LLMError("down", status_code=502))
+    assert router.chat(MESSAGES).route == "fast:model-fast"
+    assert router.routes[0].failures == 0
+
+def test_plan_filters_by_size_and_cost(monkeypatch):
+    small = _route("small", StubClient("a"), max_input_tokens=100)
+    large = _route("large", StubClient("b"), max_input_tokens=10000, cost_per_million_tokens=1.0)
+    premium = _route("premium", StubClient("c"), max_input_tokens=10000, cost_per_million_tokens=1000.0)
+    backup = _route("backup", StubClient("d"), max_input_tokens=10000, fallback_only=True)
+    router = LLMRouter([backup, small, large, premium])
+
+    assert [r.name for r in router.plan(MESSAGES)] == ["small", "large", "premium", "backup"]
+    assert [r.name for r in router.plan(MESSAGES, input_tokens=5000)] == ["large", "premium", "backup"]
+    assert [r.name for r in router.plan(MESSAGES, input_tokens=50000)] == ["large", "premium", "small", "backup"]  # Nothing fits: largest first
+
+    monkeypatch.setattr(llm_router.settings, "LLM_MAX_COST_PER_REQUEST", 0.01)
+    assert [r.name for r in router.plan(MESSAGES, input_tokens=5000)] == ["large", "backup"]
+
+def _response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    return response
+
+@pytest.mark.parametrize("body", [b"<html>bad gateway</html>", b'{"id": "x"}', b"[]"])
+def test_malformed_body_raises_llm_error_and_fails_over(monkeypatch, body):
+    client = LLMClient("http://llm.invalid/v1/chat/completions", "key", "model-fast")
+    monkeypatch.setattr(client.session, "post", lambda *args, **kwargs: _response(body))
+    with pytest.raises(LLMError) as error:
+        client.chat(MESSAGES, max_retries=0)
+    assert error.value.status_code is None
+
+    router = LLMRouter([_route("fast", client), _route("long", StubClient("summary"))])
+    assert router.chat(MESSAGES).route == "long:model-long"
+
+def test_async_malformed_body_raises_llm_error():
+    client = LLMClient("http://llm.invalid/v1/chat/completions", "key", "model-fast")
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b"not json")))
+
+    async def run():
+        try:
+            return await client.achat(MESSAGES, max_retries=0)
+        finally:
+            await client.aclose()
+
+    with pytest.raises(LLMError, match="Invalid JSON"):
+        asyncio.run(run())
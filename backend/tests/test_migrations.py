@@ -0,0 +1,78 @@
+from sqlalchemy import create_engine, inspect, text
+from db.migrations import migrate_schema
+
+def _baseline_engine(tmp_path):
+    # Summaries as created by the first release, before any added column
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE "Summaries" (id INTEGER PRIMARY KEY, source VARCHAR NOT NULL, '
+            'content TEXT NOT NULL, summary TEXT NOT NULL, language VARCHAR, sentiment VARCHAR)'
+        ))
+        conn.execute(text(
+            "INSERT INTO \"Summaries\" (source, content, summary) VALUES ('https://a.example/x', 'text', 'sum')"
+        ))
+    return engine
+
+def test_adds_missing_summary_columns_and_indexes(tmp_path):
+    engine = _baseline_engine(tmp_path)
+    migrate_schema(engine)
+
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("Summaries")}
+    assert {"content_hash", "created_at", "content_id", "route"} <= columns
+    indexes = {i["name"] for i in inspector.get_indexes("Summaries")}
+    assert "ix_Summaries_content_hash" in indexes
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT summary, content_hash FROM "Summaries"')).one() == ("sum", None)
+
+def test_is_idempotent(tmp_path):
+    engine = _baseline_engine(tmp_path)
+    migrate_schema(engine)
+    migrate_schema(engine)
+
+def test_skips_missing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/empty.db")
+    migrate_schema(engine)
+    assert inspect(engine).get_table_names() == []
+
+def _nullable(engine, table, column):
+    return next(c for c in inspect(engine).get_columns(table) if c["name"] == column)["nullable"]
+
+def test_drops_not_null_from_summary_content(tmp_path):
+    engine = _baseline_engine(tmp_path)
+    migrate_schema(engine)
+
+    assert _nullable(engine, "Summaries", "content")
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO \"Summaries\" (source, summary) VALUES ('https://a.example/y', 'no inline content')"))
+        rows = conn.execute(text('SELECT id, source, content FROM "Summaries" ORDER BY id')).all()
+    assert rows == [(1, "https://a.example/x", "text"), (2, "https://a.example/y", None)]
+    assert "Summaries_old" not in inspect(engine).get_table_names()
+    assert "ix_Summaries_source" in {i["name"] for i in inspect(engine).get_indexes("Summaries")}
+
+def test_rebuild_keeps_full_text_index_consistent(tmp_path):
+    from db.search import ensure_search_index
+
+    engine = _baseline_engine(tmp_path)
+    ensure_search_index(engine)  # Index built while content was still NOT NULL
+    migrate_schema(engine)
+    ensure_search_index(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("""SELECT rowid FROM "Summaries_fts" WHERE "Summaries_fts" MATCH 'sum'""")).scalars().all() == [1]
+        conn.execute(text('INSERT INTO "Summaries_fts"("Summaries_fts") VALUES (\'integrity-check\')'))
+
+def test_adds_job_columns(tmp_path):
+    # Jobs as created before peak RSS and clients were recorded
+    engine = create_engine(f"sqlite:///{tmp_path}/jobs.db")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE "Jobs" (id VARCHAR(36) PRIMARY KEY, mode VARCHAR NOT NULL, url VARCHAR NOT NULL, '
+            'model_size VARCHAR, status VARCHAR NOT NULL, stage VARCHAR, progress FLOAT NOT NULL, result TEXT, '
+            'error TEXT, cancel_requested BOOLEAN NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)'
+        ))
+    migrate_schema(engine)
+
+    assert {"peak_rss_mb", "client"} <= {c["name"] for c in inspect(engine).get_columns("Jobs")}
+    assert "ix_Jobs_client" in {i["name"] for i in inspect(engine).get_indexes("Jobs")}
@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import parallel_transcribe
+from audio_stream import SAMPLE_RATE
+
+class _Model:
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, samples, fp16=False):
+        self.calls += 1
+        seconds = len(samples) / SAMPLE_RATE
+        label = f"window {int(samples[0])}"
+        return {"text": f" {label}", "segments": [{"start": 0.0, "end": seconds, "text": f" {label}"}]}
+
+def test_windows_fan_out_in_order_with_bounded_read_ahead(monkeypatch):
+    model = _Model()
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(parallel_transcribe, "_worker_model", model)
+    monkeypatch.setattr(parallel_transcribe, "_get_pool", lambda model_size, processes: pool)
+
+    ahead = []
+
+    def windows():
+        for i in range(10):
+            ahead.append(i - model.calls)  # Windows handed out but not yet transcribed
+            yield np.full(30 * SAMPLE_RATE, i, dtype=np.float32)
+
+    result = parallel_transcribe.transcribe_windows_parallel(windows(), "tiny", processes=2)
+    pool.shutdown()
+
+    assert result["text"] == " ".join(f"window {i}" for i in range(10))
+    assert [s["start"] for s in result["segments"]] == [30.0 * i for i in range(10)]
+    assert result["chunks"] == 10 and result["seconds"] == 300.0
+    assert max(ahead) <= 4
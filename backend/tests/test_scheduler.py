@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from starlette.requests import Request
+import main
+import scheduler
+from scheduler import Lane, Overloaded
+from singleflight import pipeline_flights, flight_key
+
+def test_burst_from_one_client_does_not_starve_another():
+    async def run():
+        lane = Lane("test", slots=1, max_queue=10)
+        served = []
+
+        async def request(client):
+            await lane.acquire(client, 1.0, shed=False)
+            served.append(client)
+
+        await lane.acquire("a", 1.0)  # Holds the only slot
+        tasks = [asyncio.create_task(request(c)) for c in ("a", "a", "a", "b")]
+        await asyncio.sleep(0)
+        assert len(lane.waiting) == 4
+
+        holder = "a"
+        for _ in tasks:
+            lane.release(holder)
+            await asyncio.sleep(0)
+            holder = served[-1]
+        await asyncio.gather(*tasks)
+        lane.release(holder)
+        return served
+
+    assert asyncio.run(run()) == ["b", "a", "a", "a"]
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        lane = Lane("test", slots=1, max_queue=10)
+        await lane.acquire("a", 1.0)
+        waiter = asyncio.create_task(lane.acquire("b", 1.0))
+        await asyncio.sleep(0)
+        assert len(lane.waiting) == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert lane.waiting == [] and "b" not in lane.client_requests
+
+        lane.release("a")
+        return lane
+
+    lane = asyncio.run(run())
+    assert lane.running == 0 and lane.client_requests == {}
+
+def test_retry_after_scales_with_queue_and_service_time(monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "SCHEDULER_RETRY_AFTER_SECONDS", 7)
+
+    async def run():
+        lane = Lane("test", slots=2, max_queue=10)
+        assert lane.retry_after() == 7  # No timings yet
+
+        await lane.acquire("a", 1.0)
+        lane.release("a", elapsed=10.0)
+        assert lane.retry_after() == 5  # 10 s for one request over two slots
+
+        await lane.acquire("a", 1.0)
+        lane.release("a", elapsed=20.0)
+        assert lane.service_seconds == pytest.approx(12.0)  # Moving average
+
+        await lane.acquire("a", 1.0)
+        await lane.acquire("b", 1.0)
+        waiters = [asyncio.create_task(lane.acquire("c", 1.0)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert lane.retry_after() == 24  # 12 s x (3 waiting + 1) / 2 slots
+
+        lane.service_seconds = 1e6
+        assert lane.retry_after() == scheduler.RETRY_AFTER_MAX_SECONDS
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(run())
+
+def test_client_quota_and_full_queue_shed(monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "SCHEDULER_CLIENT_MAX_REQUESTS", 2)
+
+    async def run():
+        lane = Lane("test", slots=1, max_queue=1)
+        await lane.acquire("a", 1.0)
+        waiter = asyncio.create_task(lane.acquire("a", 1.0))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded, match="Too many requests"):
+            lane.check("a")
+        with pytest.raises(Overloaded, match="full"):
+            lane.check("b")
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(run())
+
+def test_request_joining_a_running_flight_takes_no_slot(monkeypatch):
+    monkeypatch.setattr(scheduler.settings, "SCHEDULER_ENABLED", True)
+    monkeypatch.setattr(scheduler.settings, "SINGLEFLIGHT_ENABLED", True)
+    url = "https://news.example/story"
+    monkeypatch.setitem(pipeline_flights._flights, flight_key("summarize", url), object())
+    monkeypatch.setattr(scheduler.Scheduler, "_estimate", lambda *a: pytest.fail("estimated a joined request"))
+
+    slot = asyncio.run(scheduler.scheduler.admit("summarize", url, client="a"))
+    assert slot.lane is None
+
+def _request(peer, client_header=None):
+    headers = [(b"x-client-id", client_header.encode())] if client_header else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 5000)})
+
+def test_client_header_only_trusted_from_configured_proxies(monkeypatch):
+    monkeypatch.setattr(main, "_trusted_proxies", {"10.0.0.2"})
+    assert main._client_id(_request("203.0.113.9", "spoofed")) == "203.0.113.9"
+    assert main._client_id(_request("10.0.0.2", "team-a")) == "team-a"
+    assert main._client_id(_request("10.0.0.2")) == "10.0.0.2"
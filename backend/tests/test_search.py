@@ -0,0 +1,53 @@
+from sqlalchemy import create_engine, inspect
+from db.migrations import ensure_summary_tables
+from db.search import ensure_search_index
+
+def test_search_index_skipped_without_summaries_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/fresh.db")
+    ensure_search_index(engine)
+    assert inspect(engine).get_table_names() == []
+
+def test_fresh_database_gets_tables_and_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/fresh.db")
+    ensure_summary_tables(engine)
+    ensure_search_index(engine)
+
+    tables = set(inspect(engine).get_table_names())
+    assert {"Contents", "ContentBands", "Summaries", "Transcripts", "TranscriptSegments", "Summaries_fts"} <= tables
+
+def test_search_matches_text_stored_in_contents():
+    from db.database import SessionLocal
+    from db.db_insert import save_summary_to_db
+    from db.search import list_summaries
+
+    db = SessionLocal()
+    try:
+        assert save_summary_to_db(
+            db, source="https://a.example/aardvark", mode="summarize",
+            content="The aardvark census counted 412 animals in the reserve this spring.", summary="Wildlife numbers are up.",
+        )
+        sources = lambda q: [item["source"] for item in list_summaries(db, q=q)["items"]]
+
+        assert sources("aardvark census") == ["https://a.example/aardvark"]  # Only in the content
+        assert sources("wildlife") == ["https://a.example/aardvark"]  # Only in the summary
+        assert sources("pangolin") == []
+    finally:
+        db.close()
+
+def test_new_index_is_filled_from_stored_contents(tmp_path):
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+    from db.content_store import store_contents
+
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    ensure_summary_tables(engine)
+    with engine.begin() as conn:
+        conn.execute(text('DROP TABLE "Contents_fts"'))  # As before the content index existed
+    with Session(engine) as db:
+        ids = store_contents(db, ["Quarterly harvest figures for the valley."])
+        db.commit()
+
+    ensure_search_index(engine)
+    with engine.connect() as conn:
+        matched = conn.execute(text("""SELECT rowid FROM "Contents_fts" WHERE "Contents_fts" MATCH 'harvest'""")).scalars().all()
+    assert matched == list(ids.values())
@@ -0,0 +1,51 @@
+import asyncio
+import uuid
+import pytest
+import run_pipeline
+from db.database import SessionLocal
+from db.segments import load_segments
+from models import Summary
+from transcription import TimedTranscript
+
+SEGMENTS = [
+    {"start": 0.0, "end": 4.0, "text": " The council met on Monday."},
+    {"start": 4.0, "end": 9.5, "text": " It approved the new bridge."},
+]
+
+@pytest.fixture
+def video_url():
+    return f"https://www.youtube.com/watch?v={uuid.uuid4().hex[:11]}"
+
+@pytest.fixture(autouse=True)
+def streamed_transcript(monkeypatch):
+    # Cache off: the summary save alone must keep the segments
+    monkeypatch.setattr(run_pipeline.settings, "TRANSCRIPT_CACHE_ENABLED", False)
+    monkeypatch.setattr(run_pipeline.settings, "AUDIO_STREAMING", True)
+    monkeypatch.setattr(run_pipeline.settings, "SUMMARY_MODE", "extractive")
+    monkeypatch.setattr(run_pipeline, "transcribe_youtube_stream", lambda url, model_size=None: TimedTranscript(
+        "The council met on Monday. It approved the new bridge.", SEGMENTS,
+    ))
+    monkeypatch.setattr(run_pipeline, "summarize_transcript", lambda text: "Bridge approved.")
+    monkeypatch.setattr(run_pipeline, "summarize_long_text", lambda text, transcript=False: "Bridge approved.")
+
+def _segments_of(url):
+    db = SessionLocal()
+    try:
+        summary_id = db.query(Summary.id).filter(Summary.source == url).scalar()
+        return load_segments(db, summary_id)
+    finally:
+        db.close()
+
+def _texts(segments):
+    return [segment["text"] for segment in segments]
+
+def test_segments_stored_without_transcript_cache(video_url):
+    asyncio.run(run_pipeline.run_pipeline_async("transcribe", video_url))
+    assert _texts(_segments_of(video_url)) == ["The council met on Monday.", "It approved the new bridge."]
+
+def test_streamed_pipeline_stores_segments_without_transcript_cache(video_url):
+    async def run():
+        return [event async for event in run_pipeline.stream_pipeline("transcribe", video_url)]
+
+    assert asyncio.run(run())[-1] == ("done", "Bridge approved.")
+    assert _texts(_segments_of(video_url)) == ["The council met on Monday.", "It approved the new bridge."]
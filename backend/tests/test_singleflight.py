@@ -0,0 +1,124 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+import pytest
+import singleflight
+from db.database import SessionLocal
+from llm_client import LLMError
+from models import PipelineLock
+from scheduler import Overloaded
+from singleflight import claim_lock, renew_lock, finish_lock, release_lock, read_lock, coordinate, encode_error, decode_error
+
+@pytest.fixture
+def key():
+    return uuid.uuid4().hex
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(singleflight.settings, "SINGLEFLIGHT_ENABLED", True)
+    monkeypatch.setattr(singleflight.settings, "SINGLEFLIGHT_DISTRIBUTED", True)
+    monkeypatch.setattr(singleflight.settings, "SINGLEFLIGHT_POLL_SECONDS", 0.01)
+
+def _expire(key):
+    db = SessionLocal()
+    try:
+        db.query(PipelineLock).filter(PipelineLock.key == key).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+        db.commit()
+    finally:
+        db.close()
+
+def _execute(summary="fresh summary"):
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        return summary, "completed"
+    return execute, calls
+
+def test_live_lease_is_exclusive(key):
+    assert claim_lock(key, "summarize", "https://a.example/x", "worker-a")
+    assert not claim_lock(key, "summarize", "https://a.example/x", "worker-b")
+    assert renew_lock(key, "worker-a")
+
+def test_expired_lease_is_taken_over_once(key):
+    assert claim_lock(key, "summarize", "https://a.example/x", "worker-a")
+    _expire(key)
+
+    assert claim_lock(key, "summarize", "https://a.example/x", "worker-b")
+    assert not claim_lock(key, "summarize", "https://a.example/x", "worker-c")
+    assert not renew_lock(key, "worker-a")  # The old owner learns it lost the lock
+    assert read_lock(key)["status"] == "running"
+
+def test_finished_or_released_lock_can_be_claimed_again(key):
+    assert claim_lock(key, "summarize", "https://a.example/x", "worker-a")
+    finish_lock(key, "worker-a", result="done")
+    assert claim_lock(key, "summarize", "https://a.example/x", "worker-b")
+    release_lock(key, "worker-b")
+    assert read_lock(key) is None
+    assert claim_lock(key, "summarize", "https://a.example/x", "worker-c")
+
+def test_waiter_receives_result_of_other_worker(key):
+    assert claim_lock(key, "summarize", "https://a.example/x", "other-worker")
+    execute, calls = _execute()
+    events = []
+
+    async def run():
+        waiter = asyncio.create_task(coordinate(key, "summarize", "https://a.example/x", execute, lambda *e: events.append(e)))
+        await asyncio.sleep(0.05)
+        finish_lock(key, "other-worker", result="shared summary")
+        return await waiter
+
+    assert asyncio.run(run()) == ("shared summary", "coalesced")
+    assert events == [("stage", "waiting")]
+    assert calls == []
+
+def test_waiter_takes_over_abandoned_lease(key):
+    assert claim_lock(key, "summarize", "https://a.example/x", "crashed-worker")
+    _expire(key)
+    execute, calls = _execute()
+
+    assert asyncio.run(coordinate(key, "summarize", "https://a.example/x", execute, lambda *e: None)) == ("fresh summary", "completed")
+    assert calls == [1]
+    assert read_lock(key)["result"] == "fresh summary"
+
+def test_waiter_raises_the_leaders_error_type(key):
+    assert claim_lock(key, "summarize", "https://a.example/x", "other-worker")
+    execute, calls = _execute()
+
+    async def run():
+        waiter = asyncio.create_task(coordinate(key, "summarize", "https://a.example/x", execute, lambda *e: None))
+        await asyncio.sleep(0.05)
+        finish_lock(key, "other-worker", error=encode_error(LLMError("Error in API request: 429", status_code=429)))
+        return await waiter
+
+    with pytest.raises(LLMError) as raised:
+        asyncio.run(run())
+    assert raised.value.status_code == 429
+    assert calls == []
+
+def test_waiter_runs_uncoordinated_when_lock_reads_fail(key, monkeypatch):
+    assert claim_lock(key, "summarize", "https://a.example/x", "other-worker")
+
+    def broken(key):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(singleflight, "read_lock", broken)
+    execute, calls = _execute()
+
+    assert asyncio.run(coordinate(key, "summarize", "https://a.example/x", execute, lambda *e: None)) == ("fresh summary", "completed")
+    assert calls == [1]
+
+def test_leader_keeps_its_summary_when_publishing_fails(key, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(singleflight, "finish_lock", broken)
+    execute, _ = _execute()
+
+    assert asyncio.run(coordinate(key, "summarize", "https://a.example/x", execute, lambda *e: None)) == ("fresh summary", "completed")
+
+def test_errors_round_trip_with_type_and_attributes():
+    overloaded = decode_error(encode_error(Overloaded("The summarize lane is full.", 7)))
+    assert isinstance(overloaded, Overloaded) and overloaded.retry_after == 7
+    assert isinstance(decode_error(encode_error(ValueError("bad input"))), ValueError)
+    assert str(decode_error("plain message from an older worker")) == "plain message from an older worker"
@@ -0,0 +1,24 @@
+import summarizer_groq
+from ai_pipeline.config import settings
+from chunking import estimate_tokens
+
+def test_truncate_partials_fits_budget_and_keeps_every_part():
+    partials = [f"Part {i} opens with its key fact. " + "Then many more supporting details follow here. " * 40 for i in range(6)]
+    combined = summarizer_groq._truncate_partials(partials, 200)
+
+    assert estimate_tokens(combined) <= 200
+    for i in range(6):
+        assert f"Part {i} opens" in combined
+
+def test_prepare_summary_input_truncates_when_reduce_does_not_shrink(monkeypatch):
+    # A model that returns its input unchanged never shrinks the partial summaries
+    monkeypatch.setattr(summarizer_groq, "summarize_text", lambda text, prompt=None: text)
+    monkeypatch.setattr(settings, "COMPRESSION_ENABLED", False)
+    monkeypatch.setattr(settings, "CHUNK_MAX_TOKENS", 100)
+    monkeypatch.setattr(summarizer_groq.get_llm_router(), "max_input_tokens", lambda: 0)
+
+    text = " ".join(f"Sentence number {i} reports a separate fact." for i in range(300))
+    combined, prompt = summarizer_groq.prepare_summary_input(text)
+
+    assert prompt == summarizer_groq.REDUCE_PROMPT
+    assert estimate_tokens(combined) <= 100
@@ -0,0 +1,48 @@
+import numpy as np
+from audio_stream import SAMPLE_RATE
+from transcript_cache import (
+    audio_fingerprint,
+    loudness_envelope,
+    same_audio,
+    store_transcript,
+    lookup_transcript_by_fingerprint,
+)
+
+def _speech_like(seed: int, seconds: int = 60) -> np.ndarray:
+    # Noise with a loudness that changes every 100 ms, fixed per seed
+    rng = np.random.default_rng(seed)
+    levels = np.repeat(rng.uniform(0.05, 0.5, seconds * 10), SAMPLE_RATE // 10)
+    return (rng.standard_normal(seconds * SAMPLE_RATE) * levels).astype(np.float32)
+
+def _same_second_levels(samples: np.ndarray, seed: int) -> np.ndarray:
+    # Shuffles the 100 ms frames within every second: per-second loudness, and so
+    # the fingerprint, is unchanged while the recording is a different one
+    rng = np.random.default_rng(seed)
+    frames = samples.reshape(-1, 10, SAMPLE_RATE // 10).copy()
+    for second in frames:
+        rng.shuffle(second)
+    return frames.reshape(-1)
+
+def test_colliding_fingerprint_is_rejected_by_envelope():
+    original = _speech_like(1)
+    other = _same_second_levels(original, 2)
+    assert audio_fingerprint(original) == audio_fingerprint(other)
+
+    assert not same_audio(loudness_envelope(other), 60.0, loudness_envelope(original), 60.0)
+
+def test_re_encoded_copy_matches():
+    original = _speech_like(3)
+    copy = original + np.random.default_rng(4).standard_normal(len(original)).astype(np.float32) * 0.001
+
+    assert same_audio(loudness_envelope(copy), 60.2, loudness_envelope(original), 60.0)
+    assert not same_audio(loudness_envelope(copy), 63.0, loudness_envelope(original), 60.0)
+    assert not same_audio(loudness_envelope(copy), 60.0, None, 60.0)  # Stored before envelopes existed
+
+def test_lookup_reuses_only_verified_audio():
+    original = _speech_like(5)
+    fingerprint = audio_fingerprint(original)
+    store_transcript("https://youtu.be/fingerpr001", "tiny", "original words", fingerprint, 60.0, loudness_envelope(original))
+
+    other = _same_second_levels(original, 6)
+    assert lookup_transcript_by_fingerprint(audio_fingerprint(other), "tiny", loudness_envelope(other), 60.0) is None
+    assert lookup_transcript_by_fingerprint(fingerprint, "tiny", loudness_envelope(original), 60.0) == "original words"
@@ -0,0 +1,297 @@
+import hashlib
+import os
+import re
+import threading
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from db.database import SessionLocal
+from models import Transcript
+from db.content_store import store_content
+from db.segments import store_segments
+from cache import TTLCache
+from audio_stream import SAMPLE_RATE, DECODED_BYTES_PER_SECOND, decode_audio_file, iter_file_windows
+from memory import job_budget_bytes
+from ai_pipeline.config import settings
+from logs import get_logger
+from metrics import CallbackMetric
+
+log = get_logger(__name__)
+
+FINGERPRINT_SECONDS = 180  # Loudness envelope of the first three minutes
+ENVELOPE_FRAME = SAMPLE_RATE // 10  # 100 ms loudness frames for verifying a fingerprint match
+ENVELOPE_MAX_MEAN_DB = 1.5  # Mean loudness difference tolerated between two copies of the same audio
+DURATION_TOLERANCE_SECONDS = 1.0
+# Lowest bitrate expected from yt-dlp audio (32 kbps), for an upper bound on a file's duration
+MIN_AUDIO_BYTES_PER_SECOND = 4000
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+# (video id, model size) -> transcript
+transcript_cache = TTLCache("transcripts", settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+
+_stats = {"id_hits": 0, "fingerprint_hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+def youtube_video_id(url: str):
+    """
+    Returns the canonical 11-character video ID of a YouTube URL, or None.
+
+    Handles watch?v=, youtu.be/, /shorts/, /embed/, /live/ and /v/ links on
+    any youtube.com subdomain, ignoring extra parameters such as t= or list=.
+    """
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower().split(":")[0]
+    if host.startswith("www."):
+        host = host[4:]
+
+    candidate = None
+    if host == "youtu.be":
+        candidate = parsed.path.strip("/").split("/")[0]
+    elif host == "youtube.com" or host.endswith(".youtube.com") or host == "youtube-nocookie.com":
+        parts = [part for part in parsed.path.split("/") if part]
+        if parts and parts[0] == "watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        elif len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            candidate = parts[1]
+
+    return candidate if candidate and _VIDEO_ID.match(candidate) else None
+
+def audio_fingerprint(samples: np.ndarray):
+    """
+    Hashes the coarse loudness envelope of 16 kHz mono audio.
+
+    Per-second RMS levels of the first FINGERPRINT_SECONDS, quantized to 3 dB
+    steps, plus the duration in 2-second buckets. Identical audio re-uploaded
+    under another video ID produces the same hash; any edit does not.
+    Different recordings can share it, so a match is only a candidate until
+    same_audio confirms it.
+
+    Returns:
+        str: Hex digest, or None for clips shorter than 5 seconds.
+    """
+    return _fingerprint(samples[: FINGERPRINT_SECONDS * SAMPLE_RATE], len(samples))
+
+def _fingerprint(head: np.ndarray, total_samples: int):
+    seconds = min(len(head) // SAMPLE_RATE, FINGERPRINT_SECONDS)
+    if seconds < 5:
+        return None
+    frames = head[: seconds * SAMPLE_RATE].reshape(seconds, SAMPLE_RATE)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-9
+    levels = np.clip(np.round(20 * np.log10(rms) / 3), -40, 0).astype(np.int8)
+    duration_bucket = int(total_samples / SAMPLE_RATE // 2)
+    return hashlib.sha256(levels.tobytes() + str(duration_bucket).encode("ascii")).hexdigest()
+
+def loudness_envelope(samples: np.ndarray) -> bytes:
+    """
+    Loudness of the first FINGERPRINT_SECONDS in 100 ms frames, as int8 dB.
+    Much finer than the fingerprint, so two different recordings that hash
+    alike are told apart by comparing envelopes.
+    """
+    head = samples[: FINGERPRINT_SECONDS * SAMPLE_RATE]
+    frames = head[: len(head) // ENVELOPE_FRAME * ENVELOPE_FRAME].reshape(-1, ENVELOPE_FRAME)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-9
+    return np.clip(np.round(20 * np.log10(rms)), -100, 0).astype(np.int8).tobytes()
+
+def same_audio(envelope: bytes, duration: float, stored_envelope: bytes, stored_duration: float) -> bool:
+    """
+    True if two loudness envelopes and durations describe the same audio.
+    Transcripts stored without an envelope can't be verified and never match.
+    """
+    if not envelope or not stored_envelope or duration is None or stored_duration is None:
+        return False
+    if abs(duration - stored_duration) > DURATION_TOLERANCE_SECONDS:
+        return False
+    current, stored = np.frombuffer(envelope, dtype=np.int8), np.frombuffer(stored_envelope, dtype=np.int8)
+    frames = min(len(current), len(stored))
+    if frames < 5 * SAMPLE_RATE // ENVELOPE_FRAME:
+        return False
+    difference = np.abs(current[:frames].astype(np.int16) - stored[:frames].astype(np.int16))
+    return float(difference.mean()) <= ENVELOPE_MAX_MEAN_DB
+
+def scan_audio_file(path: str) -> tuple:
+    """
+    Decodes an audio file in bounded windows, keeping only the first
+    FINGERPRINT_SECONDS.
+
+    Returns:
+        tuple: (audio_fingerprint of the whole file, its loudness_envelope,
+        duration in seconds).
+    """
+    head, kept, total = [], 0, 0
+    for window in iter_file_windows(path):
+        if kept < FINGERPRINT_SECONDS * SAMPLE_RATE:
+            head.append(window[: FINGERPRINT_SECONDS * SAMPLE_RATE - kept])
+            kept += len(head[-1])
+        total += len(window)
+    samples = np.concatenate(head) if head else np.zeros(0, dtype=np.float32)
+    return _fingerprint(samples, total), loudness_envelope(samples), total / SAMPLE_RATE
+
+def lookup_transcript(url: str, model_size: str = None):
+    """
+    Returns a stored transcript for the video at the URL, or None. Never
+    downloads anything: a hit is answered from memory or one indexed query.
+    """
+    video_id = youtube_video_id(url)
+    if not settings.TRANSCRIPT_CACHE_ENABLED or video_id is None:
+        return None
+    model_size = model_size or settings.WHISPER_MODEL_SIZE
+
+    text = transcript_cache.get((video_id, model_size))
+    if text is not None:
+        return text
+
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(Transcript.text)
+            .filter(Transcript.video_id == video_id, Transcript.model_size == model_size)
+            .first()
+        )
+    finally:
+        db.close()
+
+    if row is None:
+        _count("misses")
+        return None
+
+    _count("id_hits")
+    transcript_cache.set((video_id, model_size), row.text)
+    return row.text
+
+def lookup_transcript_by_fingerprint(fingerprint: str, model_size: str = None, envelope: bytes = None, duration: float = None):
+    """
+    Returns a stored transcript of identical audio, or None.
+
+    The coarse fingerprint only finds candidates; one is reused only if
+    its duration and loudness envelope match too (see same_audio).
+    """
+    if not (settings.TRANSCRIPT_CACHE_ENABLED and settings.TRANSCRIPT_FINGERPRINT_REUSE) or fingerprint is None:
+        return None
+    model_size = model_size or settings.WHISPER_MODEL_SIZE
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Transcript.text, Transcript.audio_envelope, Transcript.duration)
+            .filter(Transcript.audio_fingerprint == fingerprint, Transcript.model_size == model_size)
+            .limit(10)
+            .all()
+        )
+    finally:
+        db.close()
+
+    for row in rows:
+        if same_audio(envelope, duration, row.audio_envelope, row.duration):
+            _count("fingerprint_hits")
+            return row.text
+    if rows:
+        log.info("fingerprint matched but audio differs", candidates=len(rows))
+    return None
+
+def store_transcript(url: str, model_size: str, text: str, fingerprint: str = None, duration: float = None, envelope: bytes = None):
+    """
+    Saves a transcript under the video's canonical ID. A transcript stored
+    concurrently by another worker wins; this one is dropped.
+
+    Timed segments (see transcription.TimedTranscript) are stored with the
+    transcript's Contents row, where summaries of it find them even when
+    the text later comes back from this cache without them. The summary
+    save stores them too, so they are kept with the cache disabled.
+    """
+    video_id = youtube_video_id(url)
+    if not settings.TRANSCRIPT_CACHE_ENABLED or video_id is None:
+        return
+    model_size = model_size or settings.WHISPER_MODEL_SIZE
+
+    db = SessionLocal()
+    try:
+        db.add(Transcript(
+            video_id=video_id,
+            model_size=model_size,
+            text=text,
+            duration=duration,
+            audio_fingerprint=fingerprint,
+            audio_envelope=envelope,
+        ))
+        segments = getattr(text, "segments", None)
+        if segments and settings.TRANSCRIPT_SEGMENTS_ENABLED:
+            # Kept even if the summary of this run is never saved: a retry reads the plain text from here
+            store_segments(db, store_content(db, text), segments)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    except Exception as e:
+        db.rollback()
+        log.warning("transcript store failed", video_id=video_id, error=str(e))
+    finally:
+        db.close()
+    transcript_cache.set((video_id, model_size), text)
+
+def _fits_budget(audio_path: str, budget: int) -> bool:
+    # Upper bound on the duration from the file size, so short files skip the scan
+    return os.path.getsize(audio_path) / MIN_AUDIO_BYTES_PER_SECOND * DECODED_BYTES_PER_SECOND <= budget
+
+def cached_transcribe_file(url: str, audio_path: str, model_size: str, transcribe, transcribe_windows=None) -> str:
+    """
+    Transcribes a downloaded audio file, reusing the transcript of identical
+    audio stored under another video ID when the fingerprint, duration and
+    loudness envelope match.
+
+    With a JOB_MEMORY_BUDGET_MB, a file that might not fit is scanned in
+    bounded windows first for its fingerprint and exact duration; if
+    decoding it whole would exceed the budget, it is transcribed window by
+    window instead.
+
+    Args:
+        url (str): YouTube URL the audio came from.
+        audio_path (str): Downloaded audio file.
+        model_size (str): Whisper model size.
+        transcribe (callable): transcribe(samples, model_size) -> text.
+        transcribe_windows (callable, optional): transcribe_windows(windows,
+            model_size) -> text, for audio over the budget.
+    """
+    budget = job_budget_bytes()
+    if not budget or transcribe_windows is None or _fits_budget(audio_path, budget):
+        samples = decode_audio_file(audio_path)
+        fingerprint = audio_fingerprint(samples) if settings.TRANSCRIPT_CACHE_ENABLED else None
+        envelope = loudness_envelope(samples) if fingerprint else None
+        duration = len(samples) / SAMPLE_RATE
+        text = lookup_transcript_by_fingerprint(fingerprint, model_size, envelope, duration)
+        if text is None:
+            text = transcribe(samples, model_size)
+        else:
+            log.info("reused transcript of identical audio", url=url)
+    else:
+        fingerprint, envelope, duration = scan_audio_file(audio_path)
+        text = lookup_transcript_by_fingerprint(fingerprint, model_size, envelope, duration)
+        if text is not None:
+            log.info("reused transcript of identical audio", url=url)
+        elif duration * DECODED_BYTES_PER_SECOND <= budget:
+            text = transcribe(decode_audio_file(audio_path), model_size)
+        else:
+            log.info("transcribing in windows to stay within the memory budget", url=url, audio_seconds=round(duration, 1), budget_mb=settings.JOB_MEMORY_BUDGET_MB)
+            text = transcribe_windows(iter_file_windows(audio_path), model_size)
+
+    store_transcript(url, model_size, text, fingerprint, duration, envelope)
+    return text
+
+def transcript_cache_stats() -> dict:
+    with _stats_lock:
+        db_stats = dict(_stats)
+    return {"memory": transcript_cache.stats(), "db": db_stats}
+
+def _lookup_counts():
+    with _stats_lock:
+        return {(key,): value for key, value in _stats.items()}
+
+CallbackMetric(
+    "flashdigest_transcript_cache_lookups_total",
+    "Transcript cache lookups by result (id_hits, fingerprint_hits, misses).",
+    ("result",),
+    _lookup_counts,
+    kind="counter",
+)
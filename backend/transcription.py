@@ -1,43 +1,157 @@
 import os
-import whisper
-from pytube import YouTube
-from pydub import AudioSegment  # For converting to mp3 if needed
+import time
+from whisper_pool import whisper_pool  # Models are loaded lazily on first use
+from audio_stream import SAMPLE_RATE, decode_audio_file, iter_pcm_windows
+from parallel_transcribe import transcribe_samples_parallel, transcribe_windows_parallel
+from metrics import span, record_transcription
+from logs import get_logger
+from ai_pipeline.config import settings
 
-# Load the Whisper model globally (use "base", "small", etc. depending on performance needs)
-model = whisper.load_model("base")
+log = get_logger(__name__)
+
+class TimedTranscript(str):
+    """
+    Transcript text that keeps Whisper's segments ('start', 'end' in seconds
+    from the beginning of the audio, 'text'), so they can be stored with it.
+    """
+
+    def __new__(cls, text: str, segments: list):
+        timed = super().__new__(cls, text)
+        timed.segments = segments
+        return timed
+
+def _segments(result: dict, offset: float = 0.0) -> list:
+    return [
+        {"start": round(segment["start"] + offset, 3), "end": round(segment["end"] + offset, 3), "text": segment["text"].strip()}
+        for segment in result.get("segments", [])
+    ]
 
 def convert_to_mp3(input_path: str, output_path: str):
     """
     Convert any audio file to mp3 format using pydub.
     """
+    from pydub import AudioSegment
+
     audio = AudioSegment.from_file(input_path)
     audio.export(output_path, format="mp3")
     return output_path
 
-def transcribe_audio(audio_path):
+def transcribe_samples(samples, model_size=None):
+    """
+    Transcribe 16 kHz mono float32 samples with Whisper.
+
+    Long audio is split on silence and fanned out across worker processes
+    when TRANSCRIBE_PROCESSES > 1; everything else runs on a pooled model.
+
+    Args:
+        samples (np.ndarray): Decoded audio.
+        model_size (str, optional): 'tiny', 'base' or 'small'. Defaults to WHISPER_MODEL_SIZE.
+
+    Returns:
+        TimedTranscript: Transcribed text with its segments.
+    """
+    duration = len(samples) / SAMPLE_RATE
+    start = time.perf_counter()
+    with span("transcribe", model_size=model_size or settings.WHISPER_MODEL_SIZE, audio_seconds=round(duration, 2)) as attributes:
+        if settings.TRANSCRIBE_PROCESSES > 1 and duration >= settings.PARALLEL_MIN_SECONDS:
+            result = transcribe_samples_parallel(samples, model_size)
+            attributes["segments"] = result["chunks"]
+        else:
+            with whisper_pool.acquire(model_size) as model:
+                result = model.transcribe(samples, fp16=False)  # CPU inference; fp16 is GPU-only
+        elapsed = time.perf_counter() - start
+        attributes["realtime_factor"] = round(elapsed / duration, 3) if duration else None
+    record_transcription(duration, elapsed)
+    if "chunks" in result:
+        return TimedTranscript(result["text"], result["segments"])  # Already absolute
+    return TimedTranscript(result["text"], _segments(result))
+
+def transcribe_audio(audio_path, model_size=None):
     """
     Transcribe audio to text using Whisper.
+
+    Args:
+        audio_path (str): Path to the audio file.
+        model_size (str, optional): 'tiny', 'base' or 'small'. Defaults to WHISPER_MODEL_SIZE.
     """
     try:
         abs_path = os.path.abspath(audio_path)
         if not os.path.isfile(abs_path):
             raise FileNotFoundError(f"File not found: {abs_path}")
 
-        result = model.transcribe(abs_path)
-        print(f"Transcription successful for: {audio_path}")
-        return result["text"]
+        return transcribe_samples(decode_audio_file(abs_path), model_size)
 
     except Exception as e:
-        print(f"Error transcribing audio: {str(e)}")
+        log.error("transcription failed", path=audio_path, error=str(e))
         raise
 
+def transcribe_windows(windows, model_size=None, **fields) -> TimedTranscript:
+    """
+    Transcribes audio arriving as fixed-length windows (see
+    audio_stream.iter_pcm_windows and iter_file_windows), so memory stays
+    bounded by the window size however long the audio is.
+
+    With TRANSCRIBE_PROCESSES > 1 the windows are fanned out to the worker
+    processes (see parallel_transcribe.transcribe_windows_parallel);
+    otherwise they run one at a time on a pooled model, each prompted with
+    the end of the previous window's text.
+
+    Args:
+        windows (iterable): 16 kHz mono float32 arrays, in order.
+        model_size (str, optional): 'tiny', 'base' or 'small'.
+        **fields: Added to the transcribe span (e.g. url).
+
+    Returns:
+        TimedTranscript: Transcribed text with its segments.
+    """
+    texts = []
+    segments = []
+    duration = 0.0
+    start = time.perf_counter()
+    with span("transcribe", windowed=True, model_size=model_size or settings.WHISPER_MODEL_SIZE, **fields) as attributes:
+        if settings.TRANSCRIBE_PROCESSES > 1:
+            result = transcribe_windows_parallel(windows, model_size)
+            text, segments, duration, count = result["text"], result["segments"], result["seconds"], result["chunks"]
+        else:
+            with whisper_pool.acquire(model_size) as model:
+                for window in windows:
+                    # Carry the previous window's ending as context across the cut
+                    prompt = texts[-1][-200:] if texts else None
+                    result = model.transcribe(window, fp16=False, initial_prompt=prompt)
+                    texts.append(result["text"].strip())
+                    segments += _segments(result, duration)
+                    duration += len(window) / SAMPLE_RATE
+            text, count = " ".join(text for text in texts if text), len(texts)
+        elapsed = time.perf_counter() - start
+        attributes.update(windows=count, audio_seconds=round(duration, 2))
+    record_transcription(duration, elapsed)
+    return TimedTranscript(text, segments)
+
+def transcribe_youtube_stream(url: str, model_size=None) -> TimedTranscript:
+    """
+    Transcribes a YouTube video while it is still downloading.
+
+    The audio stream is decoded straight to 16 kHz PCM and fed to Whisper in
+    fixed-length windows, so nothing is written to disk and transcription
+    finishes shortly after the download does.
+
+    Args:
+        url (str): YouTube URL.
+        model_size (str, optional): 'tiny', 'base' or 'small'.
+
+    Returns:
+        TimedTranscript: Transcribed text with its segments.
+    """
+    # Download, transcode and transcription overlap here, so the span covers all three
+    return transcribe_windows(iter_pcm_windows(url), model_size, url=url, streaming=True)
+
 def cleanup_file(file_path: str):
     """
     Delete the temporary file after processing.
     """
     if os.path.isfile(file_path):
         os.remove(file_path)
-        print(f"Deleted temporary file: {file_path}")
+        log.info("deleted temporary file", path=file_path)
 
 def download_audio_from_youtube(url: str, output_path: str = "temp_audio.mp3") -> str:
     """
@@ -50,6 +164,8 @@ def download_audio_from_youtube(url: str, output_path: str = "temp_audio.mp3") -
     Returns:
         str: Path to the downloaded audio file.
     """
+    from pytube import YouTube
+
     try:
         yt = YouTube(url)
         audio_stream = yt.streams.filter(only_audio=True).first()
@@ -60,10 +176,10 @@ def download_audio_from_youtube(url: str, output_path: str = "temp_audio.mp3") -
             mp3_file = downloaded_file.replace(".webm", ".mp3")  # Adjust according to the format
             convert_to_mp3(downloaded_file, mp3_file)
             os.remove(downloaded_file)  # Remove the original non-mp3 file
-            print(f"Converted audio to mp3: {mp3_file}")
+            log.info("converted audio to mp3", path=mp3_file)
             return mp3_file
         
-        print(f"Downloaded audio to: {downloaded_file}")
+        log.info("downloaded audio", path=downloaded_file)
         return downloaded_file
 
     except Exception as e:
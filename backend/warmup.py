@@ -0,0 +1,87 @@
+import threading
+import time
+from ai_pipeline.config import settings
+from logs import get_logger
+
+log = get_logger(__name__)
+
+def _warm_newspaper():
+    from fetcher import get_fetcher
+
+    get_fetcher().warm_up()
+
+def _warm_yt_dlp():
+    import yt_dlp
+
+def _warm_whisper():
+    from whisper_pool import whisper_pool
+
+    whisper_pool.warm_up(settings.WHISPER_MODEL_SIZE)
+
+# Hooks that load a heavy dependency ahead of its first request
+HOOKS = {
+    "newspaper": _warm_newspaper,
+    "yt_dlp": _warm_yt_dlp,
+    "whisper": _warm_whisper,
+}
+
+# Everything a mode needs, for WARMUP=summarize or WARMUP=transcribe
+GROUPS = {
+    "summarize": ("newspaper",),
+    "transcribe": ("yt_dlp", "whisper"),
+}
+
+_status = {}
+_status_lock = threading.Lock()
+
+def resolve_hooks(targets) -> list:
+    """
+    Expands mode names and hook names to the ordered list of hooks to run.
+
+    Args:
+        targets (str | list): Comma-separated string or list, e.g. 'summarize,whisper'.
+    """
+    if isinstance(targets, str):
+        targets = targets.split(",")
+    hooks = []
+    for target in (t.strip() for t in targets):
+        if not target:
+            continue
+        if target not in GROUPS and target not in HOOKS:
+            raise ValueError(f"❌ Unknown warm-up target '{target}'. Choose from {', '.join([*GROUPS, *HOOKS])}.")
+        for hook in GROUPS.get(target, (target,)):
+            if hook not in hooks:
+                hooks.append(hook)
+    return hooks
+
+def warm_up(targets=None) -> dict:
+    """
+    Runs the warm-up hooks for the targets (default: settings.WARMUP).
+    A failing hook is logged and skipped; the dependency then loads on
+    first use as usual.
+
+    Returns:
+        dict: Seconds taken per hook, or the error message.
+    """
+    results = {}
+    for hook in resolve_hooks(settings.WARMUP if targets is None else targets):
+        with _status_lock:
+            _status[hook] = "running"
+        started = time.perf_counter()
+        try:
+            HOOKS[hook]()
+            results[hook] = round(time.perf_counter() - started, 3)
+            log.info("warmed up", hook=hook, seconds=results[hook])
+        except Exception as e:
+            results[hook] = f"failed: {e}"
+            log.warning("warm-up failed", hook=hook, error=str(e))
+        with _status_lock:
+            _status[hook] = results[hook]
+    return results
+
+def warmup_status() -> dict:
+    """
+    Hook name -> 'running', seconds taken, or error, for hooks started so far.
+    """
+    with _status_lock:
+        return dict(_status)
@@ -0,0 +1,113 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from ai_pipeline.config import settings
+from logs import get_logger
+
+log = get_logger(__name__)
+
+MODEL_SIZES = ("tiny", "base", "small")
+
+class WhisperModelPool:
+    """
+    Lazily loaded pool of Whisper models, keyed by model size.
+
+    Nothing is imported or loaded until the first transcription. Each size
+    gets up to WHISPER_POOL_SIZE instances; a thread checks an instance out
+    for the duration of one transcription so instances are never shared, and
+    torch's intra-op threads are split across the instances so concurrent
+    transcriptions don't oversubscribe the cores.
+    """
+
+    def __init__(self, pool_size: int):
+        self.pool_size = max(1, pool_size)
+        self._idle = {}
+        self._created = {}
+        self._model_bytes = {}
+        self._load_seconds = {}
+        self._lock = threading.Lock()
+        self._torch_configured = False
+
+    def _configure_torch(self):
+        import torch
+
+        threads = settings.WHISPER_TORCH_THREADS or max(1, (os.cpu_count() or 1) // self.pool_size)
+        torch.set_num_threads(threads)
+        self._torch_configured = True
+        log.info("configured whisper threads", torch_threads=threads, models_per_size=self.pool_size)
+
+    def _load(self, size: str):
+        import whisper
+
+        with self._lock:
+            if not self._torch_configured:
+                self._configure_torch()
+
+        started = time.perf_counter()
+        model = whisper.load_model(size, device="cpu")
+        elapsed = time.perf_counter() - started
+        model_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+
+        with self._lock:
+            self._model_bytes[size] = model_bytes
+            self._load_seconds[size] = elapsed
+        log.info("loaded whisper model", model_size=size, load_seconds=round(elapsed, 2), mib=round(model_bytes / 1024 ** 2))
+        return model
+
+    @contextmanager
+    def acquire(self, size: str = None):
+        """
+        Checks out a model of the given size, loading one if none is idle and
+        the pool isn't full, otherwise waiting for one to be returned.
+        """
+        size = size or settings.WHISPER_MODEL_SIZE
+        if size not in MODEL_SIZES:
+            raise ValueError(f"❌ Invalid Whisper model size '{size}'. Choose one of {', '.join(MODEL_SIZES)}.")
+
+        with self._lock:
+            idle = self._idle.setdefault(size, queue.Queue())
+            create = idle.empty() and self._created.get(size, 0) < self.pool_size
+            if create:
+                self._created[size] = self._created.get(size, 0) + 1
+
+        if create:
+            try:
+                model = self._load(size)
+            except Exception:
+                with self._lock:
+                    self._created[size] -= 1
+                raise
+        else:
+            model = idle.get()
+
+        try:
+            yield model
+        finally:
+            idle.put(model)
+
+    def warm_up(self, size: str = None):
+        """
+        Loads one model of the given size ahead of the first request.
+        """
+        with self.acquire(size):
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "models": {
+                    size: {
+                        "loaded": count,
+                        "idle": self._idle[size].qsize(),
+                        "bytes_per_model": self._model_bytes.get(size),
+                        "total_bytes": self._model_bytes.get(size, 0) * count,
+                        "load_seconds": self._load_seconds.get(size),
+                    }
+                    for size, count in self._created.items()
+                },
+            }
+
+whisper_pool = WhisperModelPool(settings.WHISPER_POOL_SIZE)
@@ -1,5 +1,4 @@
-import { useState } from "react";
-import axios from "axios";
+import { useEffect, useState } from "react";
 import History from "./components/History";
 import SummaryTranscription from "./components/SummaryTranscription";
 import "./App.css";
@@ -11,6 +10,14 @@ function App() {
   const [history, setHistory] = useState([]);
   const [loading, setLoading] = useState(false);  // Added loading state
 
+  // Load the most recent stored summaries from the backend
+  useEffect(() => {
+    fetch("http://localhost:8002/summaries?limit=20")
+      .then((response) => (response.ok ? response.json() : { items: [] }))
+      .then((page) => setHistory(page.items.map((item) => item.summary).reverse()))
+      .catch((error) => console.error("Error loading history:", error));
+  }, []);
+
   const processRequest = async () => {
     if (!newsUrl) {
       setOutput("Please enter a news URL.");
@@ -18,15 +25,51 @@ function App() {
     }
 
     setLoading(true);  // Indicate processing starts
+    setOutput("");
 
     try {
-      const response = await axios.post("http://localhost:8002/process", {
-        url: newsUrl,
-        mode: action.toLowerCase(),
+      // Stream the summary as Server-Sent Events so text shows up as soon as it's generated
+      const response = await fetch("http://localhost:8002/process/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ url: newsUrl, mode: action.toLowerCase() }),
       });
+      if (!response.ok) {
+        throw new Error(`Backend returned ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let summary = "";
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split("\n\n");
+        buffer = events.pop();  // Keep the incomplete event for the next read
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = raw.match(/^data: (.*)$/m)?.[1];
+          if (!event || data === undefined) continue;
+          const payload = JSON.parse(data);
 
-      setOutput(response.data.result);
-      setHistory([...history, response.data.result]);  // Store history
+          if (event === "stage") {
+            setOutput(summary || `${payload.charAt(0).toUpperCase()}${payload.slice(1)}...`);
+          } else if (event === "token") {
+            summary += payload;
+            setOutput(summary);
+          } else if (event === "done") {
+            summary = payload;
+            setOutput(summary);
+            setHistory((previous) => [...previous, summary]);  // Store history
+          } else if (event === "error") {
+            setOutput(payload);
+          }
+        }
+      }
     } catch (error) {
       console.error("Error calling backend:", error);
       setOutput("Failed to connect to backend. Ensure the server is running.");